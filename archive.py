@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+from datetime import datetime, timezone, timedelta
+from xml.sax.saxutils import escape
+import numpy as np
+from clock import get_default_clock
+from logger import get_logger
+import database as db
+
+logger = get_logger(__name__)
+
+ARCHIVE_VERSION = 1
+# Fixed-point scales of the archived columns
+LATLON_SCALE = 10**7 # 1e-7 degree, about 1 cm
+ALTITUDE_SCALE = 100 # Centimeters
+NO_ALTITUDE = np.iinfo(np.int32).min
+# One .npy file per column, every value an int32
+COLUMNS = ('time', 'lat', 'lon', 'alt')
+
+def archive_track(session, directory, paraglider_key, start, end, batch_size=10000):
+    """
+    Archive the points of a paraglider in a time range, from the database to a columnar track.
+
+    The track is a directory of .npy files, one per column, and a meta.json. The timestamps are stored as
+    int32 offsets in seconds from the first point (frame of reference), the latitudes and longitudes in
+    1e-7 degrees and the altitudes in centimeters. The points are streamed from the database to the
+    memory-mapped files, never loaded at once.
+
+    Args:
+        session (Session): SQLAlchemy session.
+        directory (str): The archive directory, the track is written in its `paraglider_key` subdirectory.
+        paraglider_key (str): The PureTrack key of the paraglider.
+        start (datetime): Beginning of the range, included, timezone aware.
+        end (datetime): End of the range, excluded, timezone aware.
+        batch_size (int, optional): Number of points fetched and written at once.
+
+    Returns:
+        int: The number of archived points.
+    """
+    # SQLite doesn't save Time Zone, the datetimes are naive UTC
+    start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    count = db.count_paraglider_points(session, paraglider_key, start, end)
+
+    path = _track_path(directory, paraglider_key)
+    os.makedirs(path, exist_ok=True)
+    columns = {
+        name: np.lib.format.open_memmap(os.path.join(path, f'{name}.npy'), mode='w+', dtype='<i4', shape=(count,))
+        for name in COLUMNS
+    }
+    base = None
+    index = 0
+    rows = db.iter_paraglider_points(session, paraglider_key, start, end, batch_size)
+    while index < count:
+        batch = [row for _, row in zip(range(min(batch_size, count - index)), rows)]
+        if not batch:
+            break
+        timestamps = np.array([row.datetime.replace(tzinfo=timezone.utc).timestamp() for row in batch])
+        if base is None:
+            base = int(timestamps[0])
+        stop = index + len(batch)
+        columns['time'][index:stop] = np.rint(timestamps - base)
+        columns['lat'][index:stop] = np.rint(np.array([row.latitude for row in batch], dtype=float) * LATLON_SCALE)
+        columns['lon'][index:stop] = np.rint(np.array([row.longitude for row in batch], dtype=float) * LATLON_SCALE)
+        altitudes = np.array([np.nan if row.altitude is None else row.altitude for row in batch]) * ALTITUDE_SCALE
+        columns['alt'][index:stop] = np.where(np.isnan(altitudes), NO_ALTITUDE, np.rint(np.nan_to_num(altitudes)))
+        index = stop
+    for column in columns.values():
+        column.flush()
+    del columns
+
+    with open(os.path.join(path, 'meta.json'), 'w') as file:
+        json.dump({
+            'version': ARCHIVE_VERSION,
+            'paraglider_key': paraglider_key,
+            'count': index,
+            'base': base or 0,
+            'latlon_scale': LATLON_SCALE,
+            'altitude_scale': ALTITUDE_SCALE
+        }, file)
+    return index
+
+def archive_event(session, directory, keys, start, end):
+    """
+    Archive the tracks of several paragliders, e.g. of the whole event.
+
+    Args:
+        session (Session): SQLAlchemy session.
+        directory (str): The archive directory.
+        keys (list): The PureTrack keys of the paragliders.
+        start (datetime): Beginning of the range, included, timezone aware.
+        end (datetime): End of the range, excluded, timezone aware.
+
+    Returns:
+        dict: The number of archived points of each paraglider ({paraglider_key: count}).
+    """
+    counts = {}
+    for paraglider_key in keys:
+        counts[paraglider_key] = archive_track(session, directory, paraglider_key, start, end)
+        logger.info(f"{paraglider_key}: {counts[paraglider_key]} points archived")
+    return counts
+
+class ArchivedTrack:
+    """
+    A columnar track of the archive, memory-mapped.
+
+    The columns are read-only views of the files: slicing a time range touches only its pages,
+    without copy. The values are decoded on demand, a chunk at a time.
+    """
+    def __init__(self, path):
+        """
+        Open a track.
+
+        Args:
+            path (str): The directory of the track.
+        """
+        with open(os.path.join(path, 'meta.json')) as file:
+            self.meta = json.load(file)
+        self.paraglider_key = self.meta['paraglider_key']
+        self.base = self.meta['base']
+        self.columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in COLUMNS}
+
+    def __len__(self):
+        return len(self.columns['time'])
+
+    def range(self, start=None, end=None):
+        """
+        Find the points of a time range, by binary search of the memory-mapped timestamps.
+
+        Args:
+            start (float, optional): Beginning of the range, included, Unix timestamp.
+            end (float, optional): End of the range, excluded, Unix timestamp.
+
+        Returns:
+            slice: The indexes of the points.
+        """
+        offsets = self.columns['time']
+        first = 0 if start is None else int(np.searchsorted(offsets, start - self.base, side='left'))
+        last = len(offsets) if end is None else int(np.searchsorted(offsets, end - self.base, side='left'))
+        return slice(first, last)
+
+    def view(self, start=None, end=None):
+        """
+        Get the encoded columns of a time range, without copy.
+
+        Args:
+            start (float, optional): Beginning of the range, included, Unix timestamp.
+            end (float, optional): End of the range, excluded, Unix timestamp.
+
+        Returns:
+            dict: The int32 views of the columns ({column: np.memmap}).
+        """
+        points = self.range(start, end)
+        return {name: column[points] for name, column in self.columns.items()}
+
+    def iter_chunks(self, start=None, end=None, chunk_size=4096):
+        """
+        Decode the points of a time range, a chunk at a time.
+
+        Args:
+            start (float, optional): Beginning of the range, included, Unix timestamp.
+            end (float, optional): End of the range, excluded, Unix timestamp.
+            chunk_size (int, optional): Number of points decoded at once.
+
+        Yields:
+            dict: 'timestamp' (int Unix timestamps), 'lat' and 'lon' (degrees), 'alt' (meters, NaN if unknown).
+        """
+        points = self.range(start, end)
+        for first in range(points.start, points.stop, chunk_size):
+            chunk = slice(first, min(first + chunk_size, points.stop))
+            altitudes = self.columns['alt'][chunk]
+            yield {
+                'timestamp': self.columns['time'][chunk].astype(np.int64) + self.base,
+                'lat': self.columns['lat'][chunk] / self.meta['latlon_scale'],
+                'lon': self.columns['lon'][chunk] / self.meta['latlon_scale'],
+                'alt': np.where(altitudes == NO_ALTITUDE, np.nan, altitudes / self.meta['altitude_scale'])
+            }
+
+class TrackArchive:
+    """
+    The archived tracks of an event, one subdirectory per paraglider.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def keys(self):
+        keys = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if os.path.exists(meta_file := os.path.join(entry.path, 'meta.json')):
+                    with open(meta_file) as file:
+                        keys.append(json.load(file)['paraglider_key'])
+        return sorted(keys)
+
+    def open(self, paraglider_key):
+        return ArchivedTrack(_track_path(self.directory, paraglider_key))
+
+def export_gpx(track, file, start=None, end=None, name=None):
+    """
+    Write a track as GPX 1.1, streaming the points chunk by chunk.
+
+    Args:
+        track (ArchivedTrack): The track.
+        file (file): A text file open for writing.
+        start (float, optional): Beginning of the range, included, Unix timestamp.
+        end (float, optional): End of the range, excluded, Unix timestamp.
+        name (str, optional): The name of the track. Default is the PureTrack key.
+
+    Returns:
+        int: The number of points written.
+    """
+    file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    file.write('<gpx version="1.1" creator="GuardianAngel" xmlns="http://www.topografix.com/GPX/1/1">\n')
+    file.write(f'<trk><name>{escape(name or track.paraglider_key)}</name><trkseg>\n')
+    count = 0
+    for chunk in track.iter_chunks(start, end):
+        lines = []
+        for (date, hour, minute, second), lat, lon, alt in zip(_utc_times(chunk['timestamp']), chunk['lat'].tolist(), chunk['lon'].tolist(), chunk['alt'].tolist()):
+            elevation = '' if alt != alt else f'<ele>{alt:.2f}</ele>' # NaN if unknown
+            lines.append(f'<trkpt lat="{lat:.7f}" lon="{lon:.7f}">{elevation}<time>{date}T{hour:02d}:{minute:02d}:{second:02d}Z</time></trkpt>\n')
+        file.write(''.join(lines))
+        count += len(lines)
+    file.write('</trkseg></trk>\n</gpx>\n')
+    return count
+
+def export_igc(track, file, start=None, end=None, pilot=None):
+    """
+    Write a track as IGC, streaming the points chunk by chunk.
+
+    The B records hold the GNSS altitude, the pressure altitude is unknown (0).
+
+    Args:
+        track (ArchivedTrack): The track.
+        file (file): A text file open for writing, IGC lines end with CRLF.
+        start (float, optional): Beginning of the range, included, Unix timestamp.
+        end (float, optional): End of the range, excluded, Unix timestamp.
+        pilot (str, optional): The name of the pilot. Default is the PureTrack key.
+
+    Returns:
+        int: The number of B records written.
+    """
+    points = track.range(start, end)
+    first = track.base + int(track.columns['time'][points.start]) if points.stop > points.start else track.base
+    file.write('AXXXGuardianAngel\r\n')
+    file.write(f"HFDTEDATE:{datetime.fromtimestamp(first, timezone.utc):%d%m%y},01\r\n")
+    file.write(f"HFPLTPILOTINCHARGE:{pilot or track.paraglider_key}\r\n")
+    count = 0
+    for chunk in track.iter_chunks(start, end):
+        lines = []
+        for (_, hour, minute, second), lat, lon, alt in zip(_utc_times(chunk['timestamp']), chunk['lat'].tolist(), chunk['lon'].tolist(), chunk['alt'].tolist()):
+            validity, gnss_altitude = ('V', 0) if alt != alt else ('A', round(alt)) # NaN if unknown
+            lines.append(f"B{hour:02d}{minute:02d}{second:02d}{_igc_angle(lat, 2, 'NS')}{_igc_angle(lon, 3, 'EW')}{validity}00000{gnss_altitude:05d}\r\n")
+        file.write(''.join(lines))
+        count += len(lines)
+    return count
+
+def _utc_times(timestamps):
+    # The UTC date and time of each timestamp, by integer arithmetic, the dates formatted once per day
+    days, seconds = np.divmod(timestamps, 86400)
+    hours, seconds = np.divmod(seconds, 3600)
+    minutes, seconds = np.divmod(seconds, 60)
+    dates = {day: datetime.fromtimestamp(day * 86400, timezone.utc).strftime('%Y-%m-%d') for day in np.unique(days).tolist()}
+    return zip(map(dates.__getitem__, days.tolist()), hours.tolist(), minutes.tolist(), seconds.tolist())
+
+def _igc_angle(value, degrees_digits, hemispheres):
+    thousandths = round(abs(value) * 60000) # In thousandths of minute
+    degrees, thousandths = divmod(thousandths, 60000)
+    hemisphere = hemispheres[0] if value >= 0 else hemispheres[1]
+    return f"{degrees:0{degrees_digits}d}{thousandths:05d}{hemisphere}"
+
+def _track_path(directory, paraglider_key):
+    return os.path.join(directory, paraglider_key.replace(os.sep, '_'))
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive the tracks of the paragliders from the database.")
+    parser.add_argument('directory', help="Archive directory")
+    parser.add_argument('--hours', type=float, default=21, help="Hours of track to archive, until now")
+    args = parser.parse_args()
+
+    from config import Config
+    cfg = Config().get('guardian_angel')
+    db.init_db_engine(cfg.get('database'))
+    end = get_default_clock().now()
+    with db.SessionLocal() as session:
+        keys = [key for key, in session.query(db.ParaglidersData.paraglider_key).distinct()]
+        archive_event(session, args.directory, keys, end - timedelta(hours=args.hours), end)
+
+if __name__ == "__main__":
+    main()
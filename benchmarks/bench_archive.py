@@ -0,0 +1,93 @@
+"""
+Columnar archive of 21 h tracks: size per point against the SQLite table, one hour read from the database
+against the memory-mapped archive, and the streaming GPX/IGC exports (time and peak Python memory).
+
+Run from the repository root:
+    python benchmarks/bench_archive.py [pilots] [hours] [period]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+import archive
+import database as db
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    hours = float(sys.argv[2]) if len(sys.argv) > 2 else 21
+    period = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db_engine({'url': f'sqlite:///{tmp}/event.db'})
+        session = db.SessionLocal()
+        end = datetime.now(timezone.utc).replace(microsecond=0)
+        count = int(hours * 3600 / period)
+        keys = [f'X-{pilot:04d}' for pilot in range(pilots)]
+        for key in keys:
+            points = [{'datetime': end - timedelta(seconds=period * (i + 1)), 'lat': 44.9 + i * 1e-5, 'lon': 5.2,
+                       'alt_gps': 1500.0 + i % 100, 'speed': 9.5, 'course': 90.0, 'alt_gnd_calc': 600.0}
+                      for i in range(count)]
+            db.insert_paraglider_points(session, {key: points})
+            session.commit()
+        session.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        rows = pilots * count
+        print(f"{pilots} pilots, {rows} points over {hours} h")
+
+        start = time.perf_counter()
+        archive.archive_event(session, f'{tmp}/archive', keys, end - timedelta(hours=hours + 1), end)
+        print(f"archive_event      : {time.perf_counter() - start:6.2f} s")
+        print(f"size per point     : SQLite {os.path.getsize(f'{tmp}/event.db') / rows:5.1f} bytes (table and indexes), "
+              f"archive {directory_size(f'{tmp}/archive') / rows:5.1f} bytes")
+
+        # The hour in the middle of the event, for each pilot
+        middle = end - timedelta(hours=hours / 2)
+        start = time.perf_counter()
+        for key in keys:
+            db_rows = session.query(db.ParaglidersData).filter(
+                db.ParaglidersData.paraglider_key == key,
+                db.ParaglidersData.datetime >= (middle - timedelta(minutes=30)).replace(tzinfo=None),
+                db.ParaglidersData.datetime < (middle + timedelta(minutes=30)).replace(tzinfo=None)
+            ).all()
+        db_time = time.perf_counter() - start
+        track_archive = archive.TrackArchive(f'{tmp}/archive')
+        start = time.perf_counter()
+        for key in keys:
+            view = track_archive.open(key).view(middle.timestamp() - 1800, middle.timestamp() + 1800)
+        view_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for key in keys:
+            decoded = list(track_archive.open(key).iter_chunks(middle.timestamp() - 1800, middle.timestamp() + 1800))
+        decode_time = time.perf_counter() - start
+        print(f"1 h of each pilot  : database {db_time * 1000:7.1f} ms, archive view {view_time * 1000:6.1f} ms, "
+              f"decoded {decode_time * 1000:6.1f} ms ({len(db_rows)} = {len(view['time'])} = "
+              f"{sum(len(chunk['timestamp']) for chunk in decoded)} points)")
+        session.close()
+
+        track = track_archive.open(keys[0])
+        for name, export in (('GPX', archive.export_gpx), ('IGC', archive.export_igc)):
+            with open(os.devnull, 'w') as output:
+                start = time.perf_counter()
+                written = export(track, output)
+                elapsed = time.perf_counter() - start
+                # Traced apart, tracemalloc slows the export down
+                tracemalloc.start()
+                export(track, output)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            print(f"export {name}         : {written} points in {elapsed:5.2f} s, peak Python memory {peak / 1024:6.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
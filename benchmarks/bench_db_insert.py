@@ -0,0 +1,65 @@
+"""
+Insertion of track points in SQLite: one SELECT per point and a commit per pilot (previous
+update_paraglider_data) against the bulk INSERT ... ON CONFLICT DO NOTHING with a single commit.
+
+Run from the repository root:
+    python benchmarks/bench_db_insert.py [points] [pilots]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+
+
+def make_points(points, pilots):
+    start = datetime.now(timezone.utc) - timedelta(hours=24)
+    per_pilot = points // pilots
+    return {
+        f'X-{pilot:04d}': [
+            {'datetime': start + timedelta(seconds=5 * i), 'lat': 44.9 + i * 1e-5, 'lon': 5.2, 'alt_gps': 1500.0,
+             'course': 90.0, 'speed': 9.5, 'speed_calc': 9.4, 'alt_gnd_calc': 600.0}
+            for i in range(per_pilot)
+        ]
+        for pilot in range(pilots)
+    }
+
+
+def per_point(session, points_by_key):
+    for paraglider_key, points in points_by_key.items():
+        for point in points:
+            existing_point = session.query(db.ParaglidersData).filter_by(paraglider_key=paraglider_key, datetime=point['datetime']).first()
+            if not existing_point:
+                db.save_paraglider_point(session, paraglider_key, point)
+        session.commit()
+
+
+def bulk(session, points_by_key):
+    db.insert_paraglider_points(session, points_by_key)
+    session.commit()
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    pilots = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    points_by_key = make_points(points, pilots)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, insert in (('per point', per_point), ('bulk', bulk)):
+            db.init_db_engine({'url': f'sqlite:///{tmp}/{name.replace(" ", "_")}.db'})
+            session = db.SessionLocal()
+            for run in ('new points', 'same points again'):
+                start = time.perf_counter()
+                insert(session, points_by_key)
+                elapsed = time.perf_counter() - start
+                count = session.query(db.ParaglidersData).count()
+                print(f"{name:9s} {run:17s}: {elapsed:7.2f} s, {points / elapsed:9.0f} points/s, {count} rows")
+            session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Write path of the monitoring cycles: the points inserted then purged with two commits on the cycle's session,
+in the default rollback journal, against the DatabaseWriter (one transaction per cycle) on a WAL database.
+A reader thread runs history queries meanwhile.
+
+Run from the repository root:
+    python benchmarks/bench_db_writer.py [pilots] [cycles]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+from db_writer import DatabaseWriter
+
+POINTS_PER_CYCLE = 6 # A point every 5 s, a cycle every 30 s
+
+
+def cycle_points(pilots, cycle, start):
+    points_by_key = {}
+    for pilot in range(pilots):
+        points_by_key[f'X-{pilot:04d}'] = [
+            {'datetime': start + timedelta(seconds=30 * cycle + 5 * i), 'lat': 44.9, 'lon': 5.2, 'alt_gps': 1500.0,
+             'course': 90.0, 'speed': 9.5, 'alt_gnd_calc': 600.0}
+            for i in range(POINTS_PER_CYCLE)
+        ]
+    return points_by_key
+
+
+def read_loop(keys, stop, latencies, errors):
+    index = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            session = db.SessionLocal()
+            session.query(db.ParaglidersData).filter(db.ParaglidersData.paraglider_key == keys[index % len(keys)]).all()
+            session.close()
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors.append(1)
+        index += 1
+
+
+def run(name, cfg, pilots, cycles, use_writer):
+    db.init_db_engine(cfg)
+    keys = [f'X-{pilot:04d}' for pilot in range(pilots)]
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    stop, latencies, errors = threading.Event(), [], []
+    reader = threading.Thread(target=read_loop, args=(keys, stop, latencies, errors))
+    reader.start()
+
+    writer = DatabaseWriter() if use_writer else None
+    cycle_times = []
+    begin = time.perf_counter()
+    for cycle in range(cycles):
+        points_by_key = cycle_points(pilots, cycle, start)
+        cycle_start = time.perf_counter()
+        if writer:
+            def write(session, points_by_key=points_by_key):
+                count = db.insert_paraglider_points(session, points_by_key)
+                db.purge_old_data(session, commit=False)
+                return count
+            writer.submit(write)
+        else:
+            session = db.SessionLocal()
+            db.insert_paraglider_points(session, points_by_key)
+            session.commit()
+            db.purge_old_data(session)
+            session.close()
+        cycle_times.append(time.perf_counter() - cycle_start)
+    if writer:
+        writer.close()
+    total = time.perf_counter() - begin
+    stop.set()
+    reader.join()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else float('nan')
+    print(f"{name:24s}: cycle {sum(cycle_times) / cycles * 1000:7.2f} ms on the cycle's thread, "
+          f"{total / cycles * 1000:7.2f} ms per cycle written, "
+          f"reads {len(latencies)} p99 {p99 * 1000:.2f} ms max {latencies[-1] * 1000:.2f} ms, {len(errors)} errors")
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    cycles = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f"{pilots} pilots, {cycles} cycles of {POINTS_PER_CYCLE} points per pilot")
+    with tempfile.TemporaryDirectory() as tmp:
+        run('rollback journal, FULL', {'url': f'sqlite:///{tmp}/default.db', 'journal_mode': 'DELETE',
+                                      'synchronous': 'FULL', 'cache_size': -2000}, pilots, cycles, False)
+        run('WAL, NORMAL, writer', {'url': f'sqlite:///{tmp}/wal.db'}, pilots, cycles, True)
+
+
+if __name__ == '__main__':
+    main()
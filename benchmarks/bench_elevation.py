@@ -0,0 +1,63 @@
+"""
+Ground elevation lookups for a trail without 'ground_level': SRTM dataset set up for each
+point (previous behaviour) against the memoized ElevationService, point by point and in batch.
+
+A synthetic SRTM3 tile is generated, no download is needed.
+
+Run from the repository root:
+    python benchmarks/bench_elevation.py [points]
+"""
+import array
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import srtm
+from elevation import ElevationService
+
+
+def write_tile(directory, name='N44E005.hgt', size=1201):
+    samples = array.array('h', ((row * 7 + col * 3) % 2000 + 300 for row in range(size) for col in range(size)))
+    samples.byteswap() # SRTM files are big-endian
+    with open(os.path.join(directory, name), 'wb') as file:
+        file.write(samples.tobytes())
+
+
+def trail(count):
+    # A slow ground track (walking, landing): many points share the same SRTM cell
+    return [44.9 + i * 2e-6 for i in range(count)], [5.2 + i * 1e-6 for i in range(count)]
+
+
+def timed(name, count, function, repeat=5):
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    print(f"{name:30s}: {count / elapsed:12.0f} points/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 14000
+    lats, lons = trail(count)
+    with tempfile.TemporaryDirectory() as directory:
+        write_tile(directory)
+        load = lambda: srtm.get_data(local_cache_dir=directory, srtm1=False)
+
+        legacy_count = min(count, 200)
+        timed('get_data() per point', legacy_count,
+              lambda: [load().get_elevation(lat, lon) for lat, lon in zip(lats[:legacy_count], lons[:legacy_count])], repeat=1)
+        data = load()
+        timed('shared dataset', count, lambda: [data.get_elevation(lat, lon) for lat, lon in zip(lats, lons)])
+        service = ElevationService(data=data)
+        timed('service, point by point', count, lambda: [service.get_elevation(lat, lon) for lat, lon in zip(lats, lons)])
+        service = ElevationService(data=data)
+        timed('service, batch', count, lambda: service.get_elevations(lats, lons))
+        print(f"cache: {service.cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
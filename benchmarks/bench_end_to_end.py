@@ -0,0 +1,255 @@
+"""
+End to end benchmark: GuardianAngel monitoring a synthetic fleet in real time, against local stand-ins
+for PureTrack (/api/trails, /api/live, /api/groups/byslug) and for the Discord channel messages.
+
+The fleet mixes flying, walking and landing paragliders (cf. TrackGenerator). Each size runs for a few
+minutes in its own process, with a SQLite database, and reports:
+    - the duration of the monitoring cycles, the first one (the catch-up of the history) apart,
+    - the records parsed per second of parsing,
+    - the SQL statements per cycle,
+    - the resident memory of the process and the memory of the hot tier,
+    - the latency of the landing alerts, from the landing to the Discord message.
+
+A landing can only be detected once the 5 minutes average speed drops below 0.56 m/s: an alert sooner
+comes from an average over a shortened window, the run fails.
+
+The results are written as JSON, with the commit and the parameters, to compare them over time with
+--compare.
+
+Run from the repository root:
+    python benchmarks/bench_end_to_end.py [fleet sizes...] [--duration 420] [--period 10]
+        [--output benchmarks/results/end_to_end.json] [--compare previous.json]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from puretrack_standin import PureTrackStandIn, TrackGenerator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIX = {'flying': 0.6, 'walking': 0.2, 'landing': 0.2}
+# Seconds after a landing at 9 m/s before the 5 minutes average speed drops below 0.56 m/s: the average
+# runs from the first point of the window, up to a point period after its start, and the last point at
+# 9 m/s is up to a point period before the landing
+EARLIEST_ALERT = (300 - 5) * (1 - 0.56 / 9.0) - 5
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(round(fraction * (len(ordered) - 1)), len(ordered) - 1)]
+
+
+def rss():
+    """
+    Returns:
+        int: The resident memory of the process, in bytes, or its peak where /proc is missing.
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run(pilots, args):
+    """
+    Monitor a fleet for `args.duration` seconds.
+
+    Returns:
+        dict: The measures of the run.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    import puretrack_api as ptrk
+    from event_bus import CycleCompleted
+    from guardian_angel import GuardianAngel
+
+    logging.disable(logging.WARNING)
+    statements = [0]
+
+    def count_statement(*_):
+        statements[0] += 1
+
+    event.listen(Engine, 'before_cursor_execute', count_statement)
+
+    generator = TrackGenerator(pilots, MIX, history=args.history)
+    cycles = []
+    with tempfile.TemporaryDirectory() as tmp, PureTrackStandIn(args.latency / 1000, latency_per_key=args.latency_per_key / 1000,
+                                                                generator=generator) as standin:
+        ptrk.PURETRACK_URL = standin.url
+        cfg = {
+            'paragliders': [{'name': f'pilot-{key}', 'puretrack_key': key} for key in generator.keys],
+            'puretrack_site': {'group': 'bench', 'mode': 'trails'},
+            'polling': {'mode': args.polling},
+            'discord_bot': {'api_url': f'{standin.url}/discord', 'channel_id': 1, 'bot_token': 'bench'},
+            'roster': {'auto_discovery': False},
+            'ingestion': {'mode': args.ingestion, 'concurrency': 8, 'chunk_size': 25, 'queue_size': 4},
+            'database': {'url': f'sqlite:///{tmp}/bench.db'},
+        }
+        guardian_angel = GuardianAngel(cfg)
+        guardian_angel.stop_monitoring()
+        lock = threading.Lock()
+        previous = {'statements': statements[0], 'records': standin.records_served}
+
+        def on_cycle(event):
+            # The statements and records since the previous cycle, including the flush behind it
+            with lock:
+                cycles.append({
+                    'timings': dict(event.timings),
+                    'overruns': event.overruns,
+                    'statements': statements[0] - previous['statements'],
+                    'records': standin.records_served - previous['records'],
+                    'rss': rss(),
+                    'hot_tier': guardian_angel._hot_tier.memory_usage(),
+                })
+                previous.update(statements=statements[0], records=standin.records_served)
+
+        guardian_angel.bus.subscribe(CycleCompleted, on_cycle)
+        start = time.time()
+        guardian_angel.start_monitoring(args.period)
+        time.sleep(args.duration)
+        guardian_angel.stop_monitoring()
+        time.sleep(1) # The last Discord messages
+        guardian_angel.scheduler.stop()
+        guardian_angel.discord_bot.stop()
+        guardian_angel._storage.flush()
+        messages = list(standin.discord_messages)
+
+    event.remove(Engine, 'before_cursor_execute', count_statement)
+
+    # The first message naming each paraglider, the lines of a cycle are grouped
+    alerted = {}
+    for received, content in messages:
+        for key in re.findall(r'[?&]k=([\w-]+)\)', content):
+            alerted.setdefault(key, received)
+    landings = {key: landing for key, landing in generator.landings.items() if landing < start + args.duration}
+    latencies = [alerted[key] - landing for key, landing in landings.items() if key in alerted]
+    walking = [key for key, kind in generator.kinds.items() if kind == 'walking']
+    flying = [key for key, kind in generator.kinds.items() if kind == 'flying']
+
+    parse_stage = 'parse' if args.ingestion == 'pipeline' else 'ingestion'
+    steady = cycles[1:]
+    durations = [cycle['timings']['cycle'] for cycle in steady]
+    parse_seconds = sum(cycle['timings'].get(parse_stage, 0.0) for cycle in cycles)
+    records = sum(cycle['records'] for cycle in cycles)
+    return {
+        'pilots': pilots,
+        'cycles': len(cycles),
+        'overruns': cycles[-1]['overruns'] if cycles else None,
+        'catch_up': {
+            'seconds': cycles[0]['timings']['cycle'] if cycles else None,
+            'records': cycles[0]['records'] if cycles else None,
+            'statements': cycles[0]['statements'] if cycles else None,
+        },
+        'cycle_seconds': {'p50': percentile(durations, 0.5), 'p90': percentile(durations, 0.9),
+                          'p99': percentile(durations, 0.99), 'max': max(durations, default=None)},
+        'records': records,
+        'records_per_parse_second': records / parse_seconds if parse_seconds else None,
+        'statements_per_cycle': sum(cycle['statements'] for cycle in steady) / len(steady) if steady else None,
+        'rss_bytes': {'peak': max((cycle['rss'] for cycle in cycles), default=None), 'last': cycles[-1]['rss'] if cycles else None},
+        'hot_tier_bytes': cycles[-1]['hot_tier'] if cycles else None,
+        'alerts': {
+            'landings': len(landings),
+            'detected': len([key for key in landings if key in alerted]),
+            'latency_seconds': {'p50': percentile(latencies, 0.5), 'p90': percentile(latencies, 0.9),
+                                'min': min(latencies, default=None), 'max': max(latencies, default=None)},
+            'early': len([latency for latency in latencies if latency < EARLIEST_ALERT]),
+            'walking_alerted': len([key for key in walking if key in alerted]),
+            'flying_alerted': len([key for key in flying if key in alerted]),
+            'messages': len(messages),
+        },
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, path):
+    with open(path) as file:
+        previous = {run['pilots']: run for run in json.load(file)['runs']}
+    print(f"Compared to {path}:")
+    for current in results['runs']:
+        before = previous.get(current['pilots'])
+        if before is None:
+            continue
+        for name, now, then in (
+            ('cycle p50', current['cycle_seconds']['p50'], before['cycle_seconds']['p50']),
+            ('cycle p99', current['cycle_seconds']['p99'], before['cycle_seconds']['p99']),
+            ('catch-up', current['catch_up']['seconds'], before['catch_up']['seconds']),
+            ('records/s', current['records_per_parse_second'], before['records_per_parse_second']),
+            ('statements/cycle', current['statements_per_cycle'], before['statements_per_cycle']),
+            ('peak RSS', current['rss_bytes']['peak'], before['rss_bytes']['peak']),
+            ('alert p50', current['alerts']['latency_seconds']['p50'], before['alerts']['latency_seconds']['p50']),
+        ):
+            if now is not None and then:
+                print(f"  {current['pilots']:5d} pilots {name:17s} {then:12.3f} -> {now:12.3f} ({(now - then) / then * 100:+6.1f} %)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End to end benchmark of GuardianAngel against local PureTrack and Discord stand-ins.")
+    parser.add_argument('sizes', nargs='*', type=int, default=[40, 400, 4000], help="Fleet sizes")
+    parser.add_argument('--duration', type=float, default=420, help="Seconds of monitoring per size")
+    parser.add_argument('--period', type=float, default=10, help="Seconds between two monitoring cycles")
+    parser.add_argument('--history', type=int, default=600, help="Seconds of track before the start")
+    parser.add_argument('--latency', type=float, default=50, help="Milliseconds per stand-in request")
+    parser.add_argument('--latency-per-key', type=float, default=0, help="Additional milliseconds per key of /api/trails")
+    parser.add_argument('--ingestion', default='pipeline', choices=('sync', 'async', 'pipeline'))
+    parser.add_argument('--polling', default='fixed', choices=('fixed', 'adaptive'))
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results', f"end_to_end-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"))
+    parser.add_argument('--compare', help="Results of a previous run")
+    args = parser.parse_args()
+
+    results = {
+        'commit': commit(),
+        'date': datetime.now(timezone.utc).isoformat(),
+        'parameters': {name: value for name, value in vars(args).items() if name not in ('output', 'compare')},
+        'mix': MIX,
+        'runs': [],
+    }
+    context = multiprocessing.get_context('spawn')
+    for size in args.sizes:
+        # One process per size, for its memory
+        with context.Pool(1) as pool:
+            report = pool.apply(run, (size, args))
+        results['runs'].append(report)
+        cycle = report['cycle_seconds']
+        alerts = report['alerts']
+        print(f"{size:5d} pilots: {report['cycles']} cycles ({report['overruns']} skipped), catch-up {report['catch_up']['seconds']:6.2f} s ({report['catch_up']['records']} records), "
+              f"cycle p50 {cycle['p50']:6.3f} s p90 {cycle['p90']:6.3f} s p99 {cycle['p99']:6.3f} s, "
+              f"{report['records_per_parse_second']:8.0f} records/s parsed, {report['statements_per_cycle']:6.1f} SQL statements/cycle, "
+              f"RSS {report['rss_bytes']['peak'] / 2**20:6.1f} MiB, hot tier {report['hot_tier_bytes'] / 2**20:6.1f} MiB, "
+              f"alerts {alerts['detected']}/{alerts['landings']} landings ({alerts['early']} early), latency min {alerts['latency_seconds']['min'] or 0:5.1f} s p50 {alerts['latency_seconds']['p50'] or 0:5.1f} s "
+              f"max {alerts['latency_seconds']['max'] or 0:5.1f} s, {alerts['walking_alerted']} walking, {alerts['flying_alerted']} flying alerted")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+    if early := sum(run['alerts']['early'] for run in results['runs']):
+        print(f"{early} alerts sooner than {EARLIEST_ALERT:.0f} s after the landing, before the detection window")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
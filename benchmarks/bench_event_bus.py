@@ -0,0 +1,101 @@
+"""
+Mass landing: a quarter of the fleet enters Clearance in the same cycle. The former global blinker
+signals, connected once per paraglider, against the EventBus with per-sender subscriptions and
+the batched dispatch of the cycle's events.
+
+Counts the handler calls and the Discord messages, and times the dispatch per event.
+
+Run from the repository root:
+    python benchmarks/bench_event_bus.py [fleet sizes...]
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blinker import Signal
+import discord_api
+from event_bus import EventBus, Clearance, StateChanged
+
+
+class Sender:
+    def __init__(self, index):
+        self.name = f'pilot-{index}'
+
+
+class Receiver:
+    """
+    The GuardianAngel side: a handler per event, one Discord message per Clearance or per batch.
+    """
+    def __init__(self, discord):
+        self.calls = 0
+        self.discord = discord
+
+    # Former blinker handler
+    def on_clearance_signal(self, sender, message):
+        self.calls += 1
+        self.discord.send_message(f"{sender.name} - {message}")
+
+    # EventBus handlers
+    def on_clearance(self, event):
+        self.calls += 1
+
+    def on_clearances(self, events):
+        self.discord.send_messages([f"[{event.sender.name}](https://puretrack.io/?k={event.sender.name}) - {event.message}" for event in events])
+
+
+class Discord(discord_api.DiscordApi):
+    """
+    DiscordApi grouping the lines as it does, counting the messages instead of queuing them.
+    """
+    def __init__(self):
+        self.messages = 0
+
+    def send_message(self, message):
+        self.messages += 1
+
+
+def blinker_cycle(senders, landing):
+    discord = Discord()
+    receiver = Receiver(discord)
+    clearance = Signal()
+    for _ in senders:
+        clearance.connect(receiver.on_clearance_signal) # Once per paraglider, as add_paraglider did
+    start = time.perf_counter()
+    for sender in landing:
+        clearance.send(sender, message="clearance!")
+    return time.perf_counter() - start, receiver.calls, discord.messages
+
+
+def bus_cycle(senders, landing):
+    discord = Discord()
+    receiver = Receiver(discord)
+    bus = EventBus()
+    bus.subscribe_batch(receiver.on_clearances, (Clearance,))
+    for sender in senders:
+        bus.subscribe(Clearance, receiver.on_clearance, sender=sender)
+    start = time.perf_counter()
+    with bus.batch():
+        for sender in landing:
+            # A state change and a clearance per paraglider, as Paraglider publishes them
+            bus.publish(StateChanged(sender, 'Flying', 'Clearance'))
+            bus.publish(Clearance(sender, "clearance!"))
+    return time.perf_counter() - start, receiver.calls, discord.messages
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [40, 400, 4000]
+    logging.disable(logging.INFO)
+    for size in sizes:
+        senders = [Sender(index) for index in range(size)]
+        landing = senders[::4]
+        for name, cycle in (('blinker', blinker_cycle), ('EventBus', bus_cycle)):
+            elapsed, calls, messages = min((cycle(senders, landing) for _ in range(5)), key=lambda result: result[0])
+            print(f"{name:8s} {size:5d} pilots, {len(landing):4d} clearances: {elapsed / len(landing) * 1e6:6.2f} us per clearance, "
+                  f"{calls:4d} handler calls, {messages:4d} Discord messages")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+State evaluation queries of a monitoring cycle: get_last_paraglider_state and calculate_average_speed
+for each pilot (2N queries) against the single get_fleet_state query.
+
+Run from the repository root:
+    python benchmarks/bench_fleet_state.py [pilots] [hours]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+
+
+def populate(session, pilots, hours, period=5):
+    now = datetime.now(timezone.utc)
+    count = int(hours * 3600 / period)
+    for pilot in range(pilots):
+        points = [
+            {'datetime': now - timedelta(seconds=period * i), 'lat': 44.9 + i * 1e-5, 'lon': 5.2, 'alt_gps': 1500.0,
+             'course': 90.0, 'speed': 9.5 - (i % 10), 'alt_gnd_calc': 600.0}
+            for i in range(count)
+        ]
+        db.insert_paraglider_points(session, {f'X-{pilot:04d}': points})
+    session.commit()
+    return pilots * count
+
+
+def per_pilot(session, keys):
+    states = {}
+    for key in keys:
+        last_state = db.get_last_paraglider_state(session, key)
+        states[key] = (last_state.speed, db.calculate_average_speed(session, key, minutes=5))
+    return states
+
+
+def fleet(session, keys):
+    fleet_state = db.get_fleet_state(session, keys, minutes=5)
+    return {key: (fleet_state[key]['speed'], fleet_state[key]['avg_speed']) for key in keys}
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    hours = float(sys.argv[2]) if len(sys.argv) > 2 else 6
+    keys = [f'X-{pilot:04d}' for pilot in range(pilots)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db_engine({'url': f'sqlite:///{tmp}/fleet.db'})
+        session = db.SessionLocal()
+        rows = populate(session, pilots, hours)
+        print(f"{pilots} pilots, {rows} rows")
+        results = {}
+        for name, evaluate in (('2N queries', per_pilot), ('get_fleet_state', fleet)):
+            best = float('inf')
+            for _ in range(5):
+                start = time.perf_counter()
+                results[name] = evaluate(session, keys)
+                best = min(best, time.perf_counter() - start)
+            print(f"{name:16s}: {best * 1000:8.1f} ms")
+        assert results['2N queries'] == results['get_fleet_state']
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+State evaluation of a monitoring cycle read from the hot tier against database.get_fleet_state,
+and the memory used by the hot tier.
+
+Run from the repository root:
+    python benchmarks/bench_hot_tier.py [pilots] [minutes]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+from hot_tier import HotTier
+
+
+def make_points(count, period=5):
+    now = int(datetime.now(timezone.utc).timestamp())
+    points = []
+    for i in range(count):
+        timestamp = now - period * i
+        points.append({'timestamp': timestamp, 'datetime': datetime.fromtimestamp(timestamp, timezone.utc),
+                       'lat': 44.9 + i * 1e-5, 'lon': 5.2, 'alt_gps': 1500.0, 'course': 90.0,
+                       'speed': 9.5 - (i % 10), 'alt_gnd_calc': 600.0})
+    return points
+
+
+def best_of(function, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    minutes = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    keys = [f'X-{pilot:04d}' for pilot in range(pilots)]
+    points = make_points(minutes * 60 // 5)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db_engine({'url': f'sqlite:///{tmp}/hot.db'})
+        session = db.SessionLocal()
+        hot_tier = HotTier({})
+        start = time.perf_counter()
+        for key in keys:
+            hot_tier.add_points(key, points)
+        add_time = time.perf_counter() - start
+        db.insert_paraglider_points(session, {key: points for key in keys})
+        session.commit()
+        print(f"{pilots} pilots, {len(points)} points each")
+        print(f"hot tier add_points      : {add_time * 1000:8.1f} ms, {hot_tier.memory_usage() / 1024:.0f} KiB")
+
+        sql_time, sql_state = best_of(lambda: db.get_fleet_state(session, keys, minutes=5))
+        hot_time, hot_state = best_of(lambda: hot_tier.get_fleet_state(keys, minutes=5))
+        print(f"database.get_fleet_state : {sql_time * 1000:8.1f} ms")
+        print(f"HotTier.get_fleet_state  : {hot_time * 1000:8.1f} ms")
+        for state in hot_state.values():
+            del state['statistics'] # Not computed by the database
+        assert sql_state == hot_state
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
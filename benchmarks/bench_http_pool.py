@@ -0,0 +1,51 @@
+"""
+Per-request latency of /api/trails calls against a local stand-in server,
+with a new connection per call (bare requests.post) and with the pooled,
+keep-alive HttpClient.
+
+Run from the repository root:
+    python benchmarks/bench_http_pool.py [requests]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+from http_client import HttpClient
+from puretrack_standin import PureTrackStandIn
+
+
+def measure(post, url, count):
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        response = post(url, json=[{'id': f'X-{i % 40:04d}', 'from': 0}], params={'limit': 10}, timeout=10)
+        response.raise_for_status()
+        response.json()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{name:10s}: mean {statistics.mean(latencies)*1000:6.2f} ms, p50 {p50:6.2f} ms, p95 {p95:6.2f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with PureTrackStandIn(latency=0.0, points_per_key=10) as standin:
+        url = f'{standin.url}/api/trails'
+        report('no pool', measure(requests.post, url, count))
+        client = HttpClient()
+        report('pooled', measure(client.post, url, count))
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Duration of the ingestion part of a monitoring cycle (fetch, parse, store) with the
+synchronous path and with the AsyncIngestionEngine, against a local stand-in server.
+
+Run from the repository root:
+    python benchmarks/bench_ingestion.py [pilots] [latency_ms] [latency_per_key_ms]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord_api
+import puretrack_api as ptrk
+from guardian_angel import GuardianAngel
+from puretrack_standin import PureTrackStandIn
+
+
+def build_guardian_angel(pilots, mode, db_url):
+    cfg = {
+        'paragliders': [{'name': f'pilot-{i}', 'puretrack_key': f'X-{i:04d}'} for i in range(pilots)],
+        'puretrack_site': {'group': 'bench'},
+        'discord_bot': {},
+        'ingestion': {'mode': mode, 'concurrency': 8, 'chunk_size': 25, 'deadline': 25},
+        'http_client': {'pool_maxsize': 8},
+        'database': {'url': db_url},
+    }
+    guardian_angel = GuardianAngel(cfg)
+    guardian_angel.stop_monitoring()
+    return guardian_angel
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 100.0) / 1000
+    latency_per_key = (float(sys.argv[3]) if len(sys.argv) > 3 else 5.0) / 1000
+    logging.getLogger().setLevel(logging.WARNING)
+    discord_api.DiscordApi._send_message_to_discord = lambda self, message: None
+
+    with tempfile.TemporaryDirectory() as tmp, PureTrackStandIn(latency, 20, latency_per_key) as standin:
+        ptrk.PURETRACK_URL = standin.url
+        for mode in ('sync', 'async'):
+            guardian_angel = build_guardian_angel(pilots, mode, f'sqlite:///{tmp}/{mode}.db')
+            keys = list(guardian_angel._paragliders)
+            start = time.perf_counter()
+            if mode == 'async':
+                guardian_angel._ingestion.run_cycle(keys, {}, guardian_angel._store_points)
+            else:
+                tracks = ptrk.get_puretrack_tails_batch(keys, ptrk.TRAILS_CATCHUP_LIMIT, client=guardian_angel.http_client)
+                for key, track in tracks.items():
+                    if points := guardian_angel._parse_track(track):
+                        guardian_angel._store_points(key, points)
+            guardian_angel._flush_points()
+            guardian_angel._storage.flush()
+            elapsed = time.perf_counter() - start
+            print(f"{mode:5s}: {pilots} pilots, {len(guardian_angel._cursors)} stored, ingestion {elapsed:6.2f} s")
+
+    # Paraglider timers are not daemon threads
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
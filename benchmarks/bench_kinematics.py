@@ -0,0 +1,72 @@
+"""
+Kinematics of a trail and of a fleet: scalar point pair loop (previous implementation)
+against the vectorized kinematics.track_kinematics.
+
+Run from the repository root:
+    python benchmarks/bench_kinematics.py [points] [pilots]
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import kinematics
+
+
+def scalar_speeds(timestamps, lats, lons):
+    speeds = [0.0]
+    for i in range(1, len(timestamps)):
+        lat1, lon1, lat2, lon2 = map(math.radians, [lats[i - 1], lons[i - 1], lats[i], lons[i]])
+        a = math.sin((lat2 - lat1) / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2)**2
+        distance = 2 * math.asin(math.sqrt(a)) * 6371000
+        dt = timestamps[i] - timestamps[i - 1]
+        speeds.append(distance / dt if dt > 0 else 0)
+    return speeds
+
+
+def timed(name, count, function, repeat=5):
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    print(f"{name:32s}: {elapsed*1000:8.2f} ms, {count / elapsed:12.0f} points/s")
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 14000
+    pilots = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    rng = np.random.default_rng(0)
+    timestamps = np.arange(points) * 5.0
+    lats = 44.9 + np.cumsum(rng.normal(0, 1e-4, points))
+    lons = 5.2 + np.cumsum(rng.normal(0, 1e-4, points))
+    alts = 1500 + np.cumsum(rng.normal(0, 1, points))
+
+    print(f"Trail of {points} points")
+    ts_list, lat_list, lon_list = timestamps.tolist(), lats.tolist(), lons.tolist()
+    timed('scalar loop', points, lambda: scalar_speeds(ts_list, lat_list, lon_list))
+    timed('vectorized, haversine', points, lambda: kinematics.track_kinematics(timestamps, lats, lons, alts))
+    timed('vectorized, equirectangular', points, lambda: kinematics.track_kinematics(timestamps, lats, lons, alts, fast=True))
+
+    exact = kinematics.track_kinematics(timestamps, lats, lons)['distance']
+    fast = kinematics.track_kinematics(timestamps, lats, lons, fast=True)['distance']
+    print(f"equirectangular max error: {np.max(np.abs(fast - exact)) * 1000:.3g} mm")
+
+    timed('distance only, haversine', points, lambda: kinematics.haversine(lats[:-1], lons[:-1], lats[1:], lons[1:]))
+    timed('distance only, equirectangular', points, lambda: kinematics.equirectangular(lats[:-1], lons[:-1], lats[1:], lons[1:]))
+
+    per_pilot = 60
+    groups = np.repeat(np.arange(pilots), per_pilot)
+    fleet_ts = np.tile(np.arange(per_pilot) * 5.0, pilots)
+    fleet_lats = 44.9 + np.cumsum(rng.normal(0, 1e-4, len(groups)))
+    fleet_lons = 5.2 + np.cumsum(rng.normal(0, 1e-4, len(groups)))
+    print(f"Fleet of {pilots} pilots x {per_pilot} points")
+    timed('vectorized fleet + averages', len(groups), lambda: kinematics.time_weighted_average(
+        fleet_ts, kinematics.track_kinematics(fleet_ts, fleet_lats, fleet_lons, groups=groups)['ground_speed'], groups=groups))
+
+
+if __name__ == '__main__':
+    main()
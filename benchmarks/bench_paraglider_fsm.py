@@ -0,0 +1,113 @@
+"""
+Creation of the paragliders and cost of their triggers: the former transitions.Machine built for every
+paraglider, against the StateMachine compiled once and the __slots__ Paraglider.
+
+Run from the repository root:
+    python benchmarks/bench_paraglider_fsm.py [pilots] [triggers]
+"""
+import gc
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paraglider import Paraglider
+from scheduler import TimerWheel
+
+
+class LegacyParaglider:
+    """
+    The former Paraglider: the same actions and conditions, a transitions.Machine per paraglider.
+    """
+    def __init__(self, cfg, scheduler):
+        from transitions import Machine
+        self.puretrack_key = cfg.get('puretrack_key')
+        self.configure(cfg)
+        self._last_datetime = None
+        self._coordinates = (0.0, 0.0)
+        self._course = 0.0
+        self._altitude_gnd_calc = 0.0
+        self._speed = 0.0
+        self._avg_speed = 0.0
+        self._statistics = {}
+        self._logger = logging.getLogger(self.name)
+        self._machine = Machine(model=self, states=Paraglider.states, initial='Initial', ignore_invalid_triggers=True)
+        self._scheduler = scheduler
+        self._timer = None
+        for transition in Paraglider.machine.transitions:
+            self._machine.add_transition(**transition)
+        self.init()
+
+for name in ('configure', 'on_enter_Unknown', 'on_enter_Clearance', 'on_exit_Clearance', 'on_enter_Alert',
+             'on_exit_Alert', 'is_flying', 'arm_timer', 'cancel_timer', 'alert', 'clearance'):
+    setattr(LegacyParaglider, name, Paraglider.__dict__[name])
+
+
+def create(model_class, pilots, scheduler):
+    start = time.perf_counter()
+    paragliders = [model_class({'name': f'pilot-{i}', 'puretrack_key': f'X-{i:05d}'}, scheduler) for i in range(pilots)]
+    return paragliders, time.perf_counter() - start
+
+
+def memory_per_pilot(model_class, pilots, scheduler):
+    # Measured apart, on fewer paragliders, as tracing slows the creation down
+    gc.collect()
+    tracemalloc.start()
+    paragliders = create(model_class, pilots, scheduler)[0]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    for paraglider in paragliders:
+        paraglider.cancel_timer()
+    return memory / pilots
+
+
+def apply_triggers(paragliders, count):
+    random.seed(1)
+    triggers = list(Paraglider.machine.triggers)
+    plan = [(random.choice(paragliders), random.choice(triggers), random.random() < 0.5) for _ in range(count)]
+    start = time.perf_counter()
+    for paraglider, trigger, fast in plan:
+        paraglider._speed = 5.0 if fast else 0.0
+        getattr(paraglider, trigger)()
+    return time.perf_counter() - start
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    logging.disable(logging.CRITICAL)
+    scheduler = TimerWheel()
+    # The loggers of the paragliders exist before, in both cases
+    for i in range(pilots):
+        logging.getLogger(f'pilot-{i}')
+
+    models = [('Paraglider', Paraglider)]
+    try:
+        import transitions # noqa: F401
+        models.insert(0, ('transitions', LegacyParaglider))
+    except ImportError:
+        print("transitions not installed, the former state machine is skipped")
+
+    for name, model_class in models:
+        memory = memory_per_pilot(model_class, min(pilots, 1000), scheduler)
+        paragliders, elapsed = create(model_class, pilots, scheduler)
+        # The timers of the paragliders in Clearance, armed at creation, are not part of the triggers
+        trigger_time = apply_triggers(paragliders, count)
+        states = {}
+        for paraglider in paragliders:
+            states[paraglider.state] = states.get(paraglider.state, 0) + 1
+        print(f"{name:11s}: {pilots} pilots created in {elapsed:6.2f} s ({elapsed / pilots * 1e6:6.1f} us, "
+              f"{memory:6.0f} B per pilot), {count} triggers in {trigger_time:5.2f} s "
+              f"({trigger_time / count * 1e6:4.2f} us per trigger), {sorted(states.items())}")
+        for paraglider in paragliders:
+            paraglider.cancel_timer()
+        del paragliders
+    scheduler.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Micro-benchmark of the PureTrack record parser, in records per second.
+
+Run from the repository root:
+    python benchmarks/bench_parser.py [records]
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import puretrack_api as ptrk
+from puretrack_standin import make_trail
+
+
+def rate(parse, records, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(records)
+        best = min(best, time.perf_counter() - start)
+    return len(records) / best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 14000
+    logging.getLogger().setLevel(logging.WARNING)
+    # A typical xcontest record, with the fields the monitoring doesn't use
+    records = [record + ',Ovtest,Bpilot,Npilot,cred,i123,D0ABC,jX-key' for record in make_trail('X-0001', count)]
+
+    benchmarks = (
+        ('record by record, all fields', lambda records: [ptrk.parse_puretrack_record(record) for record in records]),
+        ('batch, all fields', lambda records: ptrk.parse_puretrack_records(records, fields=None)),
+        ('batch, TRACK_FIELDS', lambda records: ptrk.parse_puretrack_records(records)),
+    )
+    for name, parse in benchmarks:
+        print(f"{name:30s}: {rate(parse, records):10.0f} records/s")
+
+
+if __name__ == '__main__':
+    main()
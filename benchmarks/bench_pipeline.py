@@ -0,0 +1,117 @@
+"""
+Monitoring cycle with the ingestion stages one after another ('sync'), with the AsyncIngestionEngine
+('async') and with the staged pipeline ('pipeline'), against a local stand-in server, with the
+per-stage timings of each cycle.
+
+Then the period of the monitoring: the timer re-armed after each cycle, as before, against the
+fixed-rate PeriodicTimer, with cycles of varying duration and a few overruns.
+
+Run from the repository root:
+    python benchmarks/bench_pipeline.py [pilots] [latency_ms] [latency_per_key_ms]
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord_api
+import puretrack_api as ptrk
+from guardian_angel import GuardianAngel
+from puretrack_standin import PureTrackStandIn
+from scheduler import TimerWheel, PeriodicTimer
+
+PERIOD = 0.5 # Seconds, period of the timer benchmark
+RUNS = 40
+
+
+def build_guardian_angel(pilots, mode, db_url):
+    cfg = {
+        'paragliders': [{'name': f'pilot-{i}', 'puretrack_key': f'X-{i:04d}'} for i in range(pilots)],
+        'puretrack_site': {'group': 'bench'},
+        'discord_bot': {},
+        'ingestion': {'mode': mode, 'concurrency': 8, 'chunk_size': 25, 'queue_size': 4},
+        'http_client': {'pool_maxsize': 8},
+        'database': {'url': db_url},
+    }
+    guardian_angel = GuardianAngel(cfg)
+    guardian_angel.stop_monitoring()
+    return guardian_angel
+
+
+def cycle_durations():
+    """
+    Durations of the cycles: 20 to 80 % of the period, and one in ten 2.1 periods (an overrun).
+    """
+    random.seed(2)
+    durations = []
+    for run in range(RUNS):
+        durations.append(PERIOD * (2.1 if run % 10 == 9 else random.uniform(0.2, 0.8)))
+    return durations
+
+
+def timer_periods(periodic):
+    """
+    Returns:
+        tuple: The start times of the runs relative to the first one, and the number of skipped runs.
+    """
+    scheduler = TimerWheel({'resolution': 0.01})
+    durations = iter(cycle_durations())
+    starts = []
+    state = {}
+
+    def cycle():
+        starts.append(time.monotonic())
+        time.sleep(next(durations, 0))
+        if len(starts) == RUNS:
+            state['timer'].cancel()
+
+    def rearmed_cycle():
+        # The former _update_states: the timer restarted once the cycle is done
+        try:
+            cycle()
+        finally:
+            if len(starts) < RUNS:
+                state['timer'] = scheduler.schedule(PERIOD, rearmed_cycle)
+
+    if periodic:
+        state['timer'] = PeriodicTimer(scheduler, PERIOD, cycle)
+        state['timer'].start()
+    else:
+        state['timer'] = scheduler.schedule(PERIOD, rearmed_cycle)
+    while len(starts) < RUNS:
+        time.sleep(PERIOD)
+    scheduler.stop()
+    return [start - starts[0] for start in starts], state['timer'].overruns if periodic else 0
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 100.0) / 1000
+    latency_per_key = (float(sys.argv[3]) if len(sys.argv) > 3 else 5.0) / 1000
+    logging.getLogger().setLevel(logging.WARNING)
+    discord_api.DiscordApi._send_message_to_discord = lambda self, message: None
+
+    with tempfile.TemporaryDirectory() as tmp, PureTrackStandIn(latency, 20, latency_per_key) as standin:
+        ptrk.PURETRACK_URL = standin.url
+        for mode in ('sync', 'async', 'pipeline'):
+            guardian_angel = build_guardian_angel(pilots, mode, f'sqlite:///{tmp}/{mode}.db')
+            for cycle in ('catch-up', 'incremental'):
+                guardian_angel.update_states_from_tracking(30)
+                guardian_angel._storage.flush()
+                timings = ', '.join(f"{stage} {seconds * 1000:.0f}" for stage, seconds in guardian_angel.last_timings.items())
+                print(f"{mode:8s} {cycle:11s}: {pilots} pilots, cycle {guardian_angel.last_timings['cycle']:5.2f} s ({timings} ms)")
+
+    for name, periodic in (('re-armed', False), ('fixed rate', True)):
+        starts, overruns = timer_periods(periodic)
+        print(f"{name:10s}: {RUNS} cycles of period {PERIOD} s in {starts[-1]:5.2f} s, mean period {starts[-1] / (RUNS - 1):.3f} s, "
+              f"max offset from the {PERIOD} s grid {max(abs(start - round(start / PERIOD) * PERIOD) for start in starts) * 1000:5.1f} ms, "
+              f"{overruns} runs skipped")
+
+
+if __name__ == '__main__':
+    main()
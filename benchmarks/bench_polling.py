@@ -0,0 +1,111 @@
+"""
+An hour of a fleet, on a simulated clock: every paraglider polled every 30 s, as before, against the
+adaptive PollingCadence ticking every 5 s with a budget of 60 and of 240 requests per minute.
+
+A fifth of the fleet flies, the rest is landed, a tenth of it disconnected. During the hour, every
+flying paraglider lands or loses its connection and one landed paraglider in ten takes off. A change
+is detected at the first poll of the paraglider after it. Counts the /api/trails requests and the
+delay of the detections, and the delay of the re-poll after a suspicious transition.
+
+Run from the repository root:
+    python benchmarks/bench_polling.py [fleet sizes...]
+"""
+import logging
+import math
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_bus import StateChanged
+from polling import PollingCadence, SUSPICIOUS_STATES
+
+HOUR = 3600
+FIXED_PERIOD = 30
+CHUNK_SIZE = 25
+
+
+class Pilot:
+    """
+    The part of a Paraglider read by the cadence, with the change it will go through.
+    """
+    def __init__(self, index, state, avg_speed):
+        self.puretrack_key = f'X-{index:04d}'
+        self.state = state
+        self.avg_speed = avg_speed
+        self.change = None # (time, state, avg_speed)
+
+
+def fleet(size):
+    random.seed(3)
+    pilots = []
+    for index in range(size):
+        draw = random.random()
+        if draw < 0.2:
+            pilot = Pilot(index, 'Flying', 8.0)
+            pilot.change = (random.uniform(0, HOUR), 'Clearance' if random.random() < 0.8 else 'Disconnected', 0.0)
+        elif draw < 0.28:
+            pilot = Pilot(index, 'Disconnected', 0.0)
+        else:
+            pilot = Pilot(index, 'Landed', 0.0)
+            if random.random() < 0.1:
+                pilot.change = (random.uniform(0, HOUR), 'Flying', 8.0)
+        pilots.append(pilot)
+    return pilots
+
+
+def poll(pilot, now, delays, cadence=None):
+    # The change of the paraglider, if it happened, is detected by this poll
+    if pilot.change is not None and pilot.change[0] <= now:
+        happened, state, avg_speed = pilot.change
+        source, pilot.state, pilot.avg_speed, pilot.change = pilot.state, state, avg_speed, None
+        delays.setdefault(f'{source}->{state}', []).append(now - happened)
+        if cadence is not None:
+            cadence.on_state_changed(StateChanged(pilot, source, state))
+        return state in SUSPICIOUS_STATES
+    return False
+
+
+def fixed(pilots):
+    delays = {}
+    requests = 0
+    for tick in range(0, HOUR, FIXED_PERIOD):
+        requests += math.ceil(len(pilots) / CHUNK_SIZE)
+        for pilot in pilots:
+            poll(pilot, tick, delays)
+    return requests, len(pilots) * (HOUR // FIXED_PERIOD), 0, delays, []
+
+
+def adaptive(pilots, requests_per_minute):
+    cadence = PollingCadence({'tick': 5, 'requests_per_minute': requests_per_minute})
+    paragliders = {pilot.puretrack_key: pilot for pilot in pilots}
+    delays = {}
+    suspicious = {} # Time of the detection of a suspicious transition, by key
+    repolls = []
+    for tick in range(0, HOUR, cadence.tick):
+        for key in cadence.select(paragliders, CHUNK_SIZE, now=tick):
+            if key in suspicious:
+                repolls.append(tick - suspicious.pop(key))
+            if poll(paragliders[key], tick, delays, cadence):
+                suspicious[key] = tick
+    return cadence.requests, cadence.polls, cadence.deferred, delays, repolls
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [40, 400, 4000]
+    logging.disable(logging.WARNING)
+    for size in sizes:
+        for name, run in (('fixed', fixed), ('60 rpm', lambda pilots: adaptive(pilots, 60)), ('240 rpm', lambda pilots: adaptive(pilots, 240))):
+            requests, polls, deferred, delays, repolls = run(fleet(size))
+            detections = ', '.join(
+                f"{change} {statistics.mean(values):5.1f}/{max(values):4.0f} s"
+                for change, values in sorted(delays.items())
+            )
+            print(f"{name:8s} {size:5d} pilots: {requests:5d} requests/h, {polls:7d} polls/h, {deferred:7d} deferred, detection mean/max: {detections}"
+                  + (f", re-poll after a suspicious transition {statistics.mean(repolls):4.1f} s" if repolls else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Replay of a synthetic 21 h event on the virtual clock, as fast as the CPU allows: every paraglider
+takes off in the morning and flies 2 to 6 hours, tracked every 5 s from 10 minutes before its takeoff
+to 10 minutes after its landing. One in twenty loses its signal while flying, one in thirty flies a
+leg above 60 km/h.
+
+Reports the throughput in simulated pilot-hours per wall-second and the transitions, alerts and
+Discord messages of the replay, with every paraglider polled every 30 s and with the adaptive cadence.
+Then the time to load the same tracks from IGC files.
+
+Run from the repository root:
+    python benchmarks/bench_replay.py [fleet sizes...]
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay import RecordedTrack, Replay, load_igc
+
+START = 1751342400 # 2025-07-01 04:00 UTC
+HOURS = 21
+PERIOD = 5 # Seconds between two fixes
+GROUND_LEVEL = 900
+
+
+def flight(index):
+    """
+    Returns:
+        RecordedTrack: The track of a paraglider, heading north at 9 m/s, or 20 m/s on a fast leg.
+    """
+    key = f'X-{index:04d}'
+    takeoff = START + random.randint(1, 8) * 3600 + random.randint(0, 3599)
+    landing = takeoff + random.randint(2 * 3600, 6 * 3600)
+    lost = random.random() < 1 / 20
+    fast = (takeoff + 3600, takeoff + 4200) if random.random() < 1 / 30 else None
+    end = min(takeoff + (landing - takeoff) // 2 if lost else landing + 600, START + HOURS * 3600)
+    timestamps, lats, lons, alts = [], [], [], []
+    lat, lon = 45.0 + index * 1e-3, 6.0
+    for timestamp in range(takeoff - 600, end, PERIOD):
+        flying = takeoff <= timestamp < landing
+        if flying:
+            speed = 20 if fast and fast[0] <= timestamp < fast[1] else 9
+            lat += speed * PERIOD / 111000
+        timestamps.append(timestamp)
+        lats.append(lat)
+        lons.append(lon)
+        alts.append(GROUND_LEVEL + 1100 if flying else GROUND_LEVEL)
+    return RecordedTrack(key, timestamps, lats, lons, alts, [GROUND_LEVEL] * len(timestamps), name=f'pilot-{index}')
+
+
+def write_igc(track, directory):
+    path = os.path.join(directory, f'{track.puretrack_key}.igc')
+    with open(path, 'w', newline='') as file:
+        file.write(f"AXXXBench\r\nHFDTEDATE:{datetime.fromtimestamp(track.start, timezone.utc):%d%m%y},01\r\nHFPLTPILOTINCHARGE:{track.name}\r\n")
+        for timestamp, lat, lon, alt, *_ in track._columns:
+            moment = datetime.fromtimestamp(timestamp, timezone.utc)
+            lat_minutes = round(lat * 60000)
+            lon_minutes = round(lon * 60000)
+            file.write(f"B{moment:%H%M%S}{lat_minutes // 60000:02d}{lat_minutes % 60000:05d}N"
+                       f"{lon_minutes // 60000:03d}{lon_minutes % 60000:05d}EA00000{round(alt):05d}\r\n")
+    return path
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [40, 400]
+    logging.disable(logging.WARNING)
+    for size in sizes:
+        random.seed(4)
+        tracks = [flight(index) for index in range(size)]
+        points = sum(len(track) for track in tracks)
+        for polling in ('fixed', 'adaptive'):
+            report = Replay(tracks, {'polling': {'mode': polling}}).run(start=START, end=START + HOURS * 3600)
+            events = Counter(entry['event'] for entry in report['log'])
+            transitions = Counter(f"{entry['source']}->{entry['dest']}" for entry in report['log'] if entry['event'] == 'StateChanged')
+            print(f"{polling:8s} {size:4d} pilots, {HOURS} h, {points} points: {report['wall_seconds']:6.1f} s, "
+                  f"{report['pilot_hours_per_second']:6.1f} pilot-hours/s, {points / report['wall_seconds']:7.0f} points/s, {report['cycles']} cycles, "
+                  f"{events['StateChanged']} transitions ({', '.join(f'{name} {count}' for name, count in sorted(transitions.items()))}), "
+                  f"{events['Alert']} alerts, {events['Clearance']} clearances, {len(report['messages'])} Discord messages")
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [write_igc(track, directory) for track in tracks]
+            start = time.perf_counter()
+            loaded = [load_igc(path) for path in paths]
+            elapsed = time.perf_counter() - start
+        assert sum(len(track) for track in loaded) == points
+        print(f"IGC      {size:4d} files, {points} B records loaded in {elapsed:5.2f} s, {points / elapsed:7.0f} records/s")
+
+
+if __name__ == '__main__':
+    main()
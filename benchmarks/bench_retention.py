@@ -0,0 +1,86 @@
+"""
+Purge of the points older than 48 h: the former purge_old_data on every cycle without the datetime index,
+against the chunked purge of Retention through the datetime index.
+
+Run from the repository root:
+    python benchmarks/bench_retention.py [pilots] [hours] [period]
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+import database as db
+from retention import Retention
+from storage import SqlStorage
+
+
+def populate(url, pilots, hours, period):
+    db.init_db_engine({'url': url})
+    session = db.SessionLocal()
+    now = datetime.now(timezone.utc)
+    count = int(hours * 3600 / period)
+    for pilot in range(pilots):
+        points = [{'datetime': now - timedelta(seconds=period * i), 'lat': 44.9, 'lon': 5.2, 'speed': 9.5}
+                  for i in range(count)]
+        db.insert_paraglider_points(session, {f'X-{pilot:04d}': points})
+        session.commit()
+    # Everything in the database file, to copy it
+    session.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    session.close()
+    return pilots * count
+
+
+def timed_purge():
+    session = db.SessionLocal()
+    start = time.perf_counter()
+    count = db.purge_old_data(session)
+    elapsed = time.perf_counter() - start
+    session.close()
+    return count, elapsed
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    hours = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    period = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = populate(f'sqlite:///{tmp}/base.db', pilots, hours, period)
+        print(f"{pilots} pilots, {rows} rows over {hours} h")
+
+        # Former purge: every cycle, no index on datetime
+        shutil.copy(f'{tmp}/base.db', f'{tmp}/old.db')
+        db.init_db_engine({'url': f'sqlite:///{tmp}/old.db'})
+        with db.SessionLocal() as session:
+            session.execute(text("DROP INDEX ix_paraglider_data_datetime"))
+            session.commit()
+        count, first = timed_purge()
+        _, steady = timed_purge()
+        print(f"purge_old_data, no index : {count} rows in {first * 1000:.1f} ms (one transaction), "
+              f"then {steady * 1000:.1f} ms every cycle")
+
+        # Retention: chunks through the index, every 15 min
+        for chunk_size in (1000, 5000):
+            shutil.copy(f'{tmp}/base.db', f'{tmp}/new-{chunk_size}.db')
+            storage = SqlStorage({'url': f'sqlite:///{tmp}/new-{chunk_size}.db'})
+            retention = Retention({'chunk_size': chunk_size}, storage)
+            retention.start()
+            storage.flush()
+            report = retention.last_report
+            print(f"Retention, chunks of {chunk_size:5d}: {report['rows']} rows in {report['chunks']} chunks, "
+                  f"{report['elapsed'] * 1000:.1f} ms writing, {report['elapsed'] / report['chunks'] * 1000:.1f} ms per chunk")
+            retention.start()
+            storage.flush()
+            print(f"Retention, nothing left to purge : {retention.last_report['elapsed'] * 1000:.2f} ms")
+            storage.close()
+
+
+if __name__ == '__main__':
+    main()
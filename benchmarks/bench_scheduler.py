@@ -0,0 +1,104 @@
+"""
+Arming, cancelling and firing timers: one threading.Timer thread per timer, as the paragliders did,
+against the single-thread TimerWheel. Checks that every timer fires once, never early, and that
+the cancelled ones never fire. The memory of the threads' stacks is not counted.
+
+Run from the repository root:
+    python benchmarks/bench_scheduler.py [timers] [thread_timers]
+"""
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import TimerWheel
+
+DELAY = 5.0 # Seconds, the timers fire between DELAY and 2 * DELAY, after all are armed
+
+
+def run(arm, count):
+    """
+    Arm `count` timers, cancel one in four and wait for the others.
+
+    Returns:
+        dict: The arm and cancel times, the threads and memory used, and the lateness of the timers.
+    """
+    random.seed(1)
+    delays = [DELAY + random.random() * DELAY for _ in range(count)]
+    fired = [None] * count
+    done = threading.Semaphore(0)
+
+    def fire(index, deadline):
+        fired[index] = time.monotonic() - deadline
+        done.release()
+
+    start = time.perf_counter()
+    handles = []
+    for index, delay in enumerate(delays):
+        handles.append(arm(delay, fire, index, time.monotonic() + delay))
+    arm_time = time.perf_counter() - start
+    threads = threading.active_count()
+
+    start = time.perf_counter()
+    cancelled = set(range(0, count, 4))
+    for index in cancelled:
+        handles[index].cancel()
+    cancel_time = time.perf_counter() - start
+
+    for _ in range(count - len(cancelled)):
+        if not done.acquire(timeout=4 * DELAY):
+            break # A timer missed, or a cancelled one fired as the arming was slower than DELAY
+    time.sleep(0.2) # A cancelled timer firing late would be seen
+    lateness = sorted(fired[index] for index in range(count) if index not in cancelled and fired[index] is not None)
+    return {
+        'arm': arm_time, 'cancel': cancel_time, 'threads': threads, 'memory': memory(arm, count),
+        'cancelled_fired': sum(fired[index] is not None for index in cancelled),
+        'missed': count - len(cancelled) - len(lateness),
+        'early': sum(late < 0 for late in lateness),
+        'p50': lateness[len(lateness) // 2], 'max': lateness[-1]
+    }
+
+
+def memory(arm, count):
+    # Python memory of armed timers, measured apart as tracing slows the arming down
+    tracemalloc.start()
+    handles = [arm(3600, print) for _ in range(count)]
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    for handle in handles:
+        handle.cancel()
+    return used
+
+
+def thread_timer(delay, callback, *args):
+    timer = threading.Timer(delay, callback, args=args)
+    timer.start()
+    return timer
+
+
+def report(name, count, result):
+    print(f"{name:14s} {count:6d} timers: arm {result['arm'] / count * 1e6:7.1f} us, "
+          f"cancel {result['cancel'] / (count // 4) * 1e6:6.1f} us, {result['threads']:5d} threads, "
+          f"{result['memory'] / count:6.0f} B/timer, lateness p50 {result['p50'] * 1000:5.1f} ms "
+          f"max {result['max'] * 1000:6.1f} ms, missed {result['missed']}, early {result['early']}, cancelled fired {result['cancelled_fired']}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    thread_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    wheel = TimerWheel({'resolution': 0.1})
+    result = run(wheel.schedule, count)
+    report('TimerWheel', count, result)
+    assert result['missed'] == result['early'] == result['cancelled_fired'] == len(wheel) == 0
+    wheel.stop()
+
+    report('threading.Timer', thread_count, run(thread_timer, thread_count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+PureTrack requests per monitoring cycle in 'trails' and 'snapshot' polling modes,
+against a local stand-in server whose pilots are all flying.
+
+Run from the repository root:
+    python benchmarks/bench_snapshot.py [pilots] [cycles]
+"""
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord_api
+import puretrack_api as ptrk
+from guardian_angel import GuardianAngel
+from puretrack_standin import PureTrackStandIn
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    cycles = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    logging.disable(logging.WARNING)
+    discord_api.DiscordApi._send_message_to_discord = lambda self, message: None
+    keys = [f'X-{i:04d}' for i in range(pilots)]
+
+    with tempfile.TemporaryDirectory() as tmp, PureTrackStandIn(0.02, 20, 0.0, members=keys) as standin:
+        ptrk.PURETRACK_URL = standin.url
+        for mode in ('trails', 'snapshot'):
+            cfg = {
+                'paragliders': [{'name': key, 'puretrack_key': key} for key in keys],
+                'puretrack_site': {'group': 'bench', 'mode': mode},
+                'discord_bot': {},
+                'database': {'url': f'sqlite:///{tmp}/{mode}.db'},
+            }
+            guardian_angel = GuardianAngel(cfg)
+            guardian_angel.stop_monitoring()
+            counts = []
+            for _ in range(cycles):
+                standin.requests_by_path.clear()
+                guardian_angel.update_states_from_tracking(30)
+                counts.append(dict(standin.requests_by_path))
+            print(f"{mode:8s}: {pilots} pilots, requests per cycle:")
+            for cycle, count in enumerate(counts):
+                print(f"    cycle {cycle}: {sum(count.values()):4d} {count}")
+
+    # Paraglider timers are not daemon threads
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
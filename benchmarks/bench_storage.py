@@ -0,0 +1,97 @@
+"""
+Monitoring cycles against the storage backends: 'sql' (SQLite through the database writer)
+and 'memory' (no disk I/O).
+
+Each cycle inserts the new points of the fleet, reads the fleet state, and the purge
+deletes the points older than the retention period.
+
+Run from the repository root:
+    python benchmarks/bench_storage.py [pilots] [cycles]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import create_storage
+
+PERIOD = 10 # Seconds between two points of a paraglider
+CYCLE = 60 # Seconds between two monitoring cycles
+
+
+def make_points(start, count, offset=0):
+    points = []
+    for i in range(count):
+        timestamp = start + PERIOD * i
+        points.append({'timestamp': timestamp, 'datetime': datetime.fromtimestamp(timestamp, timezone.utc),
+                       'lat': 44.9 + (offset + i) * 1e-5, 'lon': 5.2, 'alt_gps': 1500.0, 'course': 90.0,
+                       'speed': 9.5 - (offset + i) % 10, 'speed_calc': 9.0, 'alt_gnd_calc': 600.0})
+    return points
+
+
+def run(cfg, keys, cycles, history_minutes, now):
+    storage = create_storage(cfg)
+    # The history before the first cycle, the cycles fill the last minutes until now
+    start = now - history_minutes * 60
+    history = history_minutes * 60 // PERIOD - cycles * CYCLE // PERIOD
+    storage.insert_points({key: make_points(start, history) for key in keys})
+    storage.flush()
+
+    timings = {'insert': 0.0, 'fleet_state': 0.0}
+    for cycle in range(cycles):
+        first = history + cycle * CYCLE // PERIOD
+        points_by_key = {key: make_points(start + first * PERIOD, CYCLE // PERIOD, first) for key in keys}
+        begin = time.perf_counter()
+        storage.insert_points(points_by_key)
+        storage.flush()
+        timings['insert'] += time.perf_counter() - begin
+        begin = time.perf_counter()
+        fleet_state = storage.get_fleet_state(keys, minutes=5)
+        timings['fleet_state'] += time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    recent = storage.get_recent_points(keys, datetime.now(timezone.utc) - timedelta(minutes=30))
+    timings['recent_points'] = time.perf_counter() - begin
+
+    purged = []
+    time_threshold = datetime.fromtimestamp(start + history_minutes * 30, timezone.utc).replace(tzinfo=None)
+    begin = time.perf_counter()
+    storage.purge(time_threshold, chunk_size=None, on_commit=purged.append)
+    storage.flush()
+    timings['purge'] = time.perf_counter() - begin
+    storage.close()
+    return timings, fleet_state, sum(len(points) for points in recent.values()), purged[0]
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    cycles = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    logging.disable(logging.INFO)
+    keys = [f'X-{pilot:04d}' for pilot in range(pilots)]
+    print(f"{pilots} pilots, {cycles} cycles of {CYCLE // PERIOD} points per pilot, 60 min of history")
+
+    results = {}
+    # The same points in both backends
+    now = int(datetime.now(timezone.utc).timestamp())
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend, cfg in (('sql', {'backend': 'sql', 'url': f'sqlite:///{tmp}/storage.db'}), ('memory', {'backend': 'memory'})):
+            timings, fleet_state, recent, purged = results[backend] = run(cfg, keys, cycles, 60, now)
+            print(f"{backend:6s}: insert {timings['insert'] / cycles * 1000:7.1f} ms/cycle, "
+                  f"fleet state {timings['fleet_state'] / cycles * 1000:6.1f} ms/cycle, "
+                  f"recent points {timings['recent_points'] * 1000:7.1f} ms ({recent} points), "
+                  f"purge {timings['purge'] * 1000:7.1f} ms ({purged} points)")
+
+    sql_state, memory_state = results['sql'][1], results['memory'][1]
+    same = sql_state.keys() == memory_state.keys() and all(
+        sql_state[key]['datetime'] == memory_state[key]['datetime']
+        and abs(sql_state[key]['avg_speed'] - memory_state[key]['avg_speed']) < 0.011 for key in sql_state
+    )
+    print(f"Same fleet state: {same}")
+
+
+if __name__ == '__main__':
+    main()
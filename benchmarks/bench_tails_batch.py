@@ -0,0 +1,44 @@
+"""
+Compares the fetch part of a monitoring cycle: one /api/trails request per paraglider
+(get_puretrack_tails) against the batched request (get_puretrack_tails_batch).
+
+Run from the repository root:
+    python benchmarks/bench_tails_batch.py [pilots] [latency_ms]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import puretrack_api as ptrk
+from puretrack_standin import PureTrackStandIn
+
+
+def cycle_per_key(keys, limit):
+    return {key: ptrk.get_puretrack_tails(key, limit)['tracks'][0] for key in keys}
+
+
+def cycle_batch(keys, limit):
+    return ptrk.get_puretrack_tails_batch(keys, limit)
+
+
+def main():
+    pilots = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50.0) / 1000
+    keys = [f'X-{i:04d}' for i in range(pilots)]
+
+    with PureTrackStandIn(latency=latency, points_per_key=32) as standin:
+        ptrk.PURETRACK_URL = standin.url
+        for name, cycle in (('per key', cycle_per_key), ('batch', cycle_batch)):
+            standin.requests_count = 0
+            start = time.perf_counter()
+            tracks = cycle(keys, 32)
+            elapsed = time.perf_counter() - start
+            assert len(tracks) == pilots
+            print(f"{name:8s}: {pilots} pilots, {standin.requests_count:3d} requests, cycle {elapsed*1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
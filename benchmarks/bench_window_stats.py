@@ -0,0 +1,74 @@
+"""
+Cost per monitoring cycle of the 1, 5 and 10 minutes statistics of a paraglider (average and maximum speed,
+displacement), recomputed from the points of each window against the incremental TrackStatistics,
+for tracks of increasing density.
+
+Run from the repository root:
+    python benchmarks/bench_window_stats.py [cycles]
+"""
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kinematics
+from window_stats import TrackStatistics
+
+WINDOWS = (1, 5, 10)
+CYCLE = 30 # Seconds between two monitoring cycles
+
+
+def recompute(points, now):
+    statistics = {}
+    for minutes in WINDOWS:
+        window = [point for point in points if point[0] >= now - minutes * 60]
+        speeds = [point[1] for point in window if not math.isnan(point[1])]
+        statistics[minutes] = {
+            'avg_speed': kinematics.time_weighted_average([point[0] for point in window], [point[1] for point in window]),
+            'max_speed': max(speeds) if speeds else 0.0,
+            'displacement': float(kinematics.haversine(window[0][2], window[0][3], window[-1][2], window[-1][3]))
+                if len(window) > 1 else 0.0
+        }
+    return statistics
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    random.seed(0)
+    print(f"{'period':>8} {'points/window':>14} {'recompute':>12} {'incremental':>12} {'per new point':>14}")
+    for period in (5, 1, 0.2):
+        timestamps = [i * period for i in range(int(cycles * CYCLE / period))]
+        points = [(timestamp, random.uniform(0, 15), 44.9 + i * 1e-5, 5.2) for i, timestamp in enumerate(timestamps)]
+        per_cycle = int(CYCLE / period)
+
+        # The points of the last 10 minutes, as loaded from the database every cycle
+        recompute_time = 0.0
+        for cycle in range(1, cycles):
+            now = cycle * CYCLE
+            recent = [point for point in points[:cycle * per_cycle] if point[0] >= now - 600]
+            start = time.perf_counter()
+            expected = recompute(recent, now)
+            recompute_time += time.perf_counter() - start
+
+        statistics = TrackStatistics(WINDOWS)
+        incremental_time = 0.0
+        for cycle in range(1, cycles):
+            now = cycle * CYCLE
+            start = time.perf_counter()
+            for point in points[(cycle - 1) * per_cycle:cycle * per_cycle]:
+                statistics.add(*point)
+            result = statistics.statistics(now)
+            incremental_time += time.perf_counter() - start
+
+        for minutes in WINDOWS:
+            assert math.isclose(result[minutes]['avg_speed'], expected[minutes]['avg_speed'], abs_tol=1e-9)
+            assert result[minutes]['max_speed'] == expected[minutes]['max_speed']
+        print(f"{period:>7}s {int(600 / period):>14} {recompute_time / (cycles - 1) * 1e6:>10.0f}us "
+              f"{incremental_time / (cycles - 1) * 1e6:>10.0f}us {incremental_time / (cycles - 1) / per_cycle * 1e6:>12.1f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+Local stand-in for the PureTrack API, used by the benchmarks.
+
+Serves synthetic trails on /api/trails, the group members on /api/groups/byslug/<group> and their
+latest position on /api/live (behind the XSRF token of /g/<group>), with a configurable latency
+per request to mimic the round trip to puretrack.io. The trails are those of make_trail, or those of
+a TrackGenerator, which also makes the group.
+
+Also stands in for the Discord channel messages endpoint, under /discord (the 'api_url' of DiscordApi),
+keeping the messages with the time they were received.
+"""
+import json
+import math
+import random
+import secrets
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_record(key, timestamp, lat, lon, alt, speed, course, ground_level):
+    """
+    Builds a PureTrack record string (cf. puretrack_api.key_mapping).
+    """
+    return f"T{timestamp},L{lat:.5f},G{lon:.5f},A{alt:.0f},S{speed:.2f},C{course:.0f},g{ground_level:.0f},K{key},U23"
+
+
+def make_trail(key, count, end_timestamp=None, period=5):
+    """
+    Generates a synthetic flying trail of `count` points, the oldest first.
+    """
+    end_timestamp = end_timestamp or int(time.time())
+    seed = sum(map(ord, key))
+    lat0, lon0 = 44.9 + (seed % 100) * 1e-3, 5.2 + (seed % 37) * 1e-3
+    points = []
+    for i in range(count):
+        timestamp = end_timestamp - (count - 1 - i) * period
+        angle = (timestamp % 3600) / 3600 * 2 * math.pi
+        lat = lat0 + 0.01 * math.sin(angle)
+        lon = lon0 + 0.01 * math.cos(angle)
+        points.append(make_record(key, timestamp, lat, lon, 1500 + 100 * math.sin(angle), 9.5, 90, 900))
+    return points
+
+
+class TrackGenerator:
+    """
+    Synthetic fleet, tracked every `period` seconds of the wall clock.
+
+    The paragliders are 'flying' (circling at 9 m/s, 1100 m above the ground), 'walking' (1.2 m/s on the
+    ground) or 'landing': flying until their landing time, between `landing` seconds around the creation
+    of the generator, then still on the ground. A landing is detected once the 5 minutes average speed
+    drops, about 5 minutes after it.
+
+    Args:
+        pilots (int): Number of paragliders.
+        mix (dict): Share of each kind of paraglider, e.g. {'flying': 0.6, 'walking': 0.2, 'landing': 0.2}.
+        period (int): Seconds between two points.
+        history (int): Seconds of track before the creation of the generator.
+        landing (tuple): Earliest and latest landing times, in seconds from the creation of the generator.
+        seed (int): Seed of the landing times.
+    """
+    GROUND_LEVEL = 900
+
+    def __init__(self, pilots, mix=None, period=5, history=600, landing=(-60, 30), seed=5):
+        mix = mix or {'flying': 0.6, 'walking': 0.2, 'landing': 0.2}
+        self.period = period
+        self.start = time.time()
+        self.history = history
+        rng = random.Random(seed)
+        self.keys = [f'X-{index:04d}' for index in range(pilots)]
+        self.kinds = {}
+        self.landings = {} # Landing time of the 'landing' paragliders, by key
+        total = sum(mix.values())
+        for index, key in enumerate(self.keys):
+            # The kinds follow the mix whatever the number of paragliders
+            draw = (index + 0.5) / pilots * total
+            for kind, share in mix.items():
+                if draw < share:
+                    break
+                draw -= share
+            self.kinds[key] = kind
+            if kind == 'landing':
+                self.landings[key] = self.start + rng.uniform(*landing)
+
+    def point(self, key, timestamp):
+        """
+        Returns:
+            tuple: The latitude, longitude, altitude, speed and course of a paraglider at a time.
+        """
+        seed = int(key[2:])
+        lat0, lon0 = 44.5 + (seed % 100) * 1e-2, 5.0 + (seed // 100) * 1e-2
+        kind = self.kinds[key]
+        landing = self.landings.get(key)
+        if kind == 'walking':
+            speed, altitude = 1.2, self.GROUND_LEVEL
+        elif landing is not None and timestamp >= landing:
+            timestamp, speed, altitude = landing, 0.0, self.GROUND_LEVEL
+        else:
+            speed, altitude = 9.0, self.GROUND_LEVEL + 1100
+        # Around a circle of 3 km, at the speed of the paraglider
+        angle = timestamp * (1.2 if kind == 'walking' else 9.0) / 3000 + seed
+        lat = lat0 + 3000 / 111000 * math.sin(angle)
+        lon = lon0 + 3000 / 111000 / math.cos(math.radians(lat0)) * math.cos(angle)
+        return lat, lon, altitude, speed, (math.degrees(angle) + 180) % 360
+
+    def records(self, key, since=0, limit=None):
+        """
+        Returns:
+            list: The records of a paraglider from `since` to now, the oldest first, the last `limit` ones.
+        """
+        now = time.time()
+        first = max(since, self.start - self.history)
+        first = math.ceil(first / self.period) * self.period
+        timestamps = range(first, int(now) + 1, self.period)
+        if limit is not None:
+            timestamps = timestamps[-limit:]
+        return [make_record(key, timestamp, *self.point(key, timestamp), self.GROUND_LEVEL) for timestamp in timestamps]
+
+
+class PureTrackStandIn:
+    """
+    Threaded HTTP server answering like PureTrack.
+
+    Args:
+        latency (float): Delay added to each response, in seconds.
+        points_per_key (int): Number of points returned for each requested key.
+        latency_per_key (float): Additional delay per key requested in /api/trails, in seconds.
+        members (list): The keys of the members of the group.
+        generator (TrackGenerator, optional): The source of the trails and of the group, instead of make_trail.
+    """
+    def __init__(self, latency=0.05, points_per_key=10, latency_per_key=0.0, members=(), generator=None):
+        self.latency = latency
+        self.latency_per_key = latency_per_key
+        self.generator = generator
+        self.members = list(members) or (list(generator.keys) if generator is not None else [])
+        self.records_served = 0
+        self.discord_messages = [] # (time received, content)
+        self.xsrf_token = secrets.token_urlsafe(16) + '='
+        self.requests_by_path = {}
+        self.points_per_key = points_per_key
+        self.requests_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def trails(self, body, params):
+        limit = int(params.get('limit', self.points_per_key))
+        tracks = []
+        for item in body:
+            if self.generator is not None:
+                points = self.generator.records(item['id'], item.get('from') or 0, limit)
+            else:
+                points = make_trail(item['id'], min(limit, self.points_per_key))
+                if item.get('from'):
+                    points = [point for point in points if int(point[1:point.index(',')]) >= item['from']]
+            tracks.append({'key': item['id'], 'count': len(points), 'last': points[-1] if points else None, 'points': points})
+        with self._lock:
+            self.records_served += sum(track['count'] for track in tracks)
+        return {'tracks': tracks}
+
+    def group(self):
+        return {'data': {'members': [{'key': key, 'label': f'Pilot {key}'} for key in self.members]}}
+
+    def live(self):
+        if self.generator is not None:
+            return {'data': [self.generator.records(key, limit=1)[0] for key in self.members]}
+        return {'data': [make_trail(key, 1)[0] for key in self.members]}
+
+    def discord(self, body):
+        with self._lock:
+            self.discord_messages.append((time.time(), body.get('content', '')))
+            return {'id': str(len(self.discord_messages))}
+
+    def count(self, path):
+        with self._lock:
+            self.requests_count += 1
+            path = path.partition('?')[0]
+            self.requests_by_path[path] = self.requests_by_path.get(path, 0) + 1
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Keep-alive responses are sent in a single segment, without waiting for delayed ACKs
+            disable_nagle_algorithm = True
+            wbufsize = -1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _params(self):
+                query = self.path.partition('?')[2]
+                return dict(part.split('=', 1) for part in query.split('&') if '=' in part)
+
+            def _reply(self, payload, status=200):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                standin.count(self.path)
+                time.sleep(standin.latency)
+                if self.path.startswith('/g/'):
+                    data = b'<html></html>'
+                    self.send_response(200)
+                    self.send_header('Set-Cookie', f'XSRF-TOKEN={urllib.parse.quote(standin.xsrf_token)}; Max-Age=7200; Path=/')
+                    self.send_header('Set-Cookie', 'puretrack_session=standin; Max-Age=7200; Path=/; HttpOnly')
+                    self.send_header('Content-Type', 'text/html')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                elif self.path.startswith('/api/groups/byslug/'):
+                    self._reply(standin.group())
+                else:
+                    self._reply({'error': 'not found'}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'null')
+                standin.count(self.path)
+                if self.path.startswith('/api/trails'):
+                    time.sleep(standin.latency + standin.latency_per_key * len(body))
+                    self._reply(standin.trails(body, self._params()))
+                elif self.path.startswith('/discord/channels/'):
+                    time.sleep(standin.latency)
+                    self._reply(standin.discord(body))
+                elif self.path.startswith('/api/live'):
+                    time.sleep(standin.latency)
+                    if self.headers.get('X-XSRF-TOKEN') != standin.xsrf_token:
+                        self._reply({'message': 'CSRF token mismatch.'}, 419)
+                    else:
+                        self._reply(standin.live())
+                else:
+                    time.sleep(standin.latency)
+                    self._reply({'error': 'not found'}, 404)
+
+        return Handler
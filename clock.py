@@ -0,0 +1,86 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+class Clock:
+    """
+    The time of the application: the wall clock, or a virtual clock in a replay.
+
+    The current UTC datetime of the states, timeouts and purges is read from it, and the monotonic time
+    of the schedules (timers, polls, roster syncs).
+    """
+    virtual = False
+
+    def now(self):
+        """
+        Returns:
+            datetime: The current UTC datetime, timezone aware.
+        """
+        return datetime.now(timezone.utc)
+
+    def monotonic(self):
+        """
+        Returns:
+            float: Seconds from an arbitrary origin, never going back.
+        """
+        return time.monotonic()
+
+class VirtualClock(Clock):
+    """
+    A clock whose time only moves when it is advanced, e.g. by the replay driver through TimerWheel.advance.
+
+    Its monotonic time is the number of seconds since its start.
+    """
+    virtual = True
+
+    def __init__(self, start):
+        """
+        Initialize the clock.
+
+        Args:
+            start (datetime): The UTC datetime of the start, timezone aware.
+        """
+        self.start = start
+        self._elapsed = 0.0
+
+    def now(self):
+        return self.start + timedelta(seconds=self._elapsed)
+
+    def monotonic(self):
+        return self._elapsed
+
+    def advance_to(self, monotonic):
+        """
+        Move the clock forward, to a monotonic time.
+
+        Args:
+            monotonic (float): Seconds since the start, the clock doesn't go back.
+        """
+        self._elapsed = max(self._elapsed, monotonic)
+
+_default_clock = None
+_default_clock_lock = threading.Lock()
+
+def get_default_clock():
+    """
+    Get the process-wide clock, the wall clock unless replaced.
+
+    Returns:
+        Clock: The shared clock.
+    """
+    global _default_clock
+    with _default_clock_lock:
+        if _default_clock is None:
+            _default_clock = Clock()
+        return _default_clock
+
+def set_default_clock(clock):
+    """
+    Replace the process-wide clock, e.g. by a VirtualClock before a replay.
+
+    Args:
+        clock (Clock): The clock to share.
+    """
+    global _default_clock
+    with _default_clock_lock:
+        _default_clock = clock
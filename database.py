@@ -1,11 +1,15 @@
-from datetime import datetime, timezone, timedelta
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from datetime import timezone, timedelta
+from sqlalchemy import create_engine, event, func, inspect, select, values, column, text, case, and_, Column, Integer, String, Float, DateTime, Index
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import aliased, sessionmaker
 from sqlalchemy.orm import Session
+from clock import get_default_clock
+import kinematics
 
 Base = declarative_base()
 SessionLocal = None  # La session sera configurée dynamiquement
+WriterSessionLocal = None # Sessions of the single writer, on their own connection, cf. DatabaseWriter
 
 class ParaglidersData(Base):
     __tablename__ = 'paraglider_data'
@@ -21,21 +25,108 @@ class ParaglidersData(Base):
     altitude_gnd_calc = Column(Float)
     state = Column(String)
 
+    __table_args__ = (
+        # A point of a paraglider is only stored once
+        Index('ix_paraglider_data_key_datetime', 'paraglider_key', 'datetime', unique=True),
+        # The purge selects the old points of all the paragliders
+        Index('ix_paraglider_data_datetime', 'datetime'),
+    )
+
+class TrailCursor(Base):
+    """
+    The timestamp of the last trail point of each paraglider, the 'from' of its next /api/trails request.
+
+    The snapshot points are stored in paraglider_data too: the last stored point of a paraglider may be newer
+    than its last trail point, and the trail points in between would never be fetched.
+    """
+    __tablename__ = 'trail_cursor'
+    paraglider_key = Column(String, primary_key=True)
+    timestamp = Column(Integer, nullable=False)
+
 def init_db_engine(cfg):
     """
-    Initialize the database engine and session.
+    Initialize the database engines and sessions.
+
+    The readers (SessionLocal) and the writer (WriterSessionLocal) use separate engines, so separate connections.
+    SQLite databases are switched to WAL journal mode: the readers see the last commit and never block the writer.
 
     Args:
-        cfg (dict): Configuration for the db engine
+        cfg (dict): Configuration for the db engine, e.g.
+            {
+                "url": "sqlite:///data/paragliders.db",
+                "journal_mode": "WAL",      # SQLite only, as the pragmas below
+                "synchronous": "NORMAL",    # WAL is durable at checkpoints, a commit doesn't wait for an fsync
+                "cache_size": -16000,       # Page cache per connection, in KiB when negative
+                "busy_timeout": 5000        # Milliseconds to wait for a lock
+            }
     """
-    global SessionLocal
-    engine = create_engine(cfg.get('url'))
+    global SessionLocal, WriterSessionLocal
+    engine = _create_engine(cfg)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
     # Crée les tables si elles n'existent pas
     Base.metadata.create_all(engine)
+    _create_missing_indexes(engine)
+
+    # An in-memory database only exists in its own connection, the writer shares it
+    writer_engine = engine if engine.url.database in (None, '', ':memory:') else _create_engine(cfg)
+    WriterSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=writer_engine)
+    return engine
+
+def _create_engine(cfg):
+    engine = create_engine(cfg.get('url'))
+    if engine.dialect.name == 'sqlite':
+        pragmas = {
+            'journal_mode': cfg.get('journal_mode', 'WAL'),
+            'synchronous': cfg.get('synchronous', 'NORMAL'),
+            'cache_size': cfg.get('cache_size', -16000),
+            'busy_timeout': cfg.get('busy_timeout', 5000)
+        }
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
     return engine
 
+def _create_missing_indexes(engine):
+    """
+    Create the indexes added to the model since the table was created.
+
+    The duplicated points are removed before creating the unique index.
+
+    Args:
+        engine (Engine): SQLAlchemy engine.
+    """
+    table = ParaglidersData.__table__
+    existing = {index['name'] for index in inspect(engine).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name in existing:
+            continue
+        with engine.begin() as connection:
+            if index.unique:
+                columns = ', '.join(column.name for column in index.columns)
+                connection.execute(text(
+                    f"DELETE FROM {table.name} WHERE id NOT IN (SELECT MIN(id) FROM {table.name} GROUP BY {columns})"
+                ))
+            index.create(connection)
+
+def _point_row(paraglider_key, point):
+    return {
+        'paraglider_key': paraglider_key,
+        'datetime': point['datetime'],
+        'latitude': point['lat'],
+        'longitude': point['lon'],
+        'course': point.get('course'),
+        'speed': point.get('speed'),
+        'speed_calc': point.get('speed_calc'),
+        'altitude': point.get('alt_gps'),
+        'altitude_gnd_calc': point.get('alt_gnd_calc'),
+        'state': point.get('state') # cf. Paraglider.states
+    }
+
 def save_paraglider_point(session: Session, paraglider_key, point):
     """
     Save a single paraglider point to the database.
@@ -44,20 +135,82 @@ def save_paraglider_point(session: Session, paraglider_key, point):
         session (Session): SQLAlchemy session.
         point (dict): A dictionary containing the point data.
     """
-    paraglider_data = ParaglidersData(
-        paraglider_key=paraglider_key,
-        datetime=point['datetime'],
-        latitude=point['lat'],
-        longitude=point['lon'],
-        course=point.get('course'),
-        speed=point.get('speed'),
-        speed_calc=point.get('speed_calc'),
-        altitude=point.get('alt_gps'),
-        altitude_gnd_calc=point.get('alt_gnd_calc'),
-        state=point.get('state') # cf. Paraglider.states
-    )
+    paraglider_data = ParaglidersData(**_point_row(paraglider_key, point))
     session.add(paraglider_data)
 
+def insert_paraglider_points(session: Session, points_by_key):
+    """
+    Insert the points of several paragliders in a single statement, the points already stored are ignored.
+
+    Relies on the unique (paraglider_key, datetime) index: INSERT ... ON CONFLICT DO NOTHING executed for
+    all the rows at once. The caller commits, e.g. once per monitoring cycle for the whole fleet.
+
+    Args:
+        session (Session): SQLAlchemy session.
+        points_by_key (dict): The points to insert for each paraglider ({paraglider_key: points}).
+
+    Returns:
+        int: The number of points submitted.
+    """
+    rows = [_point_row(paraglider_key, point) for paraglider_key, points in points_by_key.items() for point in points]
+    if not rows:
+        return 0
+
+    dialect = session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert(ParaglidersData).on_conflict_do_nothing(index_elements=['paraglider_key', 'datetime'])
+        session.execute(statement, rows)
+    else:
+        # No portable upsert, check each point
+        for row in rows:
+            if not session.query(ParaglidersData.id).filter_by(paraglider_key=row['paraglider_key'], datetime=row['datetime']).first():
+                session.add(ParaglidersData(**row))
+    return len(rows)
+
+def save_trail_cursors(session: Session, cursors):
+    """
+    Advance the trail cursors of several paragliders, a cursor never goes back.
+
+    Args:
+        session (Session): SQLAlchemy session.
+        cursors (dict): The Unix timestamp of the last trail point of each paraglider ({paraglider_key: timestamp}).
+    """
+    rows = [{'paraglider_key': paraglider_key, 'timestamp': int(timestamp)} for paraglider_key, timestamp in cursors.items()]
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert(TrailCursor)
+        statement = statement.on_conflict_do_update(index_elements=['paraglider_key'], set_={
+            'timestamp': case((statement.excluded.timestamp > TrailCursor.timestamp, statement.excluded.timestamp),
+                              else_=TrailCursor.timestamp)
+        })
+        session.execute(statement, rows)
+    else:
+        for row in rows:
+            cursor = session.get(TrailCursor, row['paraglider_key'])
+            if cursor is None:
+                session.add(TrailCursor(**row))
+            elif row['timestamp'] > cursor.timestamp:
+                cursor.timestamp = row['timestamp']
+
+def get_trail_cursors(session: Session):
+    """
+    Get the trail cursor of every paraglider.
+
+    A database from before the trail_cursor table has none: the timestamps of the last stored points are used then.
+
+    Args:
+        session (Session): SQLAlchemy session.
+
+    Returns:
+        dict: The Unix timestamp of the last trail point of each paraglider ({paraglider_key: timestamp}).
+    """
+    cursors = {paraglider_key: timestamp for paraglider_key, timestamp in session.execute(select(TrailCursor.paraglider_key, TrailCursor.timestamp))}
+    return cursors or get_last_timestamps(session)
+
 def update_paraglider_data(session: Session, paraglider_key, points):
     """
     Update the database with the latest paraglider points.
@@ -66,14 +219,7 @@ def update_paraglider_data(session: Session, paraglider_key, points):
         session (Session): SQLAlchemy session.
         points (list): A list of points to update.
     """
-    for point in points:
-        # Vérifiez si le point existe déjà dans la base
-        existing_point = session.query(ParaglidersData).filter_by(
-            paraglider_key=paraglider_key,
-            datetime=point['datetime']
-        ).first()
-        if not existing_point:
-            save_paraglider_point(session, paraglider_key, point)
+    insert_paraglider_points(session, {paraglider_key: points})
     session.commit()
 
 def get_last_paraglider_state(session, paraglider_key):
@@ -93,19 +239,190 @@ def get_last_paraglider_state(session, paraglider_key):
 
     return last_state
 
-def get_paraglider_history(paraglider_key):
+def get_last_timestamps(session: Session):
+    """
+    Get the timestamp of the last stored point of every paraglider.
+
+    Args:
+        session (Session): SQLAlchemy session.
+
+    Returns:
+        dict: The Unix timestamp of the last point of each paraglider ({paraglider_key: timestamp}).
+    """
+    rows = session.query(
+        ParaglidersData.paraglider_key,
+        func.max(ParaglidersData.datetime)
+    ).group_by(ParaglidersData.paraglider_key).all()
+
+    # SQLite doesn't save Time Zone, the datetimes are UTC
+    return {key: int(last.replace(tzinfo=timezone.utc).timestamp()) for key, last in rows if last is not None}
+
+def _seconds(session: Session, column):
+    """
+    Express a datetime column in seconds, to subtract two of them in SQL.
+    """
+    if session.get_bind().dialect.name == 'sqlite':
+        return func.julianday(column) * 86400.0
+    return func.extract('epoch', column)
+
+def _latest_points(keys):
+    """
+    Build a CTE of the datetime of the last point of each paraglider, one index lookup per paraglider.
+    """
+    paragliders = values(
+        column('paraglider_key', String), name='paragliders'
+    ).data([(key,) for key in keys]).cte('paragliders')
+    previous = aliased(ParaglidersData)
+    return select(
+        paragliders.c.paraglider_key,
+        select(func.max(previous.datetime)).where(
+            previous.paraglider_key == paragliders.c.paraglider_key
+        ).scalar_subquery().label('datetime')
+    ).cte('latest')
+
+def get_fleet_state(session: Session, keys=None, minutes=5):
+    """
+    Get, for every paraglider, its last known point and its time-weighted average speed over the last X minutes,
+    in a single query.
+
+    The last points and the points of the time window are looked up through the (paraglider_key, datetime) index,
+    the average speeds are computed with a window function: each speed is weighted by the duration of the segment
+    it ends, as in calculate_average_speed.
+
+    Args:
+        session (Session): SQLAlchemy session.
+        keys (list): The PureTrack keys of the paragliders, all the paragliders of the table if None.
+        minutes (int): The time window of the average speed in minutes.
+
+    Returns:
+        dict: The state of each paraglider, as expected by Paraglider.update ({paraglider_key: state}).
+    """
+    time_threshold = get_default_clock().now().replace(tzinfo=None) - timedelta(minutes=minutes)
+    data = ParaglidersData
+    if keys is None:
+        keys = [key for key, in session.execute(select(data.paraglider_key).distinct())]
+    keys = list(keys)
+    if not keys:
+        return {}
+
+    latest = _latest_points(keys)
+
+    previous_datetime = func.lag(data.datetime).over(partition_by=data.paraglider_key, order_by=data.datetime)
+    segments = select(
+        data.paraglider_key,
+        data.speed,
+        (_seconds(session, data.datetime) - _seconds(session, previous_datetime)).label('dt')
+    ).where(data.paraglider_key.in_(keys), data.datetime >= time_threshold).cte('segments')
+
+    weighted = segments.c.dt > 0
+    averages = select(
+        segments.c.paraglider_key,
+        (func.sum(case((weighted, func.coalesce(segments.c.speed, 0.0) * segments.c.dt), else_=0.0)) /
+         func.nullif(func.sum(case((weighted, segments.c.dt), else_=0.0)), 0.0)).label('avg_speed')
+    ).group_by(segments.c.paraglider_key).cte('averages')
+
+    query = select(data, averages.c.avg_speed).join(
+        latest, and_(data.paraglider_key == latest.c.paraglider_key, data.datetime == latest.c.datetime)
+    ).outerjoin(averages, averages.c.paraglider_key == data.paraglider_key)
+
+    fleet_state = {}
+    for last_state, avg_speed in session.execute(query):
+        fleet_state[last_state.paraglider_key] = {
+            'datetime': last_state.datetime.replace(tzinfo=timezone.utc), # SQLite doesn't save Time Zone
+            'coordinates': (last_state.latitude, last_state.longitude),
+            'course': last_state.course,
+            'altitude_gnd_calc': last_state.altitude_gnd_calc,
+            'speed': last_state.speed,
+            'avg_speed': round(avg_speed, 2) if avg_speed is not None else 0.0
+        }
+    return fleet_state
+
+def get_recent_points(session: Session, keys, since):
+    """
+    Get the recent points of several paragliders, and the last point of those without recent points.
+
+    Args:
+        session (Session): SQLAlchemy session.
+        keys (list): The PureTrack keys of the paragliders.
+        since (datetime): The oldest point to get, timezone aware.
+
+    Returns:
+        dict: The points of each paraglider with a point, sorted by datetime ({paraglider_key: [ParaglidersData]}).
+    """
+    keys = list(keys)
+    if not keys:
+        return {}
+    data = ParaglidersData
+    time_threshold = since.astimezone(timezone.utc).replace(tzinfo=None)
+
+    points_by_key = {}
+    for point in session.scalars(select(data).where(
+        data.paraglider_key.in_(keys), data.datetime >= time_threshold
+    ).order_by(data.paraglider_key, data.datetime)):
+        points_by_key.setdefault(point.paraglider_key, []).append(point)
+
+    if missing := [key for key in keys if key not in points_by_key]:
+        latest = _latest_points(missing)
+        for point in session.scalars(select(data).join(
+            latest, and_(data.paraglider_key == latest.c.paraglider_key, data.datetime == latest.c.datetime)
+        )):
+            points_by_key[point.paraglider_key] = [point]
+    return points_by_key
+
+def count_paraglider_points(session: Session, paraglider_key, start, end):
+    """
+    Count the points of a paraglider in a time range.
+
+    Args:
+        session (Session): SQLAlchemy session.
+        paraglider_key (str): The PureTrack key of the paraglider.
+        start (datetime): Beginning of the range, included, naive UTC.
+        end (datetime): End of the range, excluded, naive UTC.
+
+    Returns:
+        int: The number of points.
+    """
+    return session.scalar(select(func.count()).select_from(ParaglidersData).where(
+        ParaglidersData.paraglider_key == paraglider_key,
+        ParaglidersData.datetime >= start,
+        ParaglidersData.datetime < end
+    ))
+
+def iter_paraglider_points(session: Session, paraglider_key, start, end, batch_size=10000):
+    """
+    Iterate over the points of a paraglider in a time range, fetched by batches.
+
+    Args:
+        session (Session): SQLAlchemy session.
+        paraglider_key (str): The PureTrack key of the paraglider.
+        start (datetime): Beginning of the range, included, naive UTC.
+        end (datetime): End of the range, excluded, naive UTC.
+        batch_size (int): Number of rows fetched at once.
+
+    Yields:
+        Row: datetime, latitude, longitude and altitude of each point, sorted by datetime.
+    """
+    data = ParaglidersData
+    yield from session.execute(select(data.datetime, data.latitude, data.longitude, data.altitude).where(
+        data.paraglider_key == paraglider_key,
+        data.datetime >= start,
+        data.datetime < end
+    ).order_by(data.datetime).execution_options(yield_per=batch_size))
+
+def get_paraglider_history(paraglider_key, minutes=30):
     """
     Get the history of a paraglider.
     Args:
         paraglider_key (str): The key of the paraglider.
+        minutes (int, optional): The time window of the history in minutes.
     Returns:
         list: A list of ParaglidersData objects representing the history.
     """
     session = SessionLocal()
-    thirty_minutes_ago = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=30) # TODO - Time Zone
+    time_threshold = get_default_clock().now().replace(tzinfo=None) - timedelta(minutes=minutes) # TODO - Time Zone
     history = session.query(ParaglidersData).filter(
         ParaglidersData.paraglider_key == paraglider_key,
-        ParaglidersData.datetime >= thirty_minutes_ago
+        ParaglidersData.datetime >= time_threshold
     ).all()
     session.close()
     return history
@@ -122,7 +439,7 @@ def calculate_average_speed_old(session: Session, paraglider_key, minutes=5):
     Returns:
         float: The average speed in m/s.
     """
-    time_threshold = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=minutes)
+    time_threshold = get_default_clock().now().replace(tzinfo=None) - timedelta(minutes=minutes)
     points = session.query(ParaglidersData).filter(
         ParaglidersData.paraglider_key == paraglider_key,
         ParaglidersData.datetime >= time_threshold
@@ -147,7 +464,7 @@ def calculate_average_speed(session: Session, paraglider_key, minutes=5):
     Returns:
         float: The average speed in m/s.
     """
-    time_threshold = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=minutes)
+    time_threshold = get_default_clock().now().replace(tzinfo=None) - timedelta(minutes=minutes)
     points = session.query(ParaglidersData).filter(
         ParaglidersData.paraglider_key == paraglider_key,
         ParaglidersData.datetime >= time_threshold
@@ -156,40 +473,27 @@ def calculate_average_speed(session: Session, paraglider_key, minutes=5):
     if len(points) < 2:
         return 0.0
 
-    total_time = 0.0
-    total_speed_weighted = 0.0
-
-    for i in range(1, len(points)):
-        point1 = points[i - 1]
-        point2 = points[i]
-
-        # Calculate the time difference in s
-        time_diff = (point2.datetime - point1.datetime).total_seconds()
-
-        if time_diff > 0:
-            total_time += time_diff
-            if point2.speed is not None:
-                total_speed_weighted += point2.speed * time_diff
-
-    if total_time == 0:
-        return 0.0
-
-    average_speed = total_speed_weighted / total_time
+    # Each speed is weighted by the duration of the segment it ends
+    average_speed = kinematics.time_weighted_average(
+        [point.datetime.replace(tzinfo=timezone.utc).timestamp() for point in points], # SQLite doesn't save Time Zone
+        [point.speed if point.speed is not None else float('nan') for point in points]
+    )
     return round(average_speed, 2)
 
-def purge_old_data(session: Session, hours=48):
+def purge_old_data(session: Session, hours=48, commit=True):
     """
     Purge data older than the specified number of hours from the database.
 
     Args:
         session (Session): SQLAlchemy session.
         hours (int): The age threshold in hours for purging data. Default is 48 hours.
+        commit (bool): Commit the deletion. Default is True, False to leave it to the caller's transaction.
 
     Returns:
         int: The number of records deleted.
     """
     # Calculate the time threshold
-    time_threshold = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=hours)
+    time_threshold = get_default_clock().now().replace(tzinfo=None) - timedelta(hours=hours)
 
     # Delete records older than the threshold
     deleted_count = session.query(ParaglidersData).filter(
@@ -197,6 +501,24 @@ def purge_old_data(session: Session, hours=48):
     ).delete()
 
     # Commit the changes
-    session.commit()
+    if commit:
+        session.commit()
+
+    return deleted_count
+
+def purge_old_data_chunk(session: Session, time_threshold, chunk_size=5000):
+    """
+    Delete a bounded number of points older than a datetime, found through the datetime index.
+
+    Args:
+        session (Session): SQLAlchemy session.
+        time_threshold (datetime): The points before this naive UTC datetime are deleted.
+        chunk_size (int): Maximum number of points deleted.
 
-    return deleted_count
\ No newline at end of file
+    Returns:
+        int: The number of records deleted, less than chunk_size once all the old points are deleted.
+    """
+    oldest = select(ParaglidersData.id).where(ParaglidersData.datetime < time_threshold).limit(chunk_size)
+    return session.query(ParaglidersData).filter(
+        ParaglidersData.id.in_(oldest.scalar_subquery())
+    ).delete(synchronize_session=False)
@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from logger import get_logger
+import database as db
+
+class DatabaseWriter:
+    """
+    Single writer of the database, on its own thread and its own connection.
+
+    The writes are queued as jobs, each one a callable run with the writer's session. All the jobs waiting
+    in the queue when the writer wakes up are run in a single transaction, e.g. the insertion of the points
+    of a monitoring cycle and the purge of the old ones: one commit, so one sync of the journal, per cycle.
+    If the transaction fails, it is rolled back and only the failure callbacks of its jobs are called.
+    """
+    def __init__(self, session_factory=None, maxsize=0):
+        """
+        Initialize the writer and start its thread.
+
+        Args:
+            session_factory (sessionmaker, optional): The writer's sessions. Default is database.WriterSessionLocal.
+            maxsize (int, optional): Maximum number of queued jobs, submit blocks when reached. Default is unbounded.
+        """
+        self.logger = get_logger("DatabaseWriter")
+        self._session_factory = session_factory or db.WriterSessionLocal
+        self._queue = queue.Queue(maxsize)
+        self.transactions = 0
+        self.failures = 0
+        self.last_commit_time = 0.0
+        self._thread = threading.Thread(target=self._run, name='database-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, job, on_commit=None, on_failure=None):
+        """
+        Queue a write.
+
+        Args:
+            job (callable): job(session) -> result, must not commit.
+            on_commit (callable, optional): on_commit(result), called on the writer's thread once committed.
+            on_failure (callable, optional): on_failure(error), called on the writer's thread if the transaction fails.
+        """
+        self._queue.put((job, on_commit, on_failure))
+
+    def write_points(self, points_by_key, on_commit=None, cursors=None):
+        """
+        Queue the insertion of the points of several paragliders.
+
+        Args:
+            points_by_key (dict): The points to insert for each paraglider ({paraglider_key: points}).
+            on_commit (callable, optional): on_commit(count), called once the points are committed.
+            cursors (dict, optional): The trail cursors advanced by the points, saved in the same transaction.
+        """
+        def write(session):
+            if cursors:
+                db.save_trail_cursors(session, cursors)
+            return db.insert_paraglider_points(session, points_by_key)
+        self.submit(write, on_commit)
+
+    def flush(self):
+        """
+        Wait until all the queued writes are done.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Write the queued jobs and stop the writer.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            # Everything already queued goes in the same transaction
+            while True:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in jobs
+            jobs = [job for job in jobs if job is not None]
+            try:
+                if jobs:
+                    self._write(jobs)
+            finally:
+                for _ in range(len(jobs) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, jobs):
+        session = self._session_factory()
+        start = time.perf_counter()
+        try:
+            results = [job(session) for job, _, _ in jobs]
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            self.failures += 1
+            self.logger.error(f"Transaction of {len(jobs)} writes failed: {e}")
+            self._call([on_failure for _, _, on_failure in jobs], [e] * len(jobs), 'Failure')
+            return
+        finally:
+            session.close()
+        self.transactions += 1
+        self.last_commit_time = time.perf_counter() - start
+        self.logger.debug(f"{len(jobs)} writes committed in {self.last_commit_time * 1000:.1f} ms")
+
+        self._call([on_commit for _, on_commit, _ in jobs], results, 'Commit')
+
+    def _call(self, callbacks, arguments, kind):
+        for callback, argument in zip(callbacks, arguments):
+            if callback is not None:
+                try:
+                    callback(argument)
+                except Exception as e:
+                    self.logger.error(f"{kind} callback failed: {e}")
@@ -1,23 +1,29 @@
-import requests
 import time
 import threading
 from queue import Queue, Empty
 from logger import get_logger
+from http_client import get_default_client
+
+DISCORD_API_URL = 'https://discord.com/api/v10'
+DISCORD_MESSAGE_LIMIT = 2000 # Characters of a message
 
 class DiscordApi:
-    def __init__(self, cfg):
+    def __init__(self, cfg, client=None):
         """
         Initialize the Discord bot.
 
         Args:
             cfg (dict): Configuration for the bot (e.g., token, channel ID).
+            client (HttpClient, optional): The HTTP client to use. Default is the shared client.
         """
         self.cfg = cfg
         self.logger = get_logger("DiscordApi")
+        self.client = client or get_default_client()
 
         # Extract configuration
         self.bot_token = cfg.get('bot_token')
         self.channel_id = cfg.get('channel_id')
+        self.api_url = cfg.get('api_url', DISCORD_API_URL)
 
         # Initialize the message queue
         self.message_queue = Queue()
@@ -37,6 +43,22 @@ class DiscordApi:
         self.message_queue.put(message)
         self.logger.info(f"Message added to queue: {message}")
 
+    def send_messages(self, lines):
+        """
+        Add several lines to the queue, grouped in as few messages as Discord accepts.
+
+        Args:
+            lines (list): The lines to send, each one shorter than DISCORD_MESSAGE_LIMIT.
+        """
+        message = ''
+        for line in lines:
+            if message and len(message) + 1 + len(line) > DISCORD_MESSAGE_LIMIT:
+                self.send_message(message)
+                message = ''
+            message = f'{message}\n{line}' if message else line
+        if message:
+            self.send_message(message)
+
     def _process_queue(self):
         """
         Process the message queue and send messages to Discord.
@@ -59,7 +81,7 @@ class DiscordApi:
         Args:
             message (str): The message to send.
         """
-        url = f'https://discord.com/api/v10/channels/{self.channel_id}/messages'
+        url = f'{self.api_url}/channels/{self.channel_id}/messages'
         data = {'content': message}
         headers = {
             'Authorization': f'Bot {self.bot_token}',
@@ -67,7 +89,7 @@ class DiscordApi:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=data)
+            response = self.client.post(url, headers=headers, json=data)
 
             if response.status_code == 200:
                 self.logger.info(f"Message '{message}' sent successfully!")
@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+import srtm
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+SRTM3_RESOLUTION = 1 / 1200 # 3 arc-seconds, the SRTM sampling outside the US
+
+class ElevationService:
+    """
+    Ground elevation from SRTM (Shuttle Radar Topography Mission) data.
+
+    The SRTM dataset is loaded once and the elevations are memoized per cell of `resolution` degrees,
+    with an LRU eviction once `maxsize` cells are cached. With the default SRTM3 resolution a cell holds
+    a single SRTM sample, so the memoized value is the one `srtm` would return for the cell center.
+    """
+    def __init__(self, resolution=SRTM3_RESOLUTION, maxsize=65536, data=None):
+        """
+        Initialize the elevation service.
+
+        Args:
+            resolution (float, optional): Size in degrees of the memoized cells. Default is SRTM3_RESOLUTION.
+            maxsize (int, optional): Maximum number of memoized cells. Default is 65536.
+            data (srtm.data.GeoElevationData, optional): The SRTM dataset. Default is loaded on first use.
+        """
+        self.resolution = resolution
+        self.maxsize = maxsize
+        self._data = data
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = srtm.get_data()
+        return self._data
+
+    def get_elevation(self, lat, lon):
+        """
+        Get the elevation of a position.
+
+        Args:
+            lat (float): Latitude in decimal degrees.
+            lon (float): Longitude in decimal degrees.
+
+        Returns:
+            float or None: The elevation in meters above sea level if available, otherwise None.
+        """
+        cell = (round(lat / self.resolution), round(lon / self.resolution))
+        with self._lock:
+            if cell in self._cache:
+                self._cache.move_to_end(cell)
+                self.hits += 1
+                return self._cache[cell]
+
+        elevation = self.data.get_elevation(cell[0] * self.resolution, cell[1] * self.resolution)
+
+        with self._lock:
+            self.misses += 1
+            self._cache[cell] = elevation
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return elevation
+
+    def get_elevations(self, lats, lons):
+        """
+        Get the elevations of several positions, e.g. the points of a whole trail.
+
+        Args:
+            lats (sequence): Latitudes in decimal degrees.
+            lons (sequence): Longitudes in decimal degrees, same length as `lats`.
+
+        Returns:
+            list: The elevations in meters above sea level, None where unavailable.
+        """
+        resolution = self.resolution
+        cells = [(round(lat / resolution), round(lon / resolution)) for lat, lon in zip(lats, lons)]
+
+        # The cache is only visited once per distinct cell of the batch, each missing cell looked up once
+        elevations = dict.fromkeys(cells)
+        missing = []
+        with self._lock:
+            for cell in elevations:
+                if cell in self._cache:
+                    self._cache.move_to_end(cell)
+                    elevations[cell] = self._cache[cell]
+                else:
+                    missing.append(cell)
+            self.hits += len(cells) - len(missing)
+        for cell in missing:
+            elevations[cell] = self.data.get_elevation(cell[0] * resolution, cell[1] * resolution)
+
+        with self._lock:
+            self.misses += len(missing)
+            for cell in missing:
+                self._cache[cell] = elevations[cell]
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return [elevations[cell] for cell in cells]
+
+    def cache_info(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache), 'maxsize': self.maxsize}
+
+_default_service = None
+_default_service_lock = threading.Lock()
+
+def get_default_service():
+    """
+    Get the process-wide elevation service, created on first use.
+
+    Returns:
+        ElevationService: The shared service.
+    """
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            _default_service = ElevationService()
+        return _default_service
+
+def set_default_service(service):
+    """
+    Replace the process-wide elevation service.
+
+    Args:
+        service (ElevationService): The service to share.
+    """
+    global _default_service
+    with _default_service_lock:
+        _default_service = service
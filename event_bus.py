@@ -0,0 +1,204 @@
+import threading
+from contextlib import contextmanager
+from clock import get_default_clock
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+class Event:
+    """
+    An event published by a sender, e.g. a paraglider.
+    """
+    __slots__ = ('sender', 'datetime')
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.datetime = get_default_clock().now()
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f"{type(self).__name__}({getattr(self.sender, 'name', self.sender)}, {fields})"
+
+class StateChanged(Event):
+    """
+    The state of the sender changed from `source` to `dest`.
+    """
+    __slots__ = ('source', 'dest')
+
+    def __init__(self, sender, source, dest):
+        super().__init__(sender)
+        self.source = source
+        self.dest = dest
+
+class Alert(Event):
+    """
+    The sender entered the Alert state.
+    """
+    __slots__ = ('message',)
+
+    def __init__(self, sender, message):
+        super().__init__(sender)
+        self.message = message
+
+class Clearance(Event):
+    """
+    The sender entered the Clearance state, its landing has to be confirmed.
+    """
+    __slots__ = ('message',)
+
+    def __init__(self, sender, message):
+        super().__init__(sender)
+        self.message = message
+
+class CycleCompleted(Event):
+    """
+    The sender completed a monitoring cycle, in `timings` seconds per stage, after `overruns` skipped cycles in all.
+    """
+    __slots__ = ('timings', 'overruns')
+
+    def __init__(self, sender, timings, overruns):
+        super().__init__(sender)
+        self.timings = timings
+        self.overruns = overruns
+
+class EventBus:
+    """
+    Dispatch of the events to their handlers, by event type and by sender.
+
+    A handler subscribes to a type of event, from one sender or from all of them: publishing an event
+    only calls the handlers of its type and sender, whatever the number of senders. A handler is
+    subscribed once, subscribing it again does nothing.
+
+    The batch handlers get lists of events. In a batch, e.g. a monitoring cycle, the events published by
+    the thread of the batch are held and dispatched together at its end: the event handlers are called
+    in the order of publication, then each batch handler once with all the events. Outside of a batch,
+    the events are dispatched at once, the batch handlers get a list of one event.
+    """
+    def __init__(self):
+        self._handlers = {} # {(event type, sender or None): [handler]}
+        self._batch_handlers = [] # [(handler, event types or None)]
+        self._lock = threading.Lock()
+        self._local = threading.local() # Events held by the batch of each thread
+        self.published = 0
+        self.dispatched = 0
+
+    def subscribe(self, event_type, handler, sender=None):
+        """
+        Subscribe a handler to the events of a type.
+
+        Args:
+            event_type (type): The type of the events, e.g. Clearance.
+            handler (callable): handler(event).
+            sender (object, optional): Only the events of this sender. Default is all the senders.
+        """
+        with self._lock:
+            handlers = self._handlers.setdefault((event_type, sender), [])
+            if handler not in handlers:
+                # Copied on write, the dispatch reads the lists without lock
+                self._handlers[(event_type, sender)] = handlers + [handler]
+
+    def unsubscribe(self, event_type, handler, sender=None):
+        with self._lock:
+            handlers = self._handlers.get((event_type, sender), [])
+            if handler in handlers:
+                self._handlers[(event_type, sender)] = [other for other in handlers if other != handler]
+
+    def subscribe_batch(self, handler, event_types=None):
+        """
+        Subscribe a handler to the batches of events.
+
+        Args:
+            handler (callable): handler(events), called with a list of events.
+            event_types (tuple, optional): Only the events of these types. Default is all the events.
+        """
+        with self._lock:
+            self._batch_handlers = self._batch_handlers + [(handler, event_types)]
+
+    def remove_sender(self, sender):
+        """
+        Unsubscribe all the handlers of the events of a sender, e.g. a removed paraglider.
+
+        Args:
+            sender (object): The sender.
+        """
+        with self._lock:
+            self._handlers = {key: handlers for key, handlers in self._handlers.items() if key[1] is not sender}
+
+    def publish(self, event):
+        """
+        Publish an event, dispatched at once or at the end of the batch of the thread.
+
+        Args:
+            event (Event): The event.
+        """
+        self.published += 1
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            pending.append(event)
+        else:
+            self._dispatch([event])
+
+    @contextmanager
+    def batch(self):
+        """
+        Hold the events published by this thread until the end of the block, then dispatch them together.
+        Nested batches are part of the outer one.
+        """
+        if getattr(self._local, 'pending', None) is not None:
+            yield
+            return
+        self._local.pending = []
+        try:
+            yield
+        finally:
+            pending, self._local.pending = self._local.pending, None
+            # The handlers may publish, their events are dispatched after the batch, at once
+            if pending:
+                self._dispatch(pending)
+
+    def _dispatch(self, events):
+        handlers = self._handlers
+        for event in events:
+            event_type = type(event)
+            for handler in handlers.get((event_type, event.sender), _NO_HANDLERS) + handlers.get((event_type, None), _NO_HANDLERS):
+                self._call(handler, event)
+        self.dispatched += len(events)
+        for handler, event_types in self._batch_handlers:
+            selected = events if event_types is None else [event for event in events if isinstance(event, event_types)]
+            if selected:
+                self._call(handler, selected)
+
+    def _call(self, handler, argument):
+        try:
+            handler(argument)
+        except Exception as e:
+            logger.error(f"Event handler {getattr(handler, '__name__', handler)} failed: {e}")
+
+_NO_HANDLERS = []
+
+_default_bus = None
+_default_bus_lock = threading.Lock()
+
+def get_default_bus():
+    """
+    Get the process-wide event bus, created on first use.
+
+    Returns:
+        EventBus: The shared event bus.
+    """
+    global _default_bus
+    with _default_bus_lock:
+        if _default_bus is None:
+            _default_bus = EventBus()
+        return _default_bus
+
+def set_default_bus(bus):
+    """
+    Replace the process-wide event bus.
+
+    Args:
+        bus (EventBus): The event bus to share.
+    """
+    global _default_bus
+    with _default_bus_lock:
+        _default_bus = bus
@@ -1,165 +1,561 @@
-from datetime import datetime
 from paraglider import Paraglider
 from logger import get_logger
-import threading
 import puretrack_api as ptrk
-import database as db
-from datetime import timezone
+import kinematics
+import math
+from storage import create_storage
 from discord_bot import DiscordBot
 import asyncio
 from discord_api import DiscordApi
+from http_client import HttpClient
+from ingestion import AsyncIngestionEngine
+from roster import RosterSync
+from hot_tier import HotTier
+from retention import Retention
+from scheduler import TimerWheel, PeriodicTimer
+from clock import get_default_clock
+from event_bus import EventBus, StateChanged, Alert, Clearance, CycleCompleted
+from pipeline import Pipeline
+from polling import PollingCadence
+import time
 import json
 
 class GuardianAngel:
-    def __init__(self, cfg):
+    def __init__(self, cfg, trails=None):
+        """
+        Initialize the monitoring of the paragliders and start it.
+
+        Args:
+            cfg (dict): Configuration of the application ('guardian_angel' of config.json).
+            trails (callable, optional): trails(keys, cursors) -> {key: track}, the source of the trails of the
+                'sync' and 'pipeline' ingestions, as ptrk.get_puretrack_tails_batch. Default is PureTrack,
+                a replay passes its recorded tracks.
+        """
         self.logger = get_logger("GuardianAngel")
-        self._paragliders = []
+        # A single thread fires the timeouts of all the paragliders and the monitoring cycle
+        self._scheduler = TimerWheel(cfg.get('scheduler'))
+        # The events of the paragliders, those of a monitoring cycle are dispatched together at its end
+        self._bus = EventBus()
+        self._bus.subscribe_batch(self.on_clearances, (Clearance,))
+        self._paragliders = {} # Paragliders by PureTrack key
+        self._paragliders_cfg = {} # Configuration of each paraglider, by PureTrack key
+
+        # Pooled, keep-alive connections shared by the PureTrack and Discord calls
+        self.http_client = HttpClient(cfg.get('http_client'))
+        self._trails = trails if trails is not None else self._get_puretrack_trails
 
         # self.discord_bot = DiscordBot(cfg.get('discord_bot'))
         # self.discord_bot.landing_confirmed.connect(self.on_landing_confirmed)
         # self.discord_bot.start_in_thread()
-        self.discord_bot = DiscordApi(cfg.get('discord_bot'))
+        self.discord_bot = DiscordApi(cfg.get('discord_bot'), client=self.http_client)
 
         self.puretrack_site_cfg = cfg.get('puretrack_site')
         self.puretrack_grp = self.puretrack_site_cfg.get('group')
 
-        db.init_db_engine(cfg.get('database'))
-
-        # Get the list of all paragliders in the group
-        # config = []
-        # grp = ptrk.get_puretrack_group(cfg['puretrack_site']['group'])
-        # for paraglider in grp.get('members'):
-        #     p = {}
-        #     p["name"] = paraglider.get('label')
-        #     p["puretrack_key"] = paraglider.get('key')
-        #     p["discord_id"] = 0
-        #     p["phone_number"] = "+33700000000"
-        #     p["email"] = ""
-        #     config.append(p)
-        # with open('group.json', 'w') as f:
-        #     json.dump(config, f, indent=4)
-
-        # grpLive = ptrk.get_puretrack_group_live(cfg['puretrack_site']['group'])
-        # for paraglider in grpLive:
-        #     elt = ptrk.parse_puretrack_record(paraglider)
-        #     self.logger.info(f"{elt.get('key')} : {elt.get('name')} : {elt.get('label')}")
-        # ??? strange response
-
-        # Check that all the paragliders in the group are known. If not,...
-
-        # Add all known paragliders
+        # The points are stored by the 'backend' of the database configuration: 'sql' (default) or 'memory'
+        # With 'sql', all the writes go through a single writer thread and connection, one transaction per cycle
+        self._storage = create_storage(cfg.get('database'))
+        # The old points are purged on their own schedule, in chunks
+        self._retention = Retention(cfg.get('retention'), self._storage)
+
+        # The recent points of every paraglider in memory, read by the state evaluation
+        # The database is written behind, at the end of each cycle
+        self._hot_tier = HotTier(cfg.get('hot_tier'))
+
+        # Ingestion of the tracks: 'sync' (default), 'async' (concurrent, bounded by a deadline)
+        # or 'pipeline' (fetch, parse, store and evaluation overlapping across the paragliders, bounded by a deadline)
+        self._ingestion_cfg = cfg.get('ingestion', {})
+        self._ingestion = None
+        if self._ingestion_cfg.get('mode', 'sync') == 'async':
+            self._ingestion = AsyncIngestionEngine(self._ingestion_cfg, self._parse_track, client=self.http_client)
+        self.last_timings = None # Seconds spent in each stage of the last cycle
+
+        # Points waiting to be inserted at the end of the cycle: (paraglider_key, parsed_points, advance_cursor)
+        self._pending_points = []
+
+        # Timestamp of the last stored trail point of each paraglider, sent as 'from' to PureTrack
+        # Stored with the points to survive restarts, the snapshot points don't advance them
+        self._cursors = self._storage.get_trail_cursors()
+
+        # Polling: 'trails' (default) fetches the trail of every paraglider,
+        # 'snapshot' the latest position of the whole group in one live call and the trails of the suspicious paragliders only
+        self._poll_mode = self.puretrack_site_cfg.get('mode', 'trails')
+        self._live_session = ptrk.PureTrackLiveSession(self.puretrack_grp, client=self.http_client,
+                                                      token_ttl=self.puretrack_site_cfg.get('token_ttl', 3600))
+        self._snapshots = {} # Last snapshot point of each paraglider
+
+        # Polling cadence: 'fixed' (default) fetches every paraglider at each cycle,
+        # 'adaptive' only those due from their state, within a budget of requests per minute ('trails' mode only)
+        self._polling = None
+        polling_cfg = cfg.get('polling', {})
+        if polling_cfg.get('mode', 'fixed') == 'adaptive':
+            if self._poll_mode == 'trails':
+                self._polling = PollingCadence(polling_cfg)
+                self._bus.subscribe(StateChanged, self._polling.on_state_changed)
+            else:
+                self.logger.warning(f"Adaptive polling is not available in the {self._poll_mode} mode, every paraglider is polled.")
+
+        # The roster: the configured paragliders, plus the members of the PureTrack group if auto discovery is on
         # TODO - Restore previous states
-        for paraglider_cfg in cfg.get('paragliders'):
-            self.add_paraglider(paraglider_cfg)
+        self._roster = RosterSync(cfg.get('roster'), self.puretrack_grp, cfg.get('paragliders'), client=self.http_client)
+        self.apply_roster(self._roster.load())
 
         self._timer = None
-        self.start_monitoring()
+        # With an adaptive cadence, the cycles tick faster and only fetch the paragliders which are due
+        self.start_monitoring(self._polling.tick if self._polling is not None else 30)
+
+    @property
+    def bus(self):
+        return self._bus
+
+    @property
+    def scheduler(self):
+        return self._scheduler
 
     def add_paraglider(self, cfg):
-        paraglider = Paraglider(cfg)
-        self._paragliders.append(paraglider)
+        paraglider = Paraglider(cfg, scheduler=self._scheduler, bus=self._bus)
+        self._paragliders[paraglider.puretrack_key] = paraglider
+        self._paragliders_cfg[paraglider.puretrack_key] = cfg
 
-        # Connect signals
-        paraglider.alert.connect(self.on_alert)
-        paraglider.clearance.connect(self.on_clearance)
+        # Subscribe to the events of this paraglider only
+        self._bus.subscribe(Alert, self.on_alert, sender=paraglider)
+        self._bus.subscribe(Clearance, self.on_clearance, sender=paraglider)
 
         self.logger.info(f"Paraglider {paraglider.name} added.")
 
-    def remove_paraglider(self, name):
-        if name in self._paragliders:
-            # Disconnect signals
-            self._paragliders[name].alert.disconnect(self.on_alert)
-            self._paragliders[name].clearance.disconnect(self.on_clearance)
-
-            del self._paragliders[name]
-            self.logger.info(f"Paraglider {name} removed.")
+    def remove_paraglider(self, puretrack_key):
+        if paraglider := self._paragliders.pop(puretrack_key, None):
+            paraglider.cancel_timer()
+            self._bus.remove_sender(paraglider)
+            del self._paragliders_cfg[puretrack_key]
+            self._hot_tier.remove(puretrack_key)
+            if self._polling is not None:
+                self._polling.remove(puretrack_key)
+            self.logger.info(f"Paraglider {paraglider.name} removed.")
         else:
-            self.logger.info(f"Paraglider {name} does not exist.")
+            self.logger.info(f"Paraglider {puretrack_key} does not exist.")
+
+    def get_paraglider(self, puretrack_key):
+        return self._paragliders.get(puretrack_key, None)
+
+    def calculate_average_speed(self, puretrack_key, minutes=5):
+        """
+        Calculate the average speed of a paraglider over the last X minutes, from the hot tier or else the storage.
+
+        Args:
+            puretrack_key (str): The PureTrack key of the paraglider.
+            minutes (int): The time window in minutes.
+
+        Returns:
+            float: The average speed in m/s.
+        """
+        if (average_speed := self._hot_tier.calculate_average_speed(puretrack_key, minutes)) is not None:
+            return average_speed
+        self._storage.flush()
+        return self._storage.calculate_average_speed(puretrack_key, minutes)
+
+    def get_history(self, puretrack_key, minutes=30):
+        """
+        Get the points of a paraglider over the last X minutes, from the hot tier or else the storage.
+
+        Args:
+            puretrack_key (str): The PureTrack key of the paraglider.
+            minutes (int): The time window in minutes.
+
+        Returns:
+            list: The points sorted by datetime, as dicts of naive UTC datetimes and database columns.
+        """
+        if (history := self._hot_tier.get_history(puretrack_key, minutes)) is not None:
+            return history
+        self._storage.flush()
+        return self._storage.get_history(puretrack_key, minutes)
 
-    def get_paraglider(self, name):
-        return self._paragliders.get(name, None)
+    def apply_roster(self, roster):
+        """
+        Apply the difference between the live paragliders and a roster.
+
+        Only the paragliders which joined are created and only those which left are removed.
+        The others keep their state, the contact details of those whose configuration changed are updated in place.
+
+        Args:
+            roster (dict): The configuration of each paraglider ({puretrack_key: cfg}).
+        """
+        joined, left, changed = self._roster.diff(self._paragliders_cfg, roster)
+        for puretrack_key in left:
+            self.remove_paraglider(puretrack_key)
+        for cfg in joined:
+            self.add_paraglider(cfg)
+        for cfg in changed:
+            self._paragliders[cfg['puretrack_key']].configure(cfg)
+            self._paragliders_cfg[cfg['puretrack_key']] = cfg
+        if joined or left or changed:
+            self.logger.info(f"Roster: {len(joined)} joined, {len(left)} left, {len(changed)} changed, {len(self._paragliders)} paragliders.")
+
+    def sync_roster(self):
+        """
+        Sync the paragliders with the members of the PureTrack group.
+        """
+        if (roster := self._roster.fetch()) is not None:
+            self.apply_roster(roster)
 
     def start_monitoring(self, period=30):
         self.stop_monitoring()
-        self._timer = threading.Timer(period, self._update_states, args=(period,))
+        # Fixed rate: a cycle starts every period whatever the duration of the previous one, overruns are skipped
+        self._timer = PeriodicTimer(self._scheduler, period, self.update_states_from_tracking, period)
         self._timer.start()
 
-    def _update_states(self, duration):
-        try:
-            self.update_states_from_tracking(duration)
-        finally:
-            # Restart timer after execution
-            self.start_monitoring(duration)
-
     def stop_monitoring(self):
         if self._timer is not None:
             self._timer.cancel()
             self._timer = None
 
+    def close(self):
+        """
+        Stop the monitoring and release the scheduler, the ingestion engine, the Discord bot, the storage,
+        once its pending writes are done, and the HTTP client.
+        """
+        self.stop_monitoring()
+        self._scheduler.stop()
+        if self._ingestion is not None:
+            self._ingestion.close()
+        self.discord_bot.stop()
+        self._storage.close()
+        self.http_client.close()
+
     def update_states_from_tracking(self, duration):
-        session = db.SessionLocal()
+        cycle_start = time.perf_counter()
+        timings = {}
 
-        # Update database
-        for paraglider in self._paragliders:
-            paraglider_key = paraglider.puretrack_key
-            if tails := ptrk.get_puretrack_tails(paraglider_key, duration+2): # +2 to ensure we get the last point
-                tracks = tails.get('tracks')
-                if tracks[0].get('count') != 0:
-                    parsed_points = []
-                    last_parsed_point = ptrk.parse_puretrack_record(tracks[0].get('last'))
-                    points = tracks[0].get('points')
-                    # Reversed, the last first
-                    for point in reversed(points):
-                        parsed_point = ptrk.parse_puretrack_record(point)
-                        if parsed_point.get('timestamp') == last_parsed_point.get('timestamp'):
-                            # If timestamp is the same, the first record is the only true
-                            self.logger.debug("Point: not used. Always registered the first one.")
-                            continue
-                        if (last_parsed_point.get('speed_calc') == None):
-                            last_parsed_point['speed_calc'] = round(ptrk.calculate_speed(parsed_point, last_parsed_point), 2)
-                        self.logger.info(f"Point: {last_parsed_point}")
-                        parsed_points.append(last_parsed_point)
-                        last_parsed_point = parsed_point
-                        pass
-
-                    # Add the new points to the database
-                    db.update_paraglider_data(session, paraglider_key, parsed_points)
-
-        # Update paragliders states
-        # TODO - Check if the paraglider is in the database
-        for paraglider in self._paragliders:
+        # The roster is synced on its own, slower, schedule
+        if self._roster.due():
+            self.sync_roster()
+
+        # The buffers of the paragliders stay in the hot tier until they are evaluated, the memory cap is enforced after
+        self._hot_tier.pin(self._paragliders)
+        try:
+            # The paragliders missing from the hot tier are loaded once from the storage
+            if cold_keys := [puretrack_key for puretrack_key in self._paragliders if puretrack_key not in self._hot_tier]:
+                self._load_hot_tier(cold_keys)
+
+            # The events of the cycle are dispatched in one batch, after all the paragliders are updated
+            with self._bus.batch():
+                # Update hot tier
+                # All the paragliders are fetched together, a few /api/trails requests per cycle
+                # Only the points since the last stored one are requested
+                keys = [paraglider.puretrack_key for paraglider in self._paragliders.values()]
+                if self._poll_mode == 'snapshot':
+                    keys = self._update_from_snapshot()
+                elif self._polling is not None:
+                    keys = self._polling.select(self._paragliders, self._trails_chunk_size())
+                    self.logger.debug(f"Polling: {len(keys)} of {len(self._paragliders)} paragliders due.")
+                evaluated = set()
+                start = time.perf_counter()
+                if keys and self._ingestion_cfg.get('mode', 'sync') == 'pipeline':
+                    # The states of the paragliders are updated as soon as their points are stored
+                    timings.update(self._run_pipeline(keys, evaluated))
+                elif keys and self._ingestion is not None:
+                    self._ingestion.run_cycle(keys, self._trails_cursors(keys), self._store_points)
+                    timings['ingestion'] = time.perf_counter() - start
+                elif keys:
+                    tracks = self._trails(keys, self._trails_cursors(keys))
+                    for paraglider_key, track in tracks.items():
+                        if parsed_points := self._parse_track(track):
+                            self._store_points(paraglider_key, parsed_points)
+                    timings['ingestion'] = time.perf_counter() - start
+
+                # Update the states of the other paragliders
+                start = time.perf_counter()
+                self._evaluate([puretrack_key for puretrack_key in self._paragliders if puretrack_key not in evaluated])
+                timings['evaluate'] = timings.get('evaluate', 0.0) + time.perf_counter() - start
+        finally:
+            self._hot_tier.unpin()
+
+        # Add the new points of the whole fleet to the storage, behind the cycle
+        start = time.perf_counter()
+        self._flush_points()
+        timings['flush'] = time.perf_counter() - start
+        self.logger.debug(f"Hot tier: {self._hot_tier.memory_usage()} bytes")
+
+        # Purge the storage of old points, from time to time
+        if self._retention.due():
+            self._retention.start()
+
+        timings['cycle'] = time.perf_counter() - cycle_start
+        self.last_timings = timings
+        overruns = self._timer.overruns if self._timer is not None else 0
+        self.logger.info("Cycle: " + ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in timings.items()) + f", {overruns} overruns")
+        self._bus.publish(CycleCompleted(self, timings, overruns))
+
+    def _run_pipeline(self, keys, evaluated):
+        """
+        Fetch, parse, store the tracks and evaluate the states of the paragliders in a staged pipeline.
+
+        A chunk of paragliders is fetched while the tracks of the previous ones are parsed, stored and
+        evaluated. The evaluation stays on the monitoring thread.
+        As with the 'async' ingestion, the chunks not fetched by the 'deadline' of the cycle are skipped,
+        their paragliders are fetched at the next cycle.
+
+        Args:
+            keys (list): The PureTrack keys of the paragliders to fetch.
+            evaluated (set): Filled with the keys of the paragliders whose state was updated.
+
+        Returns:
+            dict: The seconds spent in each stage, summed over its workers, and in the whole 'ingestion'.
+        """
+        chunk_size = self._trails_chunk_size()
+        cursors = self._trails_cursors(keys)
+        deadline = self._ingestion_cfg.get('deadline', 25)
+        end = time.monotonic() + deadline
+        skipped = []
+
+        def fetch(chunk):
+            if time.monotonic() > end:
+                skipped.extend(chunk)
+                return ()
+            return self._trails(chunk, cursors).items()
+
+        def parse(item):
+            paraglider_key, track = item
+            if parsed_points := self._parse_track(track):
+                return [(paraglider_key, parsed_points)]
+            return []
+
+        def store(item):
+            self._store_points(*item)
+            return [item[0]]
+
+        def evaluate(paraglider_key):
+            self._evaluate([paraglider_key])
+            evaluated.add(paraglider_key)
+
+        pipeline = Pipeline([
+            ('fetch', fetch, self._ingestion_cfg.get('concurrency', 8)),
+            ('parse', parse, 2),
+            ('store', store),
+            ('evaluate', evaluate)
+        ], queue_size=self._ingestion_cfg.get('queue_size', 4))
+        timings = pipeline.run(keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size))
+        if skipped:
+            self.logger.warning(f"Cycle deadline of {deadline} s reached, {len(skipped)} paragliders skipped.")
+        self.logger.debug(f"Pipeline: {timings}")
+        stages = {stage: timings[stage]['busy'] for stage in ('fetch', 'parse', 'store', 'evaluate')}
+        stages['ingestion'] = timings['elapsed']
+        return stages
+
+    def _trails_chunk_size(self):
+        # Keys per /api/trails request of the ingestion mode
+        if self._ingestion is not None:
+            return self._ingestion.chunk_size
+        if self._ingestion_cfg.get('mode', 'sync') == 'pipeline':
+            return self._ingestion_cfg.get('chunk_size', ptrk.TRAILS_CHUNK_SIZE)
+        return ptrk.TRAILS_CHUNK_SIZE
+
+    def _evaluate(self, keys):
+        """
+        Update the states of paragliders from their last known point and average speed over the last 5 minutes, from the hot tier.
+
+        Args:
+            keys (list): The PureTrack keys of the paragliders.
+        """
+        # A buffer without the whole window, e.g. created by the new points of an evicted paraglider, is completed first
+        if uncovered := self._hot_tier.uncovered(keys, minutes=5):
+            self._load_hot_tier(uncovered)
+        fleet_state = self._hot_tier.get_fleet_state(keys, minutes=5)
+        for puretrack_key in keys:
+            if (paraglider := self._paragliders.get(puretrack_key)) is None:
+                continue
             # Update paraglider's speed, coordinates, and course
-            # Retrieve the last known state of the paraglider from the database
-            last_state = db.get_last_paraglider_state(session, paraglider.puretrack_key)
-            if last_state:
-                paraglider.update({
-                    'datetime': last_state.datetime.replace(tzinfo=timezone.utc), # SQLite doesn't save Time Zone
-                    'coordinates': (last_state.latitude, last_state.longitude),
-                    'course': last_state.course,
-                    'altitude_gnd_calc': last_state.altitude_gnd_calc,
-                    # paraglider.speed = last_state.get('speed', last_known_state.get('speed_calc', 0))
-                    'speed': last_state.speed,
-                    'avg_speed': db.calculate_average_speed(session, paraglider.puretrack_key, minutes=5) # Calculate the average speed over the last 5 minutes
-                })
+            if last_state := fleet_state.get(puretrack_key):
+                paraglider.update(last_state)
             else:
                 pass # TODO - See later if something is needed
 
             # Log the state of each paraglider
             self.logger.info(f"Paraglider {paraglider.name} / {paraglider.puretrack_key} state: {paraglider.state}")
 
-        # Purge the database of old points
-        db.purge_old_data(session)
+    def _load_hot_tier(self, keys):
+        """
+        Load the recent points of paragliders from the storage into the hot tier.
+
+        The points of the previous cycles are written first, the points of the cycle are already in the hot tier.
+
+        Args:
+            keys (list): The PureTrack keys of the paragliders.
+        """
+        self._storage.flush()
+        self._hot_tier.load(self._storage, keys)
+
+    def _update_from_snapshot(self):
+        """
+        Store the latest position of every paraglider from a single live call of the group.
+
+        The cursors are not advanced by the snapshot points, the next trail of a paraglider
+        still covers everything since its last trail.
+
+        Returns:
+            list: The keys of the paragliders whose full trail is needed.
+        """
+        records = self._live_session.get_group_live()
+        if records is None:
+            # No snapshot, every trail is needed
+            return [paraglider.puretrack_key for paraglider in self._paragliders.values()]
+
+        snapshot = {}
+        for point in ptrk.parse_puretrack_records(records, ptrk.TRACK_FIELDS + ('key',)):
+            key = point.get('key')
+            if key and point.get('timestamp') and point['timestamp'] > snapshot.get(key, {}).get('timestamp', 0):
+                snapshot[key] = point
+
+        suspicious_keys = []
+        for paraglider in self._paragliders.values():
+            paraglider_key = paraglider.puretrack_key
+            point = snapshot.get(paraglider_key)
+            if point is None or self._is_suspicious(paraglider, point):
+                suspicious_keys.append(paraglider_key)
+                continue
+
+            previous_point = self._snapshots.get(paraglider_key)
+            if previous_point and point['timestamp'] <= previous_point['timestamp']:
+                continue # Nothing new
+            if previous_point:
+                point['speed_calc'] = round(ptrk.calculate_speed(previous_point, point), 2)
+            self._snapshots[paraglider_key] = point
+            self._queue_points(paraglider_key, [point], False)
+
+        self.logger.info(f"Snapshot: {len(snapshot)} positions, {len(suspicious_keys)} trails needed")
+        return suspicious_keys
+
+    def _is_suspicious(self, paraglider, point):
+        """
+        Check whether the snapshot position of a paraglider may change its state, so its full trail is needed.
 
-        session.close()
+        Args:
+            paraglider (Paraglider): The paraglider.
+            point (dict): Its parsed snapshot point.
 
-    def update_state_from_discord(self, name, message):
-        paraglider = self.get_paraglider(name)
+        Returns:
+            bool: True if the full trail is needed.
+        """
+        if paraglider.state not in ('Flying', 'Landed'):
+            return True # Unknown, Clearance, Alert, Disconnected: every point matters
+        if point.get('speed') is None or point.get('datetime') is None or point.get('lat') is None or point.get('lon') is None:
+            return True
+        if (get_default_clock().now() - point['datetime']).total_seconds() > 300:
+            return True # May be disconnected
+        if paraglider.state == 'Flying':
+            return not (2.78 < point['speed'] <= 16.67) # Stopped or too fast
+        return point['speed'] > 2.78 # Landed, may fly again
+
+    def _get_puretrack_trails(self, keys, cursors):
+        # The chunks of the pipeline are fetched in a single request each
+        chunk_size = max(len(keys), 1) if self._ingestion_cfg.get('mode', 'sync') == 'pipeline' else ptrk.TRAILS_CHUNK_SIZE
+        return ptrk.get_puretrack_tails_batch(keys, ptrk.TRAILS_CATCHUP_LIMIT, chunk_size=chunk_size, cursors=cursors, client=self.http_client)
+
+    def _trails_cursors(self, keys):
+        """
+        Get the 'from' value to send to PureTrack for each paraglider.
+
+        The last stored point is requested again (from - 1, whether PureTrack's bound is inclusive or not)
+        so that it is the reference of the speed calculation of the first new point.
+
+        Args:
+            keys (list): The PureTrack keys of the paragliders.
+
+        Returns:
+            dict: The 'from' Unix timestamp of each key with a stored point.
+        """
+        return {key: self._cursors[key] - 1 for key in keys if key in self._cursors}
+
+    def _store_points(self, paraglider_key, parsed_points):
+        """
+        Queue the new points of a paraglider, they are inserted by _flush_points at the end of the cycle.
+
+        Args:
+            paraglider_key (str): The PureTrack key of the paraglider.
+            parsed_points (list): The parsed points, the last first.
+        """
+        self._queue_points(paraglider_key, parsed_points, True)
+
+    def _queue_points(self, paraglider_key, parsed_points, advance_cursor):
+        """
+        Add new points to the hot tier, where they are read at once, and queue them for the storage.
+
+        Args:
+            paraglider_key (str): The PureTrack key of the paraglider.
+            parsed_points (list): The parsed points.
+            advance_cursor (bool): Whether the points advance the 'from' cursor of the paraglider once stored.
+        """
+        self._hot_tier.add_points(paraglider_key, parsed_points)
+        self._pending_points.append((paraglider_key, parsed_points, advance_cursor))
+
+    def _flush_points(self):
+        """
+        Queue the insertion of the points of the whole fleet in the storage, one statement and one commit with 'sql'.
+        The cursors advance once the points are committed.
+        """
+        pending, self._pending_points = self._pending_points, []
+        points_by_key = {}
+        cursors = {}
+        for paraglider_key, parsed_points, advance_cursor in pending:
+            points_by_key.setdefault(paraglider_key, []).extend(parsed_points)
+            if advance_cursor:
+                cursors[paraglider_key] = max(cursors.get(paraglider_key, 0), parsed_points[0]['timestamp'])
+
+        def advance_cursors(count):
+            self.logger.debug(f"{count} points stored for {len(points_by_key)} paragliders")
+            for paraglider_key, timestamp in cursors.items():
+                self._cursors[paraglider_key] = max(self._cursors.get(paraglider_key, 0), timestamp)
+
+        if points_by_key:
+            self._storage.insert_points(points_by_key, on_commit=advance_cursors, cursors=cursors)
+
+    def _parse_track(self, track):
+        """
+        Parse the points of a PureTrack track.
+
+        Args:
+            track (dict): A track of the /api/trails response.
+
+        Returns:
+            list: The parsed points, the last first.
+        """
+        parsed_points = []
+        if track.get('count') != 0:
+            # The last record and the points are parsed at once, restricted to the fields used
+            last_parsed_point, *parsed = ptrk.parse_puretrack_records([track.get('last')] + track.get('points'))
+            # Reversed, the last first
+            kept_points = [last_parsed_point]
+            for parsed_point in reversed(parsed):
+                if parsed_point.get('timestamp') == kept_points[-1].get('timestamp'):
+                    # If timestamp is the same, the first record is the only true
+                    self.logger.debug("Point: not used. Always registered the first one.")
+                    continue
+                kept_points.append(parsed_point)
+
+            # Speed of each point from the previous one, for the whole trail at once
+            # The oldest point is only the reference of the next one
+            chronological = kept_points[::-1]
+            segments = kinematics.track_kinematics(
+                [point.get('timestamp') for point in chronological],
+                [point.get('lat') for point in chronological],
+                [point.get('lon') for point in chronological]
+            )
+            speeds = segments['ground_speed'][::-1]
+            for point, speed in zip(kept_points[:-1], speeds):
+                if (point.get('speed_calc') == None) and not math.isnan(speed):
+                    point['speed_calc'] = round(float(speed), 2)
+                self.logger.info(f"Point: {point}")
+                parsed_points.append(point)
+        return parsed_points
+
+    def update_state_from_discord(self, puretrack_key, message):
+        paraglider = self.get_paraglider(puretrack_key)
         if paraglider is not None:
             if message == "landed":
                 paraglider.landingConfirmed()
 
-    def on_alert(self, sender, message):
-        self.logger.info(f"Alert signal received from {sender.name}")
+    def on_alert(self, event):
+        self.logger.info(f"Alert signal received from {event.sender.name}")
         # TODO - If several alerts are sent, how do you manage the message ids?
         # Sends a message to the guardian angel to check the paraglider
         #  Save the message id to check the response later
@@ -168,16 +564,32 @@ class GuardianAngel:
 
         # Sends a message to inform the paraglider about the alert
 
-    def on_clearance(self, sender, message):
+    def on_clearance(self, event):
+        sender = event.sender
         self.logger.info(f"Clearance signal received from {sender.name} : discord_id {sender.discord_id}")
         # TODO - Threads
         # Sends a message to the paraglider to confirm the landing
         # asyncio.create_task(self.discord_bot.post_waiting_landing_confirmation(sender.discord_id))
         # Waits for the paraglider's response
         #  If the paraglider confirms the landing, call paraglider.landingConfirmed()
-        hour= datetime.now().strftime("%H:%M:%S")
-        message = f"[{sender.name}](https://puretrack.io/?l=44.91038,5.19237&z=15&group={self.puretrack_grp}&k={sender.puretrack_key}) - 🕵I've detected your landing at {hour} 🏁. Is everything ok ❓"
-        self.discord_bot.send_message(message)
+
+    def on_clearances(self, events):
+        """
+        Ask the paragliders which entered Clearance to confirm their landing, in as few Discord messages as possible.
+
+        Args:
+            events (list): The Clearance events of a cycle.
+        """
+        lines = []
+        for event in events:
+            sender = event.sender
+            if self._paragliders.get(sender.puretrack_key) is not sender:
+                continue # Not in the roster, e.g. created meanwhile or removed
+            # Hour of the event in the local time of the paraglider
+            hour = event.datetime.astimezone(ptrk.get_local_timezone(*sender.coordinates)).strftime("%H:%M:%S")
+            lines.append(f"[{sender.name}](https://puretrack.io/?l=44.91038,5.19237&z=15&group={self.puretrack_grp}&k={sender.puretrack_key}) - 🕵I've detected your landing at {hour} 🏁. Is everything ok ❓")
+        if lines:
+            self.discord_bot.send_messages(lines)
 
     def on_landing_confirmed(self, sender, message):
         self.logger.info(f"Landing confirmed received from {sender.name}")
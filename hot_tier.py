@@ -0,0 +1,405 @@
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+import numpy as np
+from clock import get_default_clock
+from logger import get_logger
+import kinematics
+from window_stats import TrackStatistics
+
+logger = get_logger(__name__)
+
+# Columns of the buffers, named after the columns of the database
+COLUMNS = ('timestamp', 'latitude', 'longitude', 'course', 'speed', 'speed_calc', 'altitude', 'altitude_gnd_calc')
+# The same values in a parsed PureTrack point
+POINT_FIELDS = ('timestamp', 'lat', 'lon', 'course', 'speed', 'speed_calc', 'alt_gps', 'alt_gnd_calc')
+
+TIMESTAMP, LATITUDE, LONGITUDE, COURSE, SPEED, SPEED_CALC, ALTITUDE, ALTITUDE_GND_CALC = range(len(COLUMNS))
+
+class TrackBuffer:
+    """
+    Ring buffer of the recent points of a paraglider, one float64 row per column and one column per point.
+
+    The array grows up to `capacity` points, then the oldest points are overwritten. The points older
+    than `window` seconds before the last one are dropped, the last point is always kept.
+    Missing values are stored as NaN. The sliding-window statistics of the points are kept up to date.
+    """
+    def __init__(self, capacity, window, complete_since, size=64, statistics_windows=(1, 5, 10)):
+        """
+        Initialize an empty buffer.
+
+        Args:
+            capacity (int): Maximum number of points.
+            window (float): Seconds of track kept before the last point.
+            complete_since (float): The buffer holds every point of the paraglider since this Unix timestamp.
+            size (int, optional): Initial number of allocated points. Default is 64.
+            statistics_windows (sequence, optional): Durations in minutes of the statistics windows.
+        """
+        self.capacity = capacity
+        self.window = window
+        self.complete_since = complete_since
+        self._data = np.full((len(COLUMNS), min(size, capacity)), np.nan)
+        self._start = 0
+        self._count = 0
+        self.statistics = TrackStatistics(statistics_windows)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes + self.statistics.nbytes
+
+    @property
+    def last_timestamp(self):
+        if self._count == 0:
+            return None
+        return self._data[TIMESTAMP, (self._start + self._count - 1) % self._data.shape[1]]
+
+    def last(self):
+        return self._data[:, (self._start + self._count - 1) % self._data.shape[1]].copy()
+
+    def extend(self, rows):
+        """
+        Add points to the buffer.
+
+        Points newer than the last one are appended, older ones (e.g. a trail received after a snapshot point)
+        are merged in time order. A point whose timestamp is already in the buffer is ignored, as in the database.
+
+        Args:
+            rows (np.ndarray): The points, one column per point, sorted by timestamp.
+        """
+        if rows.shape[1] == 0:
+            return
+        last_timestamp = self.last_timestamp
+        if last_timestamp is not None and rows[TIMESTAMP, 0] <= last_timestamp:
+            merged = np.concatenate((self.columns(), rows), axis=1)
+            # The first occurrence of a timestamp is kept, the buffered one
+            _, first = np.unique(merged[TIMESTAMP], return_index=True)
+            self._reset(merged[:, first])
+            ordered = self.columns()
+            self.statistics.rebuild(ordered[TIMESTAMP], ordered[SPEED], ordered[LATITUDE], ordered[LONGITUDE])
+            return
+        for i in range(rows.shape[1]):
+            self._append(rows[:, i])
+        for point in rows[[TIMESTAMP, SPEED, LATITUDE, LONGITUDE]].T.tolist():
+            self.statistics.add(*point)
+        self._expire()
+
+    def columns(self, since=None):
+        """
+        Get the points in time order.
+
+        Args:
+            since (float, optional): Only the points from this Unix timestamp.
+
+        Returns:
+            np.ndarray: A copy of the points, one column per point.
+        """
+        size = self._data.shape[1]
+        end = self._start + self._count
+        if end <= size:
+            ordered = self._data[:, self._start:end]
+        else:
+            ordered = np.concatenate((self._data[:, self._start:], self._data[:, :end - size]), axis=1)
+        if since is not None:
+            ordered = ordered[:, np.searchsorted(ordered[TIMESTAMP], since):]
+        return ordered.copy()
+
+    def covers(self, since):
+        return since >= self.complete_since
+
+    def _append(self, values):
+        size = self._data.shape[1]
+        if self._count == size and size < self.capacity:
+            self._reset(self.columns(), size=min(2 * size, self.capacity))
+            size = self._data.shape[1]
+        if self._count == size:
+            # Full, the oldest point is overwritten
+            self._drop_oldest()
+        self._data[:, (self._start + self._count) % size] = values
+        self._count += 1
+
+    def _drop_oldest(self):
+        dropped = self._data[TIMESTAMP, self._start]
+        self.complete_since = max(self.complete_since, float(np.nextafter(dropped, np.inf)))
+        self._start = (self._start + 1) % self._data.shape[1]
+        self._count -= 1
+
+    def _expire(self):
+        threshold = self.last_timestamp - self.window
+        while self._count > 1 and self._data[TIMESTAMP, self._start] < threshold:
+            self._drop_oldest()
+
+    def _reset(self, ordered, size=None):
+        if ordered.shape[1] > self.capacity:
+            self.complete_since = max(self.complete_since, float(np.nextafter(ordered[TIMESTAMP, -self.capacity - 1], np.inf)))
+            ordered = ordered[:, -self.capacity:]
+        size = max(size or self._data.shape[1], ordered.shape[1])
+        self._data = np.full((len(COLUMNS), size), np.nan)
+        self._data[:, :ordered.shape[1]] = ordered
+        self._start = 0
+        self._count = ordered.shape[1]
+        if self._count:
+            self._expire()
+
+class HotTier:
+    """
+    In-memory copy of the recent points of every paraglider, read by the state evaluation.
+
+    The new points are added here first, the database is the durable store written behind. A paraglider
+    missing from the hot tier (at start, after joining the roster or after an eviction) is loaded once from
+    the database. When the buffers use more than `max_memory` bytes, the least recently updated paragliders
+    are evicted, except the pinned ones: the cap is enforced again once they are released.
+
+    The fleet state is only computed from the buffers holding the whole time window: the others, e.g. created
+    by the new points of an evicted paraglider, are completed from the database first (cf. uncovered and load).
+    """
+    def __init__(self, cfg):
+        """
+        Initialize the hot tier.
+
+        Args:
+            cfg (dict): Configuration of the hot tier, e.g.
+                {
+                    "window": 1800,             # Seconds of track kept per paraglider
+                    "max_rate": 1,              # Maximum points per second of a tracker
+                    "capacity": 1801,           # Maximum number of points per paraglider, default the window
+                                                # at the maximum rate: a buffer overflowing within the window
+                                                # no longer holds it, cf. uncovered
+                    "max_memory": 67108864,     # Memory cap of the buffers in bytes
+                    "statistics_windows": [1, 5, 10]    # Durations in minutes of the sliding-window statistics
+                }
+        """
+        cfg = cfg or {}
+        self.window = cfg.get('window', 1800)
+        self.max_rate = cfg.get('max_rate', 1)
+        self.capacity = cfg.get('capacity', math.ceil(self.window * self.max_rate) + 1)
+        self.max_memory = cfg.get('max_memory', 64 * 1024 * 1024)
+        self.statistics_windows = tuple(cfg.get('statistics_windows', (1, 5, 10)))
+        self._buffers = OrderedDict() # TrackBuffer by PureTrack key, the least recently updated first
+        self._sizes = {} # Size of each buffer when it was last updated
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._pinned = set() # Keys of the paragliders kept from eviction
+        self.evictions = 0
+
+    def __contains__(self, paraglider_key):
+        with self._lock:
+            return paraglider_key in self._buffers
+
+    def load(self, storage, keys):
+        """
+        Load the recent points of paragliders from the storage.
+
+        The points already in the buffer of a paraglider, e.g. the new points of a paraglider evicted meanwhile,
+        are kept: the loaded points are merged with them.
+
+        Args:
+            storage (Storage): The storage of the points.
+            keys (list): The PureTrack keys of the paragliders.
+        """
+        since = get_default_clock().now() - timedelta(seconds=self.window)
+        points_by_key = storage.get_recent_points(keys, since)
+        with self._lock:
+            for paraglider_key in keys:
+                buffer = self._buffers.get(paraglider_key)
+                if buffer is None:
+                    buffer = self._new_buffer(since.timestamp())
+                else:
+                    buffer.complete_since = min(buffer.complete_since, since.timestamp())
+                rows = [
+                    [point['datetime'].replace(tzinfo=timezone.utc).timestamp()] + # SQLite doesn't save Time Zone
+                    [np.nan if point[column] is None else point[column] for column in COLUMNS[1:]]
+                    for point in points_by_key.get(paraglider_key, [])
+                ]
+                buffer.extend(np.array(rows, dtype=float).T.reshape(len(COLUMNS), len(rows)))
+                self._put(paraglider_key, buffer)
+            self._enforce_memory_cap()
+
+    def add_points(self, paraglider_key, points):
+        """
+        Add the new points of a paraglider.
+
+        Args:
+            paraglider_key (str): The PureTrack key of the paraglider.
+            points (list): The parsed points, in any order.
+        """
+        rows = np.array(
+            [[np.nan if point.get(field) is None else point[field] for field in POINT_FIELDS] for point in points],
+            dtype=float
+        ).T.reshape(len(COLUMNS), len(points))
+        rows = rows[:, np.argsort(rows[TIMESTAMP], kind='stable')]
+        with self._lock:
+            buffer = self._buffers.get(paraglider_key)
+            if buffer is None:
+                # Not loaded, complete from its first new point only
+                buffer = self._new_buffer(rows[TIMESTAMP, 0] if len(points) else np.inf)
+            buffer.extend(rows)
+            self._put(paraglider_key, buffer)
+            self._enforce_memory_cap()
+
+    def remove(self, paraglider_key):
+        with self._lock:
+            self._pinned.discard(paraglider_key)
+            if self._buffers.pop(paraglider_key, None):
+                self._nbytes -= self._sizes.pop(paraglider_key)
+
+    def pin(self, keys):
+        """
+        Keep the buffers of paragliders from eviction until unpin, e.g. the paragliders of a monitoring cycle.
+        While buffers are pinned, the memory cap is not enforced.
+
+        Args:
+            keys (iterable): The PureTrack keys of the paragliders.
+        """
+        with self._lock:
+            self._pinned.update(keys)
+
+    def unpin(self):
+        """
+        Release the pinned buffers, the least recently updated are evicted if the memory cap is exceeded.
+        """
+        with self._lock:
+            self._pinned.clear()
+            self._enforce_memory_cap()
+
+    def uncovered(self, keys, minutes=5):
+        """
+        Get the paragliders whose buffer doesn't hold the whole time window, to load them from the storage.
+
+        Args:
+            keys (list): The PureTrack keys of the paragliders.
+            minutes (int): The time window in minutes.
+
+        Returns:
+            list: The keys of the paragliders missing from the hot tier or whose buffer starts within the window.
+        """
+        since = get_default_clock().now().timestamp() - minutes * 60
+        with self._lock:
+            return [
+                paraglider_key for paraglider_key in keys
+                if (buffer := self._buffers.get(paraglider_key)) is None or not buffer.covers(since)
+            ]
+
+    def memory_usage(self):
+        """
+        Get the memory used by the buffers.
+
+        Returns:
+            int: The size of the buffers in bytes.
+        """
+        with self._lock:
+            return self._nbytes
+
+    def get_fleet_state(self, keys, minutes=5):
+        """
+        Get, for every paraglider, its last known point and its time-weighted average speed over the last X minutes.
+
+        The state also holds the sliding-window statistics of the paraglider, 'statistics' by window duration in
+        minutes, and the average speed comes from them when X is one of these durations.
+        The paragliders whose buffer doesn't hold the whole window are left out, cf. uncovered.
+
+        Args:
+            keys (list): The PureTrack keys of the paragliders.
+            minutes (int): The time window of the average speed in minutes.
+
+        Returns:
+            dict: The state of each paraglider with a point, as database.get_fleet_state ({paraglider_key: state}).
+        """
+        now = get_default_clock().now().timestamp()
+        since = now - minutes * 60
+        fleet_state = {}
+        with self._lock:
+            for paraglider_key in keys:
+                buffer = self._buffers.get(paraglider_key)
+                if buffer is None or len(buffer) == 0:
+                    continue
+                if not buffer.covers(since):
+                    # An average over a shortened window would detect a landing too early
+                    logger.debug(f"Hot tier: {paraglider_key} doesn't hold the last {minutes} minutes")
+                    continue
+                statistics = buffer.statistics.statistics(now)
+                if minutes in statistics:
+                    avg_speed = statistics[minutes]['avg_speed']
+                else:
+                    recent = buffer.columns(since)
+                    avg_speed = kinematics.time_weighted_average(recent[TIMESTAMP], recent[SPEED])
+                last = buffer.last()
+                fleet_state[paraglider_key] = {
+                    'datetime': datetime.fromtimestamp(last[TIMESTAMP], timezone.utc),
+                    'coordinates': (_value(last[LATITUDE]), _value(last[LONGITUDE])),
+                    'course': _value(last[COURSE]),
+                    'altitude_gnd_calc': _value(last[ALTITUDE_GND_CALC]),
+                    'speed': _value(last[SPEED]),
+                    'avg_speed': round(avg_speed, 2),
+                    'statistics': statistics
+                }
+        return fleet_state
+
+    def calculate_average_speed(self, paraglider_key, minutes=5):
+        """
+        Calculate the average speed of a paraglider over the last X minutes, as database.calculate_average_speed.
+
+        Args:
+            paraglider_key (str): The PureTrack key of the paraglider.
+            minutes (int): The time window in minutes.
+
+        Returns:
+            float or None: The average speed in m/s, None if the hot tier doesn't hold the whole window.
+        """
+        if (recent := self._recent_columns(paraglider_key, minutes)) is None:
+            return None
+        return round(kinematics.time_weighted_average(recent[TIMESTAMP], recent[SPEED]), 2)
+
+    def get_history(self, paraglider_key, minutes=30):
+        """
+        Get the points of a paraglider over the last X minutes.
+
+        Args:
+            paraglider_key (str): The PureTrack key of the paraglider.
+            minutes (int): The time window in minutes.
+
+        Returns:
+            list or None: The points as database rows (dicts), None if the hot tier doesn't hold the whole window.
+        """
+        if (recent := self._recent_columns(paraglider_key, minutes)) is None:
+            return None
+        history = []
+        for values in recent.T:
+            point = {column: _value(value) for column, value in zip(COLUMNS[1:], values[1:])}
+            # SQLite doesn't save Time Zone, the database rows are naive UTC
+            point['datetime'] = datetime.fromtimestamp(values[TIMESTAMP], timezone.utc).replace(tzinfo=None)
+            history.append(point)
+        return history
+
+    def _recent_columns(self, paraglider_key, minutes):
+        since = get_default_clock().now().timestamp() - minutes * 60
+        with self._lock:
+            buffer = self._buffers.get(paraglider_key)
+            if buffer is None or not buffer.covers(since):
+                return None
+            return buffer.columns(since)
+
+    def _new_buffer(self, complete_since):
+        return TrackBuffer(self.capacity, self.window, complete_since, statistics_windows=self.statistics_windows)
+
+    def _put(self, paraglider_key, buffer):
+        self._buffers[paraglider_key] = buffer
+        self._buffers.move_to_end(paraglider_key)
+        nbytes = buffer.nbytes
+        self._nbytes += nbytes - self._sizes.get(paraglider_key, 0)
+        self._sizes[paraglider_key] = nbytes
+
+    def _enforce_memory_cap(self):
+        if self._pinned:
+            return
+        while self._nbytes > self.max_memory and len(self._buffers) > 1:
+            paraglider_key, _ = self._buffers.popitem(last=False)
+            self._nbytes -= self._sizes.pop(paraglider_key)
+            self.evictions += 1
+            logger.warning(f"Hot tier over {self.max_memory} bytes, {paraglider_key} evicted")
+
+def _value(value):
+    return None if np.isnan(value) else float(value)
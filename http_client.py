@@ -0,0 +1,106 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+class HttpClient:
+    """
+    HTTP client shared by the PureTrack and Discord calls.
+
+    A single `requests.Session` keeps the connections alive and pools them per host,
+    so consecutive calls don't pay a new TCP and TLS handshake.
+    """
+    def __init__(self, cfg=None):
+        """
+        Initialize the HTTP client.
+
+        Args:
+            cfg (dict, optional): Configuration of the client, e.g.
+                {
+                    "timeout": [3.05, 10],      # Default (connect, read) timeout in seconds
+                    "pool_connections": 10,     # Number of hosts whose pools are kept
+                    "pool_maxsize": 10,         # Default number of connections kept per host
+                    "max_retries": 0,
+                    "hosts": {"puretrack.io": {"pool_maxsize": 20}}
+                }
+        """
+        cfg = cfg or {}
+        timeout = cfg.get('timeout', (3.05, 10))
+        self.timeout = tuple(timeout) if isinstance(timeout, list) else timeout
+
+        self._session = requests.Session()
+        self._session.headers.update({'Connection': 'keep-alive'})
+
+        pool_connections = cfg.get('pool_connections', 10)
+        pool_maxsize = cfg.get('pool_maxsize', 10)
+        max_retries = cfg.get('max_retries', 0)
+        default_adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+        self._session.mount('https://', default_adapter)
+        self._session.mount('http://', default_adapter)
+
+        # Per host pool sizing, the most specific prefix wins
+        for host, host_cfg in cfg.get('hosts', {}).items():
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=host_cfg.get('pool_maxsize', pool_maxsize),
+                max_retries=host_cfg.get('max_retries', max_retries)
+            )
+            self._session.mount(f'https://{host}/', adapter)
+            self._session.mount(f'http://{host}/', adapter)
+
+    @property
+    def cookies(self):
+        return self._session.cookies
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request with the client's pooled session.
+
+        Args:
+            method (str): HTTP method.
+            url (str): URL of the request.
+            **kwargs: Arguments of `requests.Session.request`. The default timeout is applied if none is given.
+
+        Returns:
+            requests.Response: The response.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        return self._session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self._session.close()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_default_client():
+    """
+    Get the process-wide HTTP client, created on first use.
+
+    Returns:
+        HttpClient: The shared client.
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+def set_default_client(client):
+    """
+    Replace the process-wide HTTP client.
+
+    Args:
+        client (HttpClient): The client to share.
+    """
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logger import get_logger
+import puretrack_api as ptrk
+
+class AsyncIngestionEngine:
+    """
+    Asyncio alternative to the synchronous ingestion of GuardianAngel.update_states_from_tracking.
+
+    The roster is split in chunks fetched concurrently (at most `concurrency` requests in flight),
+    each track is parsed as soon as its chunk is received and handed to a single storage worker.
+    The fetches are bounded by `deadline`: the chunks not received by then are skipped. The tracks already
+    parsed are all stored before the cycle returns, none is dropped.
+
+    The blocking calls (HTTP client, parser, SQLAlchemy session) run on worker threads,
+    the storage always on the same one because the session is not thread-safe.
+    """
+    def __init__(self, cfg, parse, client=None):
+        """
+        Initialize the ingestion engine.
+
+        Args:
+            cfg (dict): Configuration of the engine, e.g.
+                {
+                    "concurrency": 8,   # Maximum number of /api/trails requests in flight
+                    "chunk_size": 25,   # Number of keys per request
+                    "deadline": 25      # Maximum duration of a cycle in seconds
+                }
+            parse (callable): parse(track) -> list of parsed points, the last first.
+            client (HttpClient, optional): The HTTP client to use. Its pool should hold `concurrency` connections.
+        """
+        cfg = cfg or {}
+        self.logger = get_logger("AsyncIngestionEngine")
+        self.concurrency = cfg.get('concurrency', 8)
+        self.chunk_size = cfg.get('chunk_size', 25)
+        self.deadline = cfg.get('deadline', 25)
+        self._parse = parse
+        self._client = client
+        self._fetch_executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ingestion-fetch')
+        self._parse_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ingestion-parse')
+        self._store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingestion-store')
+
+    def run_cycle(self, keys, cursors, store, limit=ptrk.TRAILS_CATCHUP_LIMIT):
+        """
+        Fetch, parse and store the tracks of all the keys.
+
+        Args:
+            keys (list): The PureTrack keys of the paragliders.
+            cursors (dict): The 'from' Unix timestamp of each key ({key: timestamp}).
+            store (callable): store(key, parsed_points), always called from the same thread.
+            limit (int, optional): The number of records to request for each key.
+
+        Returns:
+            dict: Report of the cycle: number of tracks 'fetched' and 'stored', 'skipped' keys and 'elapsed' seconds.
+        """
+        return asyncio.run(self._cycle(list(keys), cursors, store, limit))
+
+    async def _cycle(self, keys, cursors, store, limit):
+        start = time.monotonic()
+        report = {'fetched': 0, 'stored': 0, 'skipped': [], 'elapsed': 0.0}
+        parsed_keys = set()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        queue = asyncio.Queue()
+
+        chunks = [keys[i:i + self.chunk_size] for i in range(0, len(keys), self.chunk_size)]
+        fetchers = {asyncio.create_task(self._fetch_and_parse(chunk, cursors, limit, semaphore, queue, report, parsed_keys)): chunk for chunk in chunks}
+        storer = asyncio.create_task(self._store(queue, store, report))
+
+        _, pending = await asyncio.wait(fetchers, timeout=self.deadline)
+        for task in pending:
+            task.cancel()
+            report['skipped'].extend(key for key in fetchers[task] if key not in parsed_keys)
+        if pending:
+            self.logger.warning(f"Cycle deadline of {self.deadline} s reached, {len(report['skipped'])} paragliders skipped.")
+
+        # The storage worker finishes what has been parsed: the event loop ends with the cycle, a task
+        # still pending then would be cancelled and its points lost
+        await queue.put(None)
+        await storer
+
+        report['elapsed'] = time.monotonic() - start
+        self.logger.info(f"Ingestion cycle: {report['fetched']} tracks fetched, {report['stored']} stored in {report['elapsed']:.2f} s")
+        return report
+
+    async def _fetch_and_parse(self, chunk, cursors, limit, semaphore, queue, report, parsed_keys):
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            tracks = await loop.run_in_executor(
+                self._fetch_executor,
+                lambda: ptrk.get_puretrack_tails_batch(chunk, limit, chunk_size=len(chunk), cursors=cursors, client=self._client)
+            )
+        report['fetched'] += len(tracks)
+        for key, track in tracks.items():
+            parsed_points = await loop.run_in_executor(self._parse_executor, self._parse, track)
+            parsed_keys.add(key)
+            if parsed_points:
+                await queue.put((key, parsed_points))
+
+    async def _store(self, queue, store, report):
+        loop = asyncio.get_running_loop()
+        while (item := await queue.get()) is not None:
+            key, parsed_points = item
+            try:
+                await loop.run_in_executor(self._store_executor, store, key, parsed_points)
+                report['stored'] += 1
+            except Exception as e:
+                self.logger.error(f"Storage error for {key}: {e}")
+
+    def close(self):
+        """
+        Stop the worker threads, once the pending storage is done.
+        """
+        self._fetch_executor.shutdown(wait=False, cancel_futures=True)
+        self._parse_executor.shutdown(wait=False, cancel_futures=True)
+        self._store_executor.shutdown(wait=True)
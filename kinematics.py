@@ -0,0 +1,158 @@
+import numpy as np
+
+EARTH_RADIUS = 6371000 # Mean radius of the Earth in meters
+
+# Segments up to this length use the equirectangular approximation when `fast` is requested.
+# Compared to haversine, for |latitude| <= 70°, its relative error stays below 1e-6 (< 1 cm)
+# up to 10 km and grows with the square of the length: 2e-5 (about 1 m) at 50 km.
+# Both ignore the Earth's flattening, which accounts for up to 0.5 % anyway.
+EQUIRECTANGULAR_MAX_DISTANCE = 10000
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Calculates the great-circle distance between points using the haversine formula.
+
+    Args:
+        lat1, lon1 (float or array): Coordinates of the first points in degrees.
+        lat2, lon2 (float or array): Coordinates of the second points in degrees.
+
+    Returns:
+        float or ndarray: Distances in meters.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+def equirectangular(lat1, lon1, lat2, lon2):
+    """
+    Calculates the distance between close points with the equirectangular approximation.
+
+    No arcsine nor squared sines: about 10 % cheaper than haversine once vectorized, more in scalar code.
+    See EQUIRECTANGULAR_MAX_DISTANCE for its error bounds.
+
+    Args:
+        lat1, lon1 (float or array): Coordinates of the first points in degrees.
+        lat2, lon2 (float or array): Coordinates of the second points in degrees.
+
+    Returns:
+        float or ndarray: Distances in meters.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    x = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return EARTH_RADIUS * np.hypot(x, y)
+
+def bearing(lat1, lon1, lat2, lon2):
+    """
+    Calculates the initial course from the first points to the second ones.
+
+    Args:
+        lat1, lon1 (float or array): Coordinates of the first points in degrees.
+        lat2, lon2 (float or array): Coordinates of the second points in degrees.
+
+    Returns:
+        float or ndarray: Courses in degrees 0-360.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(x, y)) % 360
+
+def track_kinematics(timestamps, lat, lon, alt=None, fast=False, groups=None):
+    """
+    Calculates the kinematics of the segments of a trail, or of a whole fleet, in one vectorized pass.
+
+    Segment i goes from point i-1 to point i, the points must be sorted by time (per group).
+    The values of the first point, which has no segment, are 0.
+
+    Args:
+        timestamps (array): Unix timestamps in seconds.
+        lat (array): Latitudes in degrees.
+        lon (array): Longitudes in degrees.
+        alt (array, optional): Altitudes in meters, for the vertical speed.
+        fast (bool, optional): Use the equirectangular approximation for the segments shorter than
+            EQUIRECTANGULAR_MAX_DISTANCE. Default is False.
+        groups (array, optional): Identifier of the trail of each point, e.g. to pass the concatenated
+            trails of the fleet. The segments between two trails are zeroed.
+
+    Returns:
+        dict: Arrays of the same length as the input:
+            'dt' (s), 'distance' (m), 'ground_speed' (m/s), 'vertical_speed' (m/s), 'course' (degrees).
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    n = len(timestamps)
+    result = {name: np.zeros(n) for name in ('dt', 'distance', 'ground_speed', 'vertical_speed', 'course')}
+    if n < 2:
+        return result
+
+    dt = np.diff(timestamps)
+    if fast:
+        distance = equirectangular(lat[:-1], lon[:-1], lat[1:], lon[1:])
+        far = distance > EQUIRECTANGULAR_MAX_DISTANCE
+        if far.any():
+            distance[far] = haversine(lat[:-1][far], lon[:-1][far], lat[1:][far], lon[1:][far])
+    else:
+        distance = haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    course = bearing(lat[:-1], lon[:-1], lat[1:], lon[1:])
+
+    valid = dt > 0 # If time is zero or negative, speed is 0
+    if groups is not None:
+        groups = np.asarray(groups)
+        same_trail = groups[1:] == groups[:-1]
+        valid &= same_trail
+        distance = np.where(same_trail, distance, 0.0)
+        course = np.where(same_trail, course, 0.0)
+        dt = np.where(same_trail, dt, 0.0)
+    safe_dt = np.where(valid, dt, 1.0)
+
+    result['dt'][1:] = dt
+    result['distance'][1:] = distance
+    result['ground_speed'][1:] = np.where(valid, distance / safe_dt, 0.0)
+    result['course'][1:] = course
+    if alt is not None:
+        alt = np.asarray(alt, dtype=float)
+        result['vertical_speed'][1:] = np.where(valid, np.diff(alt) / safe_dt, 0.0)
+    return result
+
+def time_weighted_average(timestamps, values, groups=None):
+    """
+    Calculates the time-weighted average of values, each one weighted by the duration of the segment it ends.
+
+    The values of the first point of each trail have no weight. Missing values (NaN) count in the
+    total duration with a zero contribution.
+
+    Args:
+        timestamps (array): Unix timestamps in seconds, sorted by time (per group).
+        values (array): The values, e.g. the speeds in m/s.
+        groups (array, optional): Identifier of the trail of each point.
+
+    Returns:
+        float or dict: The average, 0.0 without duration. With `groups`, the average of each group ({group: average}).
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if len(timestamps) < 2:
+        return {} if groups is not None else 0.0
+
+    dt = np.diff(timestamps)
+    weights = np.where(dt > 0, dt, 0.0)
+    contributions = weights * np.nan_to_num(values[1:])
+
+    if groups is None:
+        total_time = weights.sum()
+        return float(contributions.sum() / total_time) if total_time > 0 else 0.0
+
+    groups = np.asarray(groups)
+    same_trail = groups[1:] == groups[:-1]
+    weights = np.where(same_trail, weights, 0.0)
+    contributions = np.where(same_trail, contributions, 0.0)
+    names, index = np.unique(groups[1:], return_inverse=True)
+    total_time = np.bincount(index, weights=weights, minlength=len(names))
+    total = np.bincount(index, weights=contributions, minlength=len(names))
+    averages = {name: float(total[i] / total_time[i]) if total_time[i] > 0 else 0.0 for i, name in enumerate(names.tolist())}
+    for name in np.unique(groups).tolist():
+        averages.setdefault(name, 0.0)
+    return averages
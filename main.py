@@ -6,6 +6,7 @@ from guardian_angel import GuardianAngel
 logger = get_logger(__name__)
 
 def main():
+    guardian_angel = None
     try:
         config = Config()
         #logger = Logger(cfg=config.get('logging'))
@@ -16,6 +17,9 @@ def main():
 
     except KeyboardInterrupt:
         print("Application stopped by user.")
+    finally:
+        if guardian_angel is not None:
+            guardian_angel.close()
 
 if __name__ == "__main__":
     main()
@@ -1,20 +1,40 @@
-from blinker import signal
-from transitions import Machine
 from logger import get_logger
-import threading
-from datetime import datetime, timezone
+from event_bus import get_default_bus, StateChanged, Alert, Clearance
+from scheduler import get_default_scheduler
+from clock import get_default_clock
+from state_machine import StateMachine
 
 class Paraglider:
     states = [
         'Initial', 'Unknown', 'Flying', 'Clearance', 'Landed', 'Disconnected', 'Alert'
     ]
 
-    def __init__(self, cfg):
-        self.name = cfg.get('name')
+    # The state machine is shared by all the paragliders, each one only holds its state
+    machine = StateMachine(states, [
+        {'trigger': 'init', 'source': 'Initial', 'dest': 'Unknown'},
+        {'trigger': 'connected', 'source': 'Disconnected', 'dest': 'Unknown'},
+        {'trigger': 'timeout', 'source': 'Disconnected', 'dest': 'Alert'},
+        {'trigger': 'nullSpeed', 'source': 'Flying', 'dest': 'Clearance'},
+        {'trigger': 'highSpeed', 'source': 'Flying', 'dest': 'Alert'},
+        {'trigger': 'disconnected', 'source': 'Flying', 'dest': 'Disconnected'},
+        {'trigger': 'landingConfirmed', 'source': 'Alert', 'dest': 'Landed'},
+        {'trigger': 'timeout', 'source': 'Alert', 'dest': 'Alert'},
+        {'trigger': 'landingConfirmed', 'source': 'Clearance', 'dest': 'Landed'},
+        {'trigger': 'timeout', 'source': 'Clearance', 'dest': 'Alert'},
+        {'trigger': 'flying', 'source': 'Landed', 'dest': 'Flying'},
+        {'trigger': 'check', 'source': 'Unknown', 'dest': 'Flying', 'conditions': 'is_flying'},
+        {'trigger': 'check', 'source': 'Unknown', 'dest': 'Clearance', 'unless': 'is_flying'},
+    ], initial='Initial', after_state_change='on_state_changed')
+
+    __slots__ = (
+        'puretrack_key', 'name', 'discord_id', 'phone_number', 'email', 'state',
+        '_last_datetime', '_coordinates', '_course', '_altitude_gnd_calc', '_speed', '_avg_speed', '_statistics',
+        '_logger', '_scheduler', '_timer', '_bus', '__weakref__'
+    )
+
+    def __init__(self, cfg, scheduler=None, bus=None):
         self.puretrack_key = cfg.get('puretrack_key')
-        self.discord_id = cfg.get('discord_id')
-        self.phone_number = cfg.get('phone_number')
-        self.email = cfg.get('email')
+        self.configure(cfg)
 
         self._last_datetime = None
         self._coordinates = (0.0, 0.0)
@@ -22,38 +42,41 @@ class Paraglider:
         self._altitude_gnd_calc = 0.0
         self._speed = 0.0
         self._avg_speed = 0.0
+        self._statistics = {} # Sliding-window statistics by window duration in minutes
 
         self._logger = get_logger(self.name)
-        self._machine = Machine(model=self, states=Paraglider.states, initial='Initial', ignore_invalid_triggers=True)
+        self.state = Paraglider.machine.initial
+        # The timeouts are armed in the shared scheduler, no thread per timer
+        self._scheduler = scheduler if scheduler is not None else get_default_scheduler()
         self._timer = None
-        self.alert = signal('alert')
-        self.clearance = signal('clearance')
-
-        # Define transitions
-        self._machine.add_transition(trigger='init', source='Initial', dest='Unknown')
-        self._machine.add_transition(trigger='connected', source='Disconnected', dest='Unknown')
-        self._machine.add_transition(trigger='timeout', source='Disconnected', dest='Alert')
-        self._machine.add_transition(trigger='nullSpeed', source='Flying', dest='Clearance')
-        self._machine.add_transition(trigger='highSpeed', source='Flying', dest='Alert')
-        self._machine.add_transition(trigger='disconnected', source='Flying', dest='Disconnected')
-        self._machine.add_transition(trigger='landingConfirmed', source='Alert', dest='Landed')
-        self._machine.add_transition(trigger='timeout', source='Alert', dest='Alert')
-        self._machine.add_transition(trigger='landingConfirmed', source='Clearance', dest='Landed')
-        self._machine.add_transition(trigger='timeout', source='Clearance', dest='Alert')
-        self._machine.add_transition(trigger='flying', source='Landed', dest='Flying')
-        self._machine.add_transition(trigger='check', source='Unknown', dest='Flying', conditions='is_flying')
-        self._machine.add_transition(trigger='check', source='Unknown', dest='Clearance', unless='is_flying')
+        # The events of the paraglider (StateChanged, Alert, Clearance), with the paraglider as sender
+        self._bus = bus if bus is not None else get_default_bus()
 
         self.init() # on_enter_Unknown called
         self._logger.info(f"Paraglider {self.name} created. State: {self.state}")
 
+    def configure(self, cfg):
+        """
+        Set the paraglider's name and contact details, without changing its state.
+
+        Args:
+            cfg (dict): Configuration of the paraglider.
+        """
+        self.name = cfg.get('name')
+        self.discord_id = cfg.get('discord_id')
+        self.phone_number = cfg.get('phone_number')
+        self.email = cfg.get('email')
+
+    def on_state_changed(self, source, dest):
+        self._bus.publish(StateChanged(self, source, dest))
+
     def on_enter_Unknown(self):
         self._logger.info(f"Entry action for Unknown state for {self.name}")
         self.check()
 
     def on_enter_Clearance(self):
         self._logger.info(f"Entry action for Clearance state for {self.name}")
-        self.clearance.send(self, message="clearance!")
+        self._bus.publish(Clearance(self, "clearance!"))
         self.landingConfirmed() # TODO - for test only
         self.arm_timer(300) # Arm a timer for 5 minutes
 
@@ -63,13 +86,25 @@ class Paraglider:
 
     def on_enter_Alert(self):
         self._logger.warning(f"Entry action for Alert state for {self.name}")
-        self.alert.send(self, message="alert!")
+        self._bus.publish(Alert(self, "alert!"))
         self.arm_timer(300) # Arm a timer for 5 minutes
 
     def on_exit_Alert(self):
         self._logger.warning(f"Exit action for Alert state for {self.name}")
         self.cancel_timer()
 
+    @property
+    def coordinates(self):
+        return self._coordinates
+
+    @property
+    def statistics(self):
+        return self._statistics
+
+    @property
+    def avg_speed(self):
+        return self._avg_speed
+
     @property
     def is_flying(self):
         # speed > 10km/h ou 2,78m/s
@@ -92,12 +127,18 @@ class Paraglider:
         self._altitude_gnd_calc = last_state.get('altitude_gnd_calc', self._altitude_gnd_calc)
         self._speed = last_state.get('speed', self._speed)
         self._avg_speed = last_state.get('avg_speed', self._avg_speed)
+        self._statistics = last_state.get('statistics', self._statistics)
 
         self._logger.info(
             f"Updated {self.name}: Coordinates={self._coordinates}, "
             f"Course={self._course} °, Alt Gnd={self._altitude_gnd_calc} m, "
             f"Speed={self._speed*3.6:.2f} km/h, Avg Speed={self._avg_speed*3.6:.2f} km/h"
         )
+        for minutes, statistics in self._statistics.items():
+            self._logger.debug(
+                f"{self.name} over {minutes} min: Avg Speed={statistics['avg_speed']*3.6:.2f} km/h, "
+                f"Max Speed={statistics['max_speed']*3.6:.2f} km/h, Displacement={statistics['displacement']:.0f} m"
+            )
 
         # Adjust the state based on the updated values
         if self._avg_speed > 16.67: # 60km/h or 16,67m/s
@@ -107,7 +148,7 @@ class Paraglider:
         elif (self._avg_speed < 0.56) and (self._altitude_gnd_calc < 60): # 2km/h or 0,56m/s
             self.nullSpeed()
 
-        time_difference = (datetime.now(timezone.utc) - self._last_datetime).total_seconds()
+        time_difference = (get_default_clock().now() - self._last_datetime).total_seconds()
         if time_difference > 300:  # 5 minutes
             self._logger.warning(f"Disconnected for too long. Last seen at {self._last_datetime}.")
             self.disconnected()
@@ -117,10 +158,12 @@ class Paraglider:
 
     def arm_timer(self, duration):
         self.cancel_timer()
-        self._timer = threading.Timer(duration, self.timeout)
-        self._timer.start()
+        self._timer = self._scheduler.schedule(duration, self.timeout)
 
     def cancel_timer(self):
         if self._timer is not None:
             self._timer.cancel()
             self._timer = None
+
+# The triggers (init, timeout, check...) are methods of Paraglider
+Paraglider.machine.bind(Paraglider)
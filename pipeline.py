@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+class Pipeline:
+    """
+    Stages linked by bounded queues, so that they work on different items at the same time.
+
+    Each stage but the last runs on its own worker threads, the last one on the thread calling run,
+    e.g. the evaluation of the paragliders' states, which must stay on the monitoring thread.
+    A stage is a function of an item returning the items of the next stage (an iterable, possibly
+    empty). When a queue is full, the stage before it waits: a slow stage slows the ones before it down
+    instead of piling the items up in memory.
+
+    An exception raised by a stage for an item is logged and the item dropped, the other items go on.
+    """
+    def __init__(self, stages, queue_size=4):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages (list): The stages in order, as (name, function) or (name, function, workers) tuples.
+                function(item) -> iterable of the items of the next stage, the return value of the last
+                stage is ignored. `workers` is the number of threads of the stage, 1 by default.
+            queue_size (int, optional): Maximum number of items waiting between two stages.
+        """
+        self.stages = [(stage[0], stage[1], stage[2] if len(stage) > 2 else 1) for stage in stages]
+        self.queue_size = queue_size
+        self.timings = None
+
+    def run(self, items):
+        """
+        Run the items through the stages, and return once the last stage has processed all of them.
+
+        Args:
+            items (iterable): The items of the first stage.
+
+        Returns:
+            dict: The timings of each stage ({name: {'busy': seconds in the stage function, 'items': items
+                processed, 'blocked': seconds waiting for room in the next queue}}), and the 'elapsed' seconds.
+        """
+        start = time.perf_counter()
+        self.timings = {name: {'busy': 0.0, 'items': 0, 'blocked': 0.0} for name, _, _ in self.stages}
+        stopped = threading.Event()
+        queues = [queue.Queue(self.queue_size) for _ in self.stages]
+        threads = []
+        for index, (name, function, workers) in enumerate(self.stages[:-1]):
+            remaining = [workers] # Workers of the stage still running, the last one closes the next queue
+            lock = threading.Lock()
+            for worker in range(workers):
+                thread = threading.Thread(
+                    target=self._work, name=f'pipeline-{name}-{worker}', daemon=True,
+                    args=(name, function, queues[index], queues[index + 1], stopped, remaining, lock)
+                )
+                thread.start()
+                threads.append(thread)
+
+        feeder = threading.Thread(target=self._feed, args=(items, queues[0], stopped), name='pipeline-feed', daemon=True)
+        feeder.start()
+        try:
+            name, function, _ = self.stages[-1]
+            timings = self.timings[name]
+            while (item := queues[-1].get()) is not _END:
+                begin = time.perf_counter()
+                self._call(name, function, item)
+                timings['busy'] += time.perf_counter() - begin
+                timings['items'] += 1
+        finally:
+            # If the calling thread is interrupted, the workers stop instead of waiting for room
+            stopped.set()
+            feeder.join()
+            for thread in threads:
+                thread.join()
+        self.timings['elapsed'] = time.perf_counter() - start
+        return self.timings
+
+    def _feed(self, items, output, stopped):
+        try:
+            for item in items:
+                if not _put(output, item, stopped):
+                    return
+        finally:
+            _put(output, _END, stopped)
+
+    def _work(self, name, function, input, output, stopped, remaining, lock):
+        timings = self.timings[name]
+        try:
+            while (item := _get(input, stopped)) is not _END:
+                begin = time.perf_counter()
+                results = self._call(name, function, item)
+                busy = time.perf_counter() - begin
+                for result in results:
+                    if not _put(output, result, stopped):
+                        return
+                with lock:
+                    timings['busy'] += busy
+                    timings['blocked'] += time.perf_counter() - begin - busy
+                    timings['items'] += 1
+            _put(input, _END, stopped) # For the other workers of the stage
+        finally:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                _put(output, _END, stopped)
+
+    def _call(self, name, function, item):
+        try:
+            # The results are gathered here, a generator raising midway drops the whole item
+            return list(function(item) or ())
+        except Exception as e:
+            logger.error(f"Pipeline stage {name} failed: {e}")
+            return []
+
+# End of the items of a queue
+_END = object()
+
+def _get(input, stopped):
+    # Wait for an item, the end once the pipeline is stopped
+    while not stopped.is_set():
+        try:
+            return input.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+def _put(output, item, stopped):
+    # Wait for room in the queue, unless the pipeline is stopped
+    while not stopped.is_set():
+        try:
+            output.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
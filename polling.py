@@ -0,0 +1,167 @@
+import math
+import threading
+from clock import get_default_clock
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds between two polls of a paraglider, by state
+DEFAULT_INTERVALS = {
+    'Unknown': 30,
+    'Flying': 10,
+    'Clearance': 10,
+    'Alert': 10,
+    'Landed': 120,
+    'Disconnected': 30, # First interval, then backed off
+}
+
+# Polled first when the budget runs short, the others by due time
+URGENT_STATES = ('Alert', 'Clearance')
+
+# A transition to these states is checked at once, at the next tick
+SUSPICIOUS_STATES = ('Clearance', 'Alert', 'Disconnected')
+
+class PollingCadence:
+    """
+    Poll interval of each paraglider, from its state and recent movement, within a global budget of requests.
+
+    The monitoring ticks every `tick` seconds and only the paragliders which are due are fetched:
+    often when Flying, in Clearance or in Alert, rarely when Landed, less and less often when Disconnected.
+    A paraglider which moves is polled as if Flying whatever its state, and a transition to a suspicious
+    state makes it due at once.
+
+    A request carries up to `chunk_size` keys for the same cost: the room left in the last request of a cycle
+    is filled with the paragliders due the soonest, which brings their polls in phase.
+
+    The /api/trails requests are paced by a token bucket, refilled at the budget per minute and holding one
+    tick of requests, so that the budget is spread over the minute rather than spent by its first ticks.
+    When the due paragliders would need more requests than the bucket holds, those in Alert or Clearance
+    are polled first, the others by due time, and the rest waits for the next tick.
+    """
+    def __init__(self, cfg=None):
+        """
+        Initialize the polling cadence.
+
+        Args:
+            cfg (dict, optional): Configuration of the polling cadence.
+                Example:
+                {
+                    "mode": "adaptive",
+                    "tick": 5,                    # Seconds between two monitoring cycles
+                    "intervals": {"Flying": 10, "Landed": 120}, # Seconds between two polls, by state
+                    "moving_speed": 2.78,         # Average speed (m/s) above which a paraglider is polled as Flying
+                    "backoff_factor": 2,          # Growth of the interval of a Disconnected paraglider
+                    "max_interval": 600,          # Longest interval, in seconds
+                    "requests_per_minute": 60     # Global budget of /api/trails requests
+                }
+        """
+        cfg = cfg or {}
+        self.tick = cfg.get('tick', 5)
+        self.intervals = {**DEFAULT_INTERVALS, **cfg.get('intervals', {})}
+        self.moving_speed = cfg.get('moving_speed', 2.78)
+        self.backoff_factor = cfg.get('backoff_factor', 2)
+        self.max_interval = cfg.get('max_interval', 600)
+        self.requests_per_minute = cfg.get('requests_per_minute', 60)
+
+        self._lock = threading.Lock()
+        self._due = {} # Monotonic time at which each paraglider is due, by PureTrack key
+        self._backoff = {} # Current interval of the Disconnected paragliders, by PureTrack key
+        self._tokens = None # Requests left in the bucket, full at the first cycle
+        self._refilled = None # Monotonic time of the last refill
+        self.requests = 0
+        self.polls = 0
+        self.deferred = 0 # Polls of due paragliders put off to a later tick, for lack of budget
+
+    def interval(self, paraglider):
+        """
+        Get the seconds until the next poll of a paraglider.
+
+        Args:
+            paraglider (Paraglider): The paraglider.
+
+        Returns:
+            float: The poll interval.
+        """
+        if paraglider.avg_speed > self.moving_speed:
+            return self.intervals['Flying']
+        if paraglider.state == 'Disconnected':
+            return self._backoff.get(paraglider.puretrack_key, self.intervals['Disconnected'])
+        return self.intervals.get(paraglider.state, self.intervals['Unknown'])
+
+    def on_state_changed(self, event):
+        """
+        Make a paraglider due at once after a suspicious transition, and reset its backoff once reconnected.
+
+        Args:
+            event (StateChanged): The state change of the paraglider.
+        """
+        puretrack_key = event.sender.puretrack_key
+        with self._lock:
+            if event.source == 'Disconnected':
+                self._backoff.pop(puretrack_key, None)
+            if event.dest in SUSPICIOUS_STATES:
+                self._due[puretrack_key] = -math.inf
+
+    def select(self, paragliders, chunk_size, now=None):
+        """
+        Pick the paragliders to poll in this cycle and schedule their next poll.
+
+        Args:
+            paragliders (dict): The paragliders by PureTrack key.
+            chunk_size (int): The number of keys per /api/trails request.
+            now (float, optional): The monotonic time of the cycle. Default is now.
+
+        Returns:
+            list: The PureTrack keys of the paragliders to poll, the most at risk first.
+        """
+        now = get_default_clock().monotonic() if now is None else now
+        with self._lock:
+            # A new paraglider is due at once
+            due, early = [], []
+            for puretrack_key, paraglider in paragliders.items():
+                due_time = self._due.get(puretrack_key, now)
+                if due_time <= now:
+                    due.append((paraglider.state not in URGENT_STATES, due_time, paraglider))
+                elif due_time - now <= self.interval(paraglider) / 2:
+                    early.append((due_time, paraglider))
+            due = [paraglider for _, _, paraglider in sorted(due, key=lambda item: item[:2])]
+
+            capacity = max(self.requests_per_minute * self.tick / 60, 1)
+            if self._tokens is None:
+                self._tokens = capacity
+            else:
+                self._tokens = min(self._tokens + (now - self._refilled) * self.requests_per_minute / 60, capacity)
+            self._refilled = now
+            budget = int(self._tokens)
+            selected = due[:budget * chunk_size]
+            if selected and len(selected) % chunk_size:
+                # Free room in the last request, for the paragliders due within half their interval
+                early.sort(key=lambda item: item[0])
+                selected += [paraglider for _, paraglider in early[:chunk_size - len(selected) % chunk_size]]
+            requests = math.ceil(len(selected) / chunk_size)
+            self._tokens -= requests
+            self.requests += requests
+
+            for paraglider in selected:
+                self._due[paraglider.puretrack_key] = now + self.interval(paraglider)
+                if paraglider.state == 'Disconnected':
+                    # Backed off for the next poll
+                    backoff = self._backoff.get(paraglider.puretrack_key, self.intervals['Disconnected'])
+                    self._backoff[paraglider.puretrack_key] = min(backoff * self.backoff_factor, self.max_interval)
+            self.polls += len(selected)
+            deferred = max(len(due) - budget * chunk_size, 0)
+            self.deferred += deferred
+        if deferred:
+            logger.warning(f"Request budget of {self.requests_per_minute} per minute reached, {deferred} paragliders deferred")
+        return [paraglider.puretrack_key for paraglider in selected]
+
+    def remove(self, puretrack_key):
+        """
+        Forget a removed paraglider.
+
+        Args:
+            puretrack_key (str): The PureTrack key of the paraglider.
+        """
+        with self._lock:
+            self._due.pop(puretrack_key, None)
+            self._backoff.pop(puretrack_key, None)
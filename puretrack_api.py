@@ -1,15 +1,23 @@
 import datetime
+import functools
+import logging
 import math
 from logger import get_logger
+from http_client import get_default_client
 import pytz
-import requests
-import srtm
+import elevation
+import kinematics
 import time
+import urllib.parse
 from timezonefinder import TimezoneFinder
 
 logger = get_logger(__name__)
 tzfinder = TimezoneFinder()
 
+PURETRACK_URL = 'https://puretrack.io'
+TRAILS_CHUNK_SIZE = 50 # Maximum number of keys sent in a single /api/trails request
+TRAILS_CATCHUP_LIMIT = 1000 # Number of records requested when the 'from' cursor bounds the answer
+
 def get_datetime(timestamp, timezone=None):
     """
     Converts a Unix timestamp into a timezone-aware datetime object.
@@ -33,9 +41,34 @@ def get_datetime(timestamp, timezone=None):
         dt = datetime.datetime.fromtimestamp(timestamp, timezone).astimezone(pytz.UTC)
     else:
         # Default to UTC if no timezone is provided
-        dt = datetime.datetime.fromtimestamp(timestamp, pytz.UTC)
+        dt = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
     return dt
 
+TIMEZONE_GRID = 0.1 # Size in degrees of the cells sharing the same cached timezone (~11 km)
+
+def get_local_timezone(lat, lon):
+    """
+    Get the local timezone of a position, e.g. to display an hour in an alert message.
+
+    The lookups are cached per TIMEZONE_GRID cell, the polygon search is only done once per cell.
+    Within a cell of a timezone border, the timezone of the cell center is returned.
+
+    Args:
+        lat (float): Latitude in decimal degrees.
+        lon (float): Longitude in decimal degrees.
+
+    Returns:
+        pytz.timezone: The timezone of the position, UTC if unknown.
+    """
+    return _get_cell_timezone(math.floor(lat / TIMEZONE_GRID), math.floor(lon / TIMEZONE_GRID))
+
+@functools.lru_cache(maxsize=4096)
+def _get_cell_timezone(cell_lat, cell_lon):
+    lat = (cell_lat + 0.5) * TIMEZONE_GRID
+    lon = (cell_lon + 0.5) * TIMEZONE_GRID
+    name = tzfinder.timezone_at(lat=lat, lng=lon)
+    return pytz.timezone(name) if name else pytz.UTC
+
 def get_elevation(lat=None, lon=None, position=None):
     """
     Fetches the elevation (altitude) for a given latitude and longitude using SRTM (Shuttle Radar Topography Mission) data.
@@ -68,15 +101,15 @@ def get_elevation(lat=None, lon=None, position=None):
     if lat is None or lon is None:
         raise ValueError("Latitude and longitude must be provided either directly or via the `position` parameter.")
 
-    # Fetch elevation using SRTM data
-    srtm_data = srtm.get_data()
-    elevation = srtm_data.get_elevation(lat, lon)
-    return elevation
+    # Fetch elevation using the shared, memoized SRTM data
+    return elevation.get_default_service().get_elevation(lat, lon)
 
 def haversine(lat1, lon1, lat2, lon2):
     """
     Calculates the distance between two points on a sphere using the haversine formula.
 
+    Thin wrapper of kinematics.haversine, use kinematics.track_kinematics for whole trails.
+
     Args:
         lat1 (float): Latitude of the first point in degrees.
         lon1 (float): Longitude of the first point in degrees.
@@ -86,27 +119,14 @@ def haversine(lat1, lon1, lat2, lon2):
     Returns:
         float: Distance between the two points in meters.
     """
-    # Convert coordinates from degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-
-    # Calculating differences
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-
-    # Haversine formula
-    a = math.sin(dlat / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2)**2
-    c = 2 * math.asin(math.sqrt(a))
-
-    # Radius of the Earth in meters
-    r = 6371000
-
-    # Distance in meters
-    return c * r
+    return float(kinematics.haversine(lat1, lon1, lat2, lon2))
 
 def calculate_speed(previous_point, current_point):
     """
     Calculates the speed between two points in meters per second.
 
+    Thin wrapper of kinematics.track_kinematics, to be used for whole trails.
+
     Args:
         previous_point (dict): Dictionary containing the previous point's data (latitude, longitude, timestamp).
         current_point (dict): Dictionary containing the current point's data (latitude, longitude, timestamp).
@@ -114,17 +134,12 @@ def calculate_speed(previous_point, current_point):
     Returns:
         float: Speed between the two points in meters per second.
     """
-    # Calculate the distance between the two points
-    distance = haversine(previous_point['lat'], previous_point['lon'], current_point['lat'], current_point['lon'])
-    # Calculate the time difference in seconds
-    time_diff_seconds = current_point['timestamp'] - previous_point['timestamp']
-
-    if time_diff_seconds > 0:  # Éviter la division par zéro
-        speed = distance / time_diff_seconds
-    else:
-        speed = 0  # If time is zero or negative, speed is 0
-    # Calculate speed in m/s
-    return speed
+    segment = kinematics.track_kinematics(
+        (previous_point['timestamp'], current_point['timestamp']),
+        (previous_point['lat'], current_point['lat']),
+        (previous_point['lon'], current_point['lon'])
+    )
+    return float(segment['ground_speed'][1])
 
 # Dictionary for mapping prefixes to keys
 key_mapping = {
@@ -225,68 +240,190 @@ source_mapping = {
     '37': 'Bircom'
 }
 
-def parse_puretrack_record(record):
-    # Dividing the line into elements
-    elements = record.split(',')
-
-    # Initialize a dictionary to store parsed data
-    parsed_record = {}
-
-    for element in elements:
-        if element:
-            prefix = element[0]
-            value = element[1:]
-            if prefix in key_mapping:
-                key_info = key_mapping[prefix]
-                key_name = key_info['name']
-                key_type = key_info['type']
-
-                try:
-                    # Convert the value to the specified type
-                    parsed_value = key_type(value)
-                    if prefix == 'U' and value in source_mapping:
-                        parsed_record[key_name] = source_mapping[parsed_value]
-                    else:
-                        parsed_record[key_name] = parsed_value
-                except ValueError:
-                    logger.warning(f"Failed to convert value '{value}' for key '{key_name}' to type {key_type.__name__}")
-            else:
-                logger.warning(f"Unknown prefix '{prefix}' in element '{element}'")
+# Fields used by the monitoring, the other ones are not worth converting
+TRACK_FIELDS = ('timestamp', 'lat', 'lon', 'alt_gps', 'speed', 'course', 'ground_level')
 
+class RecordParser:
+    """
+    Compiled PureTrack record parser.
+
+    `key_mapping` is compiled once into a single {prefix: (name, converter)} table restricted to the
+    projected fields, so parsing an element is one dict lookup. The elements of the other known prefixes
+    are skipped without conversion and each unknown prefix is only reported once.
+    """
+    def __init__(self, fields=None):
+        """
+        Initialize the parser.
+
+        Args:
+            fields (iterable, optional): Names of the fields to keep (cf. key_mapping). Default is all of them.
+        """
+        fields = set(fields) if fields is not None else None
+        self._converters = {}
+        for prefix, key_info in key_mapping.items():
+            if fields is None or key_info['name'] in fields:
+                converter = key_info['type']
+                if prefix == 'U':
+                    converter = self._convert_source
+                self._converters[prefix] = (key_info['name'], converter)
+        self._unknown_prefixes = set()
+
+    @staticmethod
+    def _convert_source(value):
+        return source_mapping.get(value, value)
+
+    def parse(self, record):
+        """
+        Parse a PureTrack record.
+
+        Args:
+            record (str): The record, comma separated prefixed elements.
+
+        Returns:
+            dict: The projected fields, plus the calculated 'alt_gnd_calc' and 'datetime'.
+        """
+        parsed_record = self._parse_elements(record)
+        add_calculated_fields(parsed_record)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"parsePuretrackRecord: {parsed_record}")
+        return parsed_record
+
+    def parse_many(self, records):
+        """
+        Parse a list of PureTrack records, e.g. the 'points' of a track.
+
+        The ground level missing from the records is looked up in a single batch.
+
+        Args:
+            records (list): The records.
+
+        Returns:
+            list: The parsed records, in the same order.
+        """
+        parse_elements = self._parse_elements
+        parsed_records = [parse_elements(record) for record in records]
+        add_calculated_fields_many(parsed_records)
+        return parsed_records
+
+    def _parse_elements(self, record):
+        converters = self._converters
+        parsed_record = {}
+        for element in record.split(','):
+            if not element:
+                continue
+            converter = converters.get(element[0])
+            if converter is None:
+                if element[0] not in key_mapping:
+                    self._unknown_prefix(element)
+                continue
+            name, convert = converter
+            try:
+                parsed_record[name] = convert(element[1:])
+            except ValueError:
+                logger.warning(f"Failed to convert value '{element[1:]}' for key '{name}'")
+        return parsed_record
+
+    def _unknown_prefix(self, element):
+        if element[0] not in self._unknown_prefixes:
+            self._unknown_prefixes.add(element[0])
+            logger.warning(f"Unknown prefix '{element[0]}' in element '{element}'")
+
+def add_calculated_fields(parsed_record, ground_level=None):
+    """
+    Add the calculated 'alt_gnd_calc' and 'datetime' fields to a parsed record.
+
+    Args:
+        parsed_record (dict): The parsed record, updated in place.
+        ground_level (float, optional): The SRTM elevation of the point when the record has no 'ground_level'.
+            Looked up if not provided.
+    """
     # Calculated data - TODO - Can't calculate speed here
     if parsed_record.get('lat') and parsed_record.get('lon'):
         if parsed_record.get('alt_gps'):
             if parsed_record.get('ground_level'):
                 altitude_above_gnd = parsed_record['alt_gps'] - parsed_record['ground_level']
             else:
-                ground_level = get_elevation(lat=parsed_record['lat'], lon=parsed_record['lon'])
-                altitude_above_gnd = parsed_record['alt_gps'] - ground_level
+                if ground_level is None:
+                    ground_level = get_elevation(lat=parsed_record['lat'], lon=parsed_record['lon'])
+                altitude_above_gnd = parsed_record['alt_gps'] - ground_level if ground_level is not None else None
         else:
             altitude_above_gnd = None
-
-        if parsed_record.get('timestamp'):
-            timezone = pytz.timezone(tzfinder.timezone_at(lat=parsed_record['lat'], lng=parsed_record['lon']))
-            dt = get_datetime(parsed_record['timestamp'], timezone)
-        else:
-            dt = None
     else:
         altitude_above_gnd = None
-        if parsed_record.get('timestamp'):
-            dt = get_datetime(parsed_record['timestamp'])
-        else:
-            dt = None
+
+    # The timestamp is a Unix time, the datetime is UTC wherever the point is
+    if parsed_record.get('timestamp'):
+        dt = get_datetime(parsed_record['timestamp'])
+    else:
+        dt = None
     parsed_record['alt_gnd_calc'] = altitude_above_gnd
     parsed_record['datetime'] = dt
 
-    logger.debug(f"parsePuretrackRecord: {parsed_record}")
-    return parsed_record
+def add_calculated_fields_many(parsed_records):
+    """
+    Add the calculated fields to a list of parsed records, looking up the missing ground levels in a single batch.
+
+    Args:
+        parsed_records (list): The parsed records, updated in place.
+    """
+    without_ground_level = [
+        parsed_record for parsed_record in parsed_records
+        if parsed_record.get('lat') and parsed_record.get('lon') and parsed_record.get('alt_gps') and not parsed_record.get('ground_level')
+    ]
+    ground_levels = {}
+    if without_ground_level:
+        elevations = elevation.get_default_service().get_elevations(
+            [parsed_record['lat'] for parsed_record in without_ground_level],
+            [parsed_record['lon'] for parsed_record in without_ground_level]
+        )
+        ground_levels = {id(parsed_record): value for parsed_record, value in zip(without_ground_level, elevations)}
+
+    for parsed_record in parsed_records:
+        add_calculated_fields(parsed_record, ground_levels.get(id(parsed_record)))
+
+_record_parser = RecordParser()
+_track_parser = RecordParser(TRACK_FIELDS)
+
+def parse_puretrack_record(record, fields=None):
+    """
+    Parse a PureTrack record.
+
+    Args:
+        record (str): The record, comma separated prefixed elements.
+        fields (iterable, optional): Names of the fields to keep. Default is all of them.
+
+    Returns:
+        dict: The parsed record.
+    """
+    parser = _record_parser if fields is None else RecordParser(fields)
+    return parser.parse(record)
+
+def parse_puretrack_records(records, fields=TRACK_FIELDS):
+    """
+    Parse a list of PureTrack records at once, e.g. the 'points' of a track.
+
+    Args:
+        records (list): The records.
+        fields (iterable, optional): Names of the fields to keep. Default is TRACK_FIELDS, None for all of them.
+
+    Returns:
+        list: The parsed records, in the same order.
+    """
+    if fields == TRACK_FIELDS:
+        parser = _track_parser
+    elif fields is None:
+        parser = _record_parser
+    else:
+        parser = RecordParser(fields)
+    return parser.parse_many(records)
 
-def get_puretrack_group(group):
+def get_puretrack_group(group, client=None):
     """
     Fetches the details of a PureTrack group by its slug.
 
     Args:
         group (str): The slug (unique identifier) of the PureTrack group.
+        client (HttpClient, optional): The HTTP client to use. Default is the shared client.
 
     Returns:
         dict: The JSON response containing group details if successful, otherwise None.
@@ -294,13 +431,14 @@ def get_puretrack_group(group):
     Raises:
         requests.exceptions.RequestException: If the HTTP request fails.
     """
-    url = f'https://puretrack.io/api/groups/byslug/{group}'
+    url = f'{PURETRACK_URL}/api/groups/byslug/{group}'
     headers = {
         'Content-Type': 'application/json',
         'Accept-Encoding': 'gzip, deflate, br, zstd'
     }
+    client = client or get_default_client()
     try:
-        response = requests.get(url, headers=headers)
+        response = client.get(url, headers=headers)
         response.raise_for_status()
         if response.status_code == 200:
             logger.debug(f"Response from API: {response.json().get('data')}")
@@ -312,86 +450,126 @@ def get_puretrack_group(group):
 
     return None
 
-def get_puretrack_group_live(group):
+class PureTrackLiveSession:
     """
-    Fetches live data for a PureTrack group.
-
-    Args:
-        group (str): The slug (unique identifier) of the PureTrack group.
-
-    Returns:
-        dict: The JSON response containing live data if successful, otherwise None.
+    Live data of a PureTrack group.
 
-    Raises:
-        requests.exceptions.RequestException: If the HTTP request fails.
+    The XSRF token and the session cookie obtained from the group page are reused by the following
+    /api/live calls until they expire, instead of an extra GET on every call.
     """
-    # Step 1: Obtain the CSRF token
-    # url_get_token = 'https://puretrack.io/?l=44.68131,4.62335&z=15&group={group}'
-    url_get_token = 'https://puretrack.io/g/{group}'
-    try:
-        response = requests.get(url_get_token)
+    # Body of the /api/live request
+    live_request = {
+        # "b1l": "44.68863",
+        # "b1g": "4.62388",
+        # "b2l": "44.67457",
+        # "b2g": "4.60979",
+        # "s": "X-key,X-key",
+        # "o": [63, 6, 7, 17, 20],
+        "t": 360,
+        "a": None,
+        "i": 1,
+        "g": 22,
+        "l": True
+    }
+
+    def __init__(self, group, client=None, token_ttl=3600):
+        """
+        Initialize the live session.
+
+        Args:
+            group (str): The slug (unique identifier) of the PureTrack group.
+            client (HttpClient, optional): The HTTP client to use, it keeps the session cookie. Default is the shared client.
+            token_ttl (int, optional): Lifetime in seconds of a token whose cookie has no expiry. Default is 3600.
+        """
+        self.group = group
+        self.client = client or get_default_client()
+        self.token_ttl = token_ttl
+        self._csrf_token = None
+        self._token_expiry = 0
+
+    @property
+    def token_valid(self):
+        return self._csrf_token is not None and time.time() < self._token_expiry
+
+    def invalidate(self):
+        self._csrf_token = None
+
+    def _refresh_token(self):
+        # url_get_token = 'https://puretrack.io/?l=44.68131,4.62335&z=15&group={group}'
+        url_get_token = f'{PURETRACK_URL}/g/{self.group}'
+        response = self.client.get(url_get_token)
         response.raise_for_status()
 
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Step 2: Extract the CSRF token and cookies
-            csrf_token = response.cookies.get('XSRF-TOKEN')
-            session_cookie = response.cookies.get('puretrack_session')
-
-            # Step 3: Preparing the POST request with CSRF token and cookies
-            url_post = 'https://puretrack.io/api/live'
-            headers_post = {
-                # 'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0',
-                # 'Accept': 'application/json, text/plain, */*',
-                'Content-Type': 'application/json',
-                # 'X-Requested-With': 'XMLHttpRequest',
-                'X-XSRF-TOKEN': csrf_token,  # Utiliser le jeton CSRF obtenu
-                # 'Cookie': f'XSRF-TOKEN={csrf_token}; puretrack_session={session_cookie}',
-            }
-
-            data = {
-                # "b1l": "44.68863",
-                # "b1g": "4.62388",
-                # "b2l": "44.67457",
-                # "b2g": "4.60979",
-                # "s": "X-key,X-key",
-                # "o": [63, 6, 7, 17, 20],
-                "t": 360,
-                "a": None,
-                "i": 1,
-                "g": 22,
-                "l": True
-            }
-
-            response_post = requests.post(url_post, headers=headers_post, json=data)
-            response_post.raise_for_status()
-
-            if response_post.status_code == 200:
+        # The session cookie stays in the client's cookie jar
+        for cookie in response.cookies:
+            if cookie.name == 'XSRF-TOKEN':
+                # Laravel sends the token URL encoded
+                self._csrf_token = urllib.parse.unquote(cookie.value)
+                # Renewed a minute before the cookie expires
+                self._token_expiry = (cookie.expires - 60) if cookie.expires else time.time() + self.token_ttl
+                logger.debug(f"PureTrack XSRF token refreshed, valid until {self._token_expiry}")
+                return
+        raise ValueError("Error in obtaining CSRF token.")
+
+    def get_group_live(self):
+        """
+        Fetches the latest position of every member of the group.
+
+        Returns:
+            list: The records of the response if successful, otherwise None.
+        """
+        url_post = f'{PURETRACK_URL}/api/live'
+        try:
+            for attempt in range(2):
+                if not self.token_valid:
+                    self._refresh_token()
+
+                headers_post = {
+                    'Content-Type': 'application/json',
+                    'X-XSRF-TOKEN': self._csrf_token,
+                }
+                response_post = self.client.post(url_post, headers=headers_post, json=self.live_request)
+                if response_post.status_code in (401, 403, 419) and attempt == 0:
+                    # Token or session expired before its time (419: Laravel's CSRF token mismatch)
+                    self.invalidate()
+                    continue
+                response_post.raise_for_status()
                 logger.debug(f"Response from getPureTrackGroupLive API: {response_post.json().get('data')}")
                 return response_post.json().get('data')
-            else:
-                logger.error(f"Data recovery error")
+        except Exception as e:
+            logger.error(f"Data recovery error : {e}")
+            self.invalidate()
 
-        else:
-            logger.error("Error in obtaining CSRF token.")
+        return None
 
-    except Exception as e:
-        logger.error("Data recovery error :", e)
+def get_puretrack_group_live(group, client=None):
+    """
+    Fetches live data for a PureTrack group.
 
-    return None
+    A new token is obtained for the call, use a PureTrackLiveSession to reuse it.
 
-def get_puretrack_tails(key, limit=10):
+    Args:
+        group (str): The slug (unique identifier) of the PureTrack group.
+        client (HttpClient, optional): The HTTP client to use. Default is the shared client.
+
+    Returns:
+        list: The records of the response if successful, otherwise None.
+    """
+    return PureTrackLiveSession(group, client).get_group_live()
+
+def get_puretrack_tails(key, limit=10, client=None):
     """
     Fetches the trail data for a given key from the PureTrack API.
 
     Args:
         key (str): The unique key for the PureTrack object.
         limit (int, optional): The number of records to request. Default is 10.
+        client (HttpClient, optional): The HTTP client to use. Default is the shared client.
 
     Returns:
         dict: The JSON response from the API if successful, otherwise None.
     """
-    url = 'https://puretrack.io/api/trails'
+    url = f'{PURETRACK_URL}/api/trails'
     headers = {
         'Content-Type': 'application/json',
         'Accept-Encoding': 'gzip, deflate, br, zstd'
@@ -408,8 +586,9 @@ def get_puretrack_tails(key, limit=10):
         'maxage': 1440 # Maximum age of records in minutes. Default 1440 (24h)
     }
 
+    client = client or get_default_client()
     try:
-        response = requests.post(url, headers=headers, json=data, params=params)
+        response = client.post(url, headers=headers, json=data, params=params)
         response.raise_for_status()
         if response.status_code == 200:
             logger.debug(f"Response from getPureTrackTails API: {response.json()}")
@@ -420,3 +599,93 @@ def get_puretrack_tails(key, limit=10):
         logger.error("Data recovery error :", e)
 
     return None
+
+def get_puretrack_tails_batch(keys, limit=10, chunk_size=TRAILS_CHUNK_SIZE, cursors=None, client=None):
+    """
+    Fetches the trail data for several keys from the PureTrack API.
+
+    The keys are sent together in the body of /api/trails, `chunk_size` keys per request,
+    and the returned tracks are split per key.
+
+    Args:
+        keys (list): The unique keys of the PureTrack objects.
+        limit (int, optional): The number of records to request for each key. Default is 10.
+        chunk_size (int, optional): The maximum number of keys per request. Default is TRAILS_CHUNK_SIZE.
+        cursors (dict, optional): Unix timestamp sent as 'from' for each key ({key: timestamp}),
+            so that only the records since then are returned. Keys without cursor use 0.
+        client (HttpClient, optional): The HTTP client to use. Default is the shared client.
+
+    Returns:
+        dict: The track of each key ({key: track}). Keys whose request failed are missing.
+    """
+    url = f'{PURETRACK_URL}/api/trails'
+    headers = {
+        'Content-Type': 'application/json',
+        'Accept-Encoding': 'gzip, deflate, br, zstd'
+    }
+    params = {
+        'limit': limit, # Number of records requested per key. Default 14000
+        'maxage': 1440 # Maximum age of records in minutes. Default 1440 (24h)
+    }
+
+    cursors = cursors or {}
+    client = client or get_default_client()
+    tracks_by_key = {}
+    keys = list(keys)
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        data = [{"id": f'{key}', "from": cursors.get(key, 0)} for key in chunk]
+        try:
+            response = client.post(url, headers=headers, json=data, params=params)
+            response.raise_for_status()
+            tracks = response.json().get('tracks') or []
+        except Exception as e:
+            logger.error(f"Data recovery error for {len(chunk)} keys: {e}")
+            continue
+
+        tracks_by_key.update(split_tracks_by_key(chunk, tracks))
+
+    return tracks_by_key
+
+def split_tracks_by_key(keys, tracks):
+    """
+    Associates each track of a /api/trails response with the key it was requested for.
+
+    A track is matched on its 'key', or else on the 'K' field of its last record. The track of a request
+    for a single key, without either, is that key's. Other tracks, or tracks of a key that wasn't
+    requested, are logged and dropped rather than guessed from the request order, which would give the
+    trail of a paraglider to another one.
+
+    Args:
+        keys (list): The keys requested.
+        tracks (list): The 'tracks' list of the response.
+
+    Returns:
+        dict: The track of each key ({key: track}).
+    """
+    requested = set(str(key) for key in keys)
+    tracks_by_key = {}
+    for track in tracks:
+        key = _track_key(track)
+        if key is None and len(requested) == 1 and len(tracks) == 1:
+            key = next(iter(requested))
+        if key is None or key not in requested:
+            logger.warning(f"Track of an unrequested key {key!r} dropped")
+            continue
+        tracks_by_key[key] = track
+    return tracks_by_key
+
+def _track_key(track):
+    """
+    Returns:
+        str: The key of a track of /api/trails, from its 'key' or the 'K' field of its last record, None if unknown.
+    """
+    key = track.get('key')
+    if key is not None:
+        return str(key)
+    points = track.get('points') or []
+    last = track.get('last') or (points[-1] if points else None)
+    for element in (last or '').split(','):
+        if element.startswith('K') and len(element) > 1:
+            return element[1:]
+    return None
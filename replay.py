@@ -0,0 +1,293 @@
+import argparse
+import bisect
+import copy
+import json
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+import kinematics
+import puretrack_api as ptrk
+from archive import TrackArchive
+from clock import VirtualClock, get_default_clock, set_default_clock
+from discord_api import DiscordApi
+from event_bus import StateChanged, Alert, Clearance, CycleCompleted
+from guardian_angel import GuardianAngel
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+class RecordedTrack:
+    """
+    The recorded points of a paraglider, served as the /api/trails track PureTrack would answer.
+
+    The speed and course of each point are calculated from the previous one, as a tracker reports them.
+    """
+    def __init__(self, puretrack_key, timestamps, lats, lons, alts, ground_levels=None, name=None):
+        """
+        Initialize the track.
+
+        Args:
+            puretrack_key (str): The PureTrack key of the paraglider.
+            timestamps (list): The Unix timestamps of the points, sorted.
+            lats (list): Latitudes in degrees.
+            lons (list): Longitudes in degrees.
+            alts (list): GNSS altitudes in meters, NaN if unknown.
+            ground_levels (list, optional): Ground levels in meters. Default is unknown, looked up in the SRTM data.
+            name (str, optional): The name of the pilot. Default is the PureTrack key.
+        """
+        self.puretrack_key = puretrack_key
+        self.name = name or puretrack_key
+        self.timestamps = [int(timestamp) for timestamp in timestamps]
+        segments = kinematics.track_kinematics(self.timestamps, lats, lons)
+        self._columns = list(zip(
+            self.timestamps, lats, lons, alts,
+            segments['ground_speed'].tolist(), segments['course'].tolist(),
+            ground_levels if ground_levels is not None else [None] * len(self.timestamps)
+        ))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def start(self):
+        return self.timestamps[0]
+
+    @property
+    def end(self):
+        return self.timestamps[-1]
+
+    def track(self, since, until, limit=ptrk.TRAILS_CATCHUP_LIMIT):
+        """
+        Get the track of the points recorded between two times, as a track of the /api/trails response.
+
+        Args:
+            since (float): Unix timestamp sent as 'from', included.
+            until (float): Current Unix timestamp, included: the points after it are not recorded yet.
+            limit (int, optional): Number of points at most, the last ones.
+
+        Returns:
+            dict: The track, its 'points' the oldest first.
+        """
+        first = bisect.bisect_left(self.timestamps, since)
+        last = bisect.bisect_right(self.timestamps, until)
+        records = [_record(self.puretrack_key, *point) for point in self._columns[max(first, last - limit):last]]
+        return {'key': self.puretrack_key, 'count': len(records), 'last': records[-1] if records else None, 'points': records}
+
+def _record(key, timestamp, lat, lon, alt, speed, course, ground_level):
+    # A PureTrack record (cf. puretrack_api.key_mapping), without the unknown fields
+    fields = [f"T{timestamp}", f"L{lat:.5f}", f"G{lon:.5f}"]
+    if not math.isnan(alt):
+        fields.append(f"A{alt:.0f}")
+    fields += [f"S{speed:.2f}", f"C{course:.0f}"]
+    if ground_level is not None:
+        fields.append(f"g{ground_level:.0f}")
+    fields.append(f"K{key}")
+    return ','.join(fields)
+
+def load_igc(path, puretrack_key=None):
+    """
+    Load the B records of an IGC file.
+
+    Args:
+        path (str): The IGC file.
+        puretrack_key (str, optional): The key of the paraglider. Default is the file name without extension.
+
+    Returns:
+        RecordedTrack: The track, the pilot named after the HFPLT header.
+    """
+    date = None
+    name = None
+    timestamps, lats, lons, alts = [], [], [], []
+    previous = None
+    with open(path, encoding='ascii', errors='replace') as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith('HFDTE'):
+                # HFDTEDDMMYY or HFDTEDATE:DDMMYY,NN
+                digits = line[5:].split(':')[-1][:6]
+                date = datetime.strptime(digits, '%d%m%y').replace(tzinfo=timezone.utc)
+            elif line.startswith('HFPLT'):
+                name = line.split(':', 1)[-1].strip() or None
+            elif line.startswith('B') and len(line) >= 35 and date is not None:
+                timestamp = date + timedelta(hours=int(line[1:3]), minutes=int(line[3:5]), seconds=int(line[5:7]))
+                if previous is not None and timestamp < previous:
+                    # Past midnight UTC
+                    date += timedelta(days=1)
+                    timestamp += timedelta(days=1)
+                previous = timestamp
+                timestamps.append(timestamp.timestamp())
+                lats.append(_igc_angle(line[7:15], 2))
+                lons.append(_igc_angle(line[15:24], 3))
+                alts.append(float(int(line[30:35])) if line[24] == 'A' else math.nan)
+    puretrack_key = puretrack_key or os.path.splitext(os.path.basename(path))[0]
+    return RecordedTrack(puretrack_key, timestamps, lats, lons, alts, name=name)
+
+def _igc_angle(text, degrees_digits):
+    # DDMMmmmN or DDDMMmmmE
+    degrees = int(text[:degrees_digits])
+    minutes = int(text[degrees_digits:-1]) / 1000
+    value = degrees + minutes / 60
+    return -value if text[-1] in 'SW' else value
+
+def load_archive(directory, keys=None):
+    """
+    Load the tracks of an archive (cf. archive.archive_event).
+
+    Args:
+        directory (str): The archive directory.
+        keys (list, optional): The PureTrack keys of the paragliders. Default is all of them.
+
+    Returns:
+        list: The RecordedTrack of each paraglider with points.
+    """
+    archive = TrackArchive(directory)
+    tracks = []
+    for puretrack_key in keys or archive.keys():
+        columns = {'timestamp': [], 'lat': [], 'lon': [], 'alt': []}
+        for chunk in archive.open(puretrack_key).iter_chunks():
+            for name, values in columns.items():
+                values.extend(chunk[name].tolist())
+        if columns['timestamp']:
+            tracks.append(RecordedTrack(puretrack_key, columns['timestamp'], columns['lat'], columns['lon'], columns['alt']))
+    return tracks
+
+class RecordingDiscord(DiscordApi):
+    """
+    DiscordApi keeping the messages, with the time of the replay, instead of sending them.
+    """
+    def __init__(self, clock):
+        self.clock = clock
+        self.messages = []
+
+    def send_message(self, message):
+        self.messages.append((self.clock.now(), message))
+
+    def stop(self):
+        pass
+
+class Replay:
+    """
+    Replay of recorded tracks through GuardianAngel, on a virtual clock, as fast as the CPU allows.
+
+    The process-wide clock is replaced by a VirtualClock during the run. GuardianAngel's scheduler has no
+    thread then: the replay turns it, and the monitoring cycles, the timeouts of the paragliders and the
+    polls happen at their virtual times. Each cycle fetches the points recorded up to the virtual time,
+    through the parsing, the hot tier and the state machines of a live run.
+
+    The storage is in memory, the ingestion 'sync', the roster the recorded paragliders and the Discord
+    messages are kept rather than sent. The rest of the configuration applies, e.g. the polling cadence.
+    """
+    def __init__(self, tracks, cfg=None, tail=600):
+        """
+        Initialize the replay.
+
+        Args:
+            tracks (list): The RecordedTrack of each paraglider.
+            cfg (dict, optional): Configuration of the application ('guardian_angel' of config.json).
+            tail (float, optional): Seconds replayed after the last point, for the last timeouts.
+        """
+        self.tracks = {track.puretrack_key: track for track in tracks if len(track)}
+        self.cfg = copy.deepcopy(cfg or {})
+        self.tail = tail
+        self.clock = None
+
+    def run(self, start=None, end=None):
+        """
+        Replay the tracks.
+
+        Args:
+            start (float, optional): Unix timestamp of the beginning. Default is the first point.
+            end (float, optional): Unix timestamp of the end. Default is the last point, plus the tail.
+
+        Returns:
+            dict: 'pilots', 'simulated_hours', 'wall_seconds', 'pilot_hours_per_second', 'cycles', 'points',
+                'log' (the state transitions, alerts and clearances: {'datetime', 'pilot', 'event', 'source', 'dest',
+                'message'}) and 'messages' (the Discord messages: {'datetime', 'message'}).
+        """
+        start = start if start is not None else min(track.start for track in self.tracks.values())
+        end = end if end is not None else max(track.end for track in self.tracks.values()) + self.tail
+        self.clock = VirtualClock(datetime.fromtimestamp(start, timezone.utc))
+        log = []
+        cycles = []
+
+        def record(event):
+            log.append({
+                'datetime': event.datetime.isoformat(),
+                'pilot': event.sender.name,
+                'event': type(event).__name__,
+                'source': getattr(event, 'source', None),
+                'dest': getattr(event, 'dest', None),
+                'message': getattr(event, 'message', None),
+            })
+
+        previous_clock = get_default_clock()
+        set_default_clock(self.clock)
+        guardian_angel = None
+        discord_bot = None
+        try:
+            guardian_angel = GuardianAngel(self._guardian_angel_cfg(), trails=self._trails)
+            discord_bot, guardian_angel.discord_bot = guardian_angel.discord_bot, RecordingDiscord(self.clock)
+            for event_type in (StateChanged, Alert, Clearance):
+                guardian_angel.bus.subscribe(event_type, record)
+            guardian_angel.bus.subscribe(CycleCompleted, cycles.append)
+            wall_start = time.perf_counter()
+            guardian_angel.scheduler.advance(end - start)
+            wall_seconds = time.perf_counter() - wall_start
+        finally:
+            if guardian_angel is not None:
+                # Releases the storage and the HTTP client, the recording stand-in in place of the Discord bot
+                guardian_angel.close()
+            if discord_bot is not None:
+                discord_bot.stop()
+            set_default_clock(previous_clock)
+
+        simulated_hours = (end - start) / 3600
+        return {
+            'pilots': len(self.tracks),
+            'simulated_hours': simulated_hours,
+            'wall_seconds': wall_seconds,
+            'pilot_hours_per_second': len(self.tracks) * simulated_hours / wall_seconds,
+            'cycles': len(cycles),
+            'points': sum(len(track) for track in self.tracks.values()),
+            'log': log,
+            'messages': [{'datetime': dt.isoformat(), 'message': message} for dt, message in guardian_angel.discord_bot.messages],
+        }
+
+    def _guardian_angel_cfg(self):
+        cfg = copy.deepcopy(self.cfg)
+        cfg['paragliders'] = [{'name': track.name, 'puretrack_key': key} for key, track in self.tracks.items()]
+        cfg['puretrack_site'] = {**cfg.get('puretrack_site', {}), 'group': cfg.get('puretrack_site', {}).get('group', 'replay'), 'mode': 'trails'}
+        cfg.setdefault('discord_bot', {})
+        cfg['roster'] = {'auto_discovery': False}
+        cfg['ingestion'] = {'mode': 'sync'}
+        cfg['database'] = {'backend': 'memory'}
+        return cfg
+
+    def _trails(self, keys, cursors):
+        until = self.clock.now().timestamp()
+        return {key: self.tracks[key].track(cursors.get(key, 0), until) for key in keys if key in self.tracks}
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded tracks through GuardianAngel on a virtual clock.")
+    parser.add_argument('paths', nargs='+', help="IGC files or archive directories")
+    parser.add_argument('--log', help="File to write the transition and alert log to, as JSON lines")
+    args = parser.parse_args()
+
+    from config import Config
+    cfg = Config().get('guardian_angel')
+    tracks = []
+    for path in args.paths:
+        tracks.extend(load_archive(path) if os.path.isdir(path) else [load_igc(path)])
+    report = Replay(tracks, cfg).run()
+    print(f"{report['pilots']} pilots, {report['simulated_hours']:.1f} h, {report['points']} points, {report['cycles']} cycles "
+          f"in {report['wall_seconds']:.1f} s: {report['pilot_hours_per_second']:.0f} pilot-hours per second")
+    print(f"{sum(entry['event'] == 'StateChanged' for entry in report['log'])} transitions, "
+          f"{sum(entry['event'] == 'Alert' for entry in report['log'])} alerts, {len(report['messages'])} Discord messages")
+    if args.log:
+        with open(args.log, 'w') as file:
+            for entry in report['log']:
+                file.write(json.dumps(entry) + '\n')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import threading
+import time
+from datetime import timedelta
+from clock import get_default_clock
+from logger import get_logger
+
+class Retention:
+    """
+    Purge of the points older than the retention period, on its own schedule.
+
+    A purge deletes the old points in chunks of `chunk_size` rows, each chunk a write of the storage:
+    the next chunk is queued once the previous one is committed, so the writes of the monitoring cycles
+    are never queued behind a long delete. A failed chunk stops the purge, the next period starts a new one.
+    """
+    def __init__(self, cfg, storage):
+        """
+        Initialize the retention.
+
+        Args:
+            cfg (dict): Configuration of the retention, e.g.
+                {
+                    "hours": 48,            # Age of the oldest points kept
+                    "period": 900,          # Seconds between two purges
+                    "chunk_size": 5000      # Maximum number of points deleted per transaction
+                }
+            storage (Storage): The storage of the points.
+        """
+        cfg = cfg or {}
+        self.logger = get_logger("Retention")
+        self.hours = cfg.get('hours', 48)
+        self.period = cfg.get('period', 900)
+        self.chunk_size = cfg.get('chunk_size', 5000)
+        self._storage = storage
+        self._next_run = 0
+        self._report = None
+        self.last_report = None
+
+    def due(self):
+        return get_default_clock().monotonic() >= self._next_run
+
+    def start(self):
+        """
+        Start a purge, its chunks are deleted by the storage.
+        """
+        if self._report is not None:
+            self.logger.warning(f"Previous purge unfinished after {self._report['rows']} rows, restarted")
+        self._next_run = get_default_clock().monotonic() + self.period
+        time_threshold = get_default_clock().now().replace(tzinfo=None) - timedelta(hours=self.hours)
+        self._report = {'rows': 0, 'chunks': 0, 'elapsed': 0.0, 'started': time.monotonic()}
+        self._submit_chunks(self._report, time_threshold)
+
+    def _submit_chunks(self, report, time_threshold):
+        # A chunk committed within purge, by a synchronous storage, is followed by this loop rather than
+        # from its callback, so the stack does not grow with the number of chunks
+        while True:
+            submitted = time.perf_counter()
+            lock = threading.Lock()
+            state = {'pending': True, 'next': False}
+
+            def chunk_done(count, submitted=submitted, lock=lock, state=state):
+                # From the submission to the commit, the wait behind the other writes included
+                report['rows'] += count
+                report['chunks'] += 1
+                report['elapsed'] += time.perf_counter() - submitted
+                if report is not self._report:
+                    return # Restarted meanwhile
+                if count >= self.chunk_size:
+                    with lock:
+                        state['next'] = state['pending']
+                    if not state['next']:
+                        self._submit_chunks(report, time_threshold)
+                    return
+                report['duration'] = time.monotonic() - report.pop('started')
+                self.last_report, self._report = report, None
+                self.logger.info(
+                    f"Purge: {report['rows']} rows removed in {report['chunks']} chunks, "
+                    f"{report['elapsed'] * 1000:.1f} ms writing over {report['duration']:.2f} s"
+                )
+
+            def chunk_failed(error):
+                # The purge stops, the next period starts it again
+                if report is self._report:
+                    self._report = None
+                    self.logger.error(f"Purge failed after {report['rows']} rows in {report['chunks']} chunks: {error}")
+
+            self._storage.purge(time_threshold, self.chunk_size, on_commit=chunk_done, on_failure=chunk_failed)
+            with lock:
+                state['pending'] = False
+                if not state['next']:
+                    return
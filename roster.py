@@ -0,0 +1,125 @@
+import json
+import os
+from clock import get_default_clock
+from logger import get_logger
+import puretrack_api as ptrk
+
+# Contact details of a discovered paraglider missing from the configuration
+DEFAULT_PARAGLIDER_CFG = {
+    "discord_id": 0,
+    "phone_number": "+33700000000",
+    "email": ""
+}
+
+class RosterSync:
+    """
+    Roster of the paragliders, discovered from the members of the PureTrack group.
+
+    The members are fetched on a slow schedule and cached locally, the cache is used when PureTrack
+    can't be reached. The contact details come from the configured paragliders, matched by PureTrack key,
+    and the configured paragliders are always part of the roster.
+    """
+    def __init__(self, cfg, group, paragliders_cfg, client=None):
+        """
+        Initialize the roster synchronization.
+
+        Args:
+            cfg (dict): Configuration of the roster, e.g.
+                {
+                    "auto_discovery": true,             # Sync with the PureTrack group members
+                    "sync_period": 900,                 # Seconds between two syncs
+                    "cache_file": "data/group.json"     # Local copy of the last roster
+                }
+            group (str): The slug of the PureTrack group.
+            paragliders_cfg (list): The configured paragliders.
+            client (HttpClient, optional): The HTTP client to use.
+        """
+        cfg = cfg or {}
+        self.logger = get_logger("RosterSync")
+        self.auto_discovery = cfg.get('auto_discovery', False)
+        self.sync_period = cfg.get('sync_period', 900)
+        self.cache_file = cfg.get('cache_file', 'data/group.json')
+        self.group = group
+        self.client = client
+        self._configured = {paraglider_cfg.get('puretrack_key'): paraglider_cfg for paraglider_cfg in paragliders_cfg or []}
+        self._next_sync = 0
+
+    def due(self):
+        return self.auto_discovery and get_default_clock().monotonic() >= self._next_sync
+
+    def load(self):
+        """
+        Get the roster to start with: the configured paragliders, plus the cached group members if auto discovery is on.
+
+        Returns:
+            dict: The configuration of each paraglider ({puretrack_key: cfg}).
+        """
+        roster = dict(self._configured)
+        if self.auto_discovery:
+            roster.update(self._read_cache())
+        return roster
+
+    def fetch(self):
+        """
+        Fetch the members of the PureTrack group and cache them.
+
+        Returns:
+            dict: The configuration of each member ({puretrack_key: cfg}), None if the group can't be fetched.
+        """
+        self._next_sync = get_default_clock().monotonic() + self.sync_period
+        group = ptrk.get_puretrack_group(self.group, client=self.client)
+        if not group or group.get('members') is None:
+            self.logger.warning(f"Group {self.group} can't be fetched, roster unchanged.")
+            return None
+
+        # The configured paragliders are always watched, even if they are not (yet) in the group
+        roster = dict(self._configured)
+        for member in group.get('members'):
+            key = member.get('key')
+            if key:
+                roster[key] = self._paraglider_cfg(key, member.get('label'))
+        self._write_cache(roster)
+        return roster
+
+    def diff(self, current, roster):
+        """
+        Compare the live paragliders with a roster.
+
+        Args:
+            current (dict): The configuration of each live paraglider ({puretrack_key: cfg}).
+            roster (dict): The configuration of each paraglider of the roster ({puretrack_key: cfg}).
+
+        Returns:
+            tuple: (joined, left, changed): the configurations of the paragliders which joined,
+                the keys of those which left and the new configurations of those whose details changed.
+        """
+        joined = [cfg for key, cfg in roster.items() if key not in current]
+        left = [key for key in current if key not in roster]
+        changed = [cfg for key, cfg in roster.items() if key in current and cfg != current[key]]
+        return joined, left, changed
+
+    def _paraglider_cfg(self, key, label):
+        cfg = {"name": label or key, "puretrack_key": key}
+        cfg.update(DEFAULT_PARAGLIDER_CFG)
+        cfg.update(self._configured.get(key, {}))
+        return cfg
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_file, 'r') as file:
+                return {cfg['puretrack_key']: cfg for cfg in json.load(file)}
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            self.logger.error(f"Invalid roster cache '{self.cache_file}': {e}")
+            return {}
+
+    def _write_cache(self, roster):
+        try:
+            directory = os.path.dirname(self.cache_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.cache_file, 'w') as file:
+                json.dump(list(roster.values()), file, indent=4)
+        except OSError as e:
+            self.logger.error(f"Roster cache '{self.cache_file}' can't be written: {e}")
@@ -0,0 +1,295 @@
+import math
+import threading
+from clock import get_default_clock
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# The slot of the timers taken from the wheel in the current tick, not fired yet: they can still be cancelled
+_DUE = frozenset()
+
+class ScheduledTimer:
+    """
+    A timer armed in a TimerWheel, cancelled through its handle.
+    """
+    __slots__ = ('_wheel', '_slot', 'tick', 'callback', 'args')
+
+    def __init__(self, wheel, tick, callback, args):
+        self._wheel = wheel
+        self._slot = None # The slot holding the timer, None once fired or cancelled
+        self.tick = tick # Tick of the deadline
+        self.callback = callback
+        self.args = args
+
+    @property
+    def active(self):
+        return self._slot is not None
+
+    def cancel(self):
+        """
+        Cancel the timer, nothing happens if it has already fired or been cancelled.
+
+        Returns:
+            bool: True if the timer was cancelled.
+        """
+        return self._wheel.cancel(self)
+
+class TimerWheel:
+    """
+    Scheduler of the timers of the application on a single thread: the timeouts of the paragliders
+    and the monitoring cycle.
+
+    The timers are hashed in a wheel of slots by the tick of their deadline, a tick every `resolution`
+    seconds: arming and cancelling a timer is a set insertion or removal, whatever the number of timers.
+    The worker thread turns the wheel one slot per tick and fires the timers of the slot whose deadline
+    has come, the others are left for a later round. It sleeps while no timer is armed.
+
+    The callbacks are run one after another on the worker thread, so they never run concurrently:
+    a timer may fire late by the time of the callbacks before it, e.g. a monitoring cycle.
+
+    With a virtual clock, the wheel has no thread: it is turned by advance, which moves the clock from tick
+    to tick and fires the timers on the calling thread, as fast as they run.
+    """
+    def __init__(self, cfg=None, clock=None):
+        """
+        Initialize the wheel and start its thread, unless the clock is virtual.
+
+        Args:
+            cfg (dict, optional): Configuration of the scheduler, e.g.
+                {
+                    "resolution": 0.1,      # Seconds per tick, the timers fire at most this late
+                    "slots": 1024           # Number of slots of the wheel
+                }
+            clock (Clock, optional): The clock of the deadlines. Default is the shared clock.
+        """
+        cfg = cfg or {}
+        self.resolution = cfg.get('resolution', 0.1)
+        self.clock = clock if clock is not None else get_default_clock()
+        self._slots = [set() for _ in range(cfg.get('slots', 1024))]
+        self._condition = threading.Condition()
+        self._start = self.clock.monotonic()
+        self._tick = 0 # Last processed tick
+        self._count = 0 # Number of armed timers
+        self._stopped = False
+        self.fired = 0
+        self._thread = None
+        if not self.clock.virtual:
+            self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, delay, callback, *args):
+        """
+        Arm a timer.
+
+        Args:
+            delay (float): Seconds until the timer fires.
+            callback (callable): callback(*args), called on the scheduler thread.
+
+        Returns:
+            ScheduledTimer: The handle of the timer.
+        """
+        with self._condition:
+            if self._count == 0:
+                # The idle wheel didn't turn, it catches up at once
+                self._tick = max(self._tick, math.floor(self._ticks(self.clock.monotonic())))
+            tick = max(math.ceil(self._ticks(self.clock.monotonic() + delay)), self._tick + 1)
+            timer = ScheduledTimer(self, tick, callback, args)
+            timer._slot = self._slots[tick % len(self._slots)]
+            timer._slot.add(timer)
+            self._count += 1
+            if self._count == 1:
+                self._condition.notify()
+        return timer
+
+    def cancel(self, timer):
+        """
+        Cancel a timer.
+
+        Args:
+            timer (ScheduledTimer): The handle of the timer.
+
+        Returns:
+            bool: True if the timer was cancelled, False if it had already fired or been cancelled.
+        """
+        with self._condition:
+            if timer._slot is None:
+                return False
+            if timer._slot is _DUE:
+                # Due in the current tick, e.g. cancelled by the callback of another timer of the tick
+                timer._slot = None
+                return True
+            timer._slot.discard(timer)
+            timer._slot = None
+            self._count -= 1
+            return True
+
+    def stop(self):
+        """
+        Stop the worker thread, the armed timers never fire.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def advance(self, seconds):
+        """
+        Turn the wheel of a virtual clock: move the clock forward tick by tick, firing the due timers on the calling thread.
+
+        Args:
+            seconds (float): Seconds to move the clock forward.
+        """
+        if self._thread is not None:
+            raise RuntimeError("Only the wheel of a virtual clock is turned by advance")
+        end = self.clock.monotonic() + seconds
+        last_tick = math.floor(self._ticks(end) + 1e-9) # Last tick due by the end, despite the rounding
+        while not self._stopped:
+            with self._condition:
+                # The empty slots are skipped without moving the clock
+                while self._count and self._tick < last_tick and not self._slots[(self._tick + 1) % len(self._slots)]:
+                    self._tick += 1
+                if self._count == 0 or self._tick >= last_tick:
+                    # Nothing to fire, the wheel catches up when the next timer is armed
+                    break
+                self.clock.advance_to(self._start + (self._tick + 1) * self.resolution)
+                due = self._turn()
+            self._fire(due)
+        self.clock.advance_to(end)
+
+    def _ticks(self, monotonic):
+        return (monotonic - self._start) / self.resolution
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._count == 0:
+                        self._condition.wait()
+                        continue
+                    delay = self._start + (self._tick + 1) * self.resolution - self.clock.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if self._stopped:
+                    return
+                due = self._turn()
+
+            # Outside the lock: the callbacks arm and cancel timers
+            self._fire(due)
+
+    def _turn(self):
+        # Next tick, the timers of its slot whose deadline has come are removed and returned
+        self._tick += 1
+        slot = self._slots[self._tick % len(self._slots)]
+        if not slot:
+            return ()
+        due = [timer for timer in slot if timer.tick <= self._tick]
+        for timer in due:
+            slot.discard(timer)
+            timer._slot = _DUE
+        self._count -= len(due)
+        return due
+
+    def _fire(self, due):
+        for timer in due:
+            with self._condition:
+                if timer._slot is not _DUE:
+                    continue # Cancelled meanwhile
+                timer._slot = None
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                logger.error(f"Timer callback {getattr(timer.callback, '__name__', timer.callback)} failed: {e}")
+            self.fired += 1
+
+class PeriodicTimer:
+    """
+    A callback run at a fixed rate by a TimerWheel, e.g. the monitoring cycle.
+
+    The runs are due at start + k * period, whatever their duration: the period doesn't drift by the
+    time of the callback. A run ending after the next due time overran: the due times already passed
+    are skipped and counted, not queued, and the next run is at the next due time to come.
+    """
+    def __init__(self, scheduler, period, callback, *args):
+        """
+        Initialize the timer, started by start.
+
+        Args:
+            scheduler (TimerWheel): The scheduler running the callback.
+            period (float): Seconds between two runs.
+            callback (callable): callback(*args).
+        """
+        self.logger = get_logger("PeriodicTimer")
+        self.period = period
+        self.runs = 0
+        self.overruns = 0 # Number of skipped runs
+        self.last_lateness = 0.0 # Seconds between the due time and the start of the last run
+        self._scheduler = scheduler
+        self._callback = callback
+        self._args = args
+        self._due = None
+        self._timer = None
+        self._cancelled = False
+
+    def start(self):
+        """
+        Start the timer, the first run is one period from now.
+        """
+        self._cancelled = False
+        self._due = self._scheduler.clock.monotonic() + self.period
+        self._timer = self._scheduler.schedule(self.period, self._run)
+
+    def cancel(self):
+        self._cancelled = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _run(self):
+        if self._cancelled:
+            return
+        self.last_lateness = self._scheduler.clock.monotonic() - self._due
+        try:
+            self._callback(*self._args)
+        finally:
+            self.runs += 1
+            now = self._scheduler.clock.monotonic()
+            self._due += self.period
+            if self._due <= now:
+                skipped = int((now - self._due) // self.period) + 1
+                self._due += skipped * self.period
+                self.overruns += skipped
+                self.logger.warning(f"Run overran the period of {self.period} s, {skipped} runs skipped")
+            if not self._cancelled:
+                self._timer = self._scheduler.schedule(self._due - now, self._run)
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+def get_default_scheduler():
+    """
+    Get the process-wide scheduler, created on first use.
+
+    Returns:
+        TimerWheel: The shared scheduler.
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = TimerWheel()
+        return _default_scheduler
+
+def set_default_scheduler(scheduler):
+    """
+    Replace the process-wide scheduler.
+
+    Args:
+        scheduler (TimerWheel): The scheduler to share.
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        _default_scheduler = scheduler
@@ -0,0 +1,103 @@
+class StateMachine:
+    """
+    Finite state machine compiled once into tables and shared by all the instances of a model class.
+
+    The model keeps only its current state, in its `state` attribute. Each trigger is a method of the
+    model class: it looks up the transitions of the trigger from the current state, takes the first one
+    whose conditions hold, calls the exit action of the source state, changes the state, then calls the
+    entry action of the destination, as transitions.Machine does. A transition to the same state exits
+    and enters it again. A trigger invalid from the current state is ignored and returns False.
+
+    The actions are the `on_exit_<state>` and `on_enter_<state>` methods of the model class,
+    the conditions its methods or properties. A trigger called from an action runs at once, from the
+    new state.
+    """
+    def __init__(self, states, transitions, initial, after_state_change=None):
+        """
+        Compile the state machine.
+
+        Args:
+            states (list): The names of the states.
+            transitions (list): The transitions, as dicts of 'trigger', 'source', 'dest', and the optional
+                'conditions' (must be true) and 'unless' (must be false): a name or a list of names.
+            initial (str): The initial state.
+            after_state_change (str, optional): The name of a method of the model class, called with the source
+                and destination states once the state changed, before the entry action.
+        """
+        self.states = tuple(states)
+        self.initial = initial
+        self.transitions = transitions
+        self.after_state_change = after_state_change
+        self._table = None # {trigger: {source: ((dest, ((condition, expected), ...)), ...)}}
+        self._actions = None # {state: (on_exit, on_enter)}
+        self._after_state_change = None
+
+    @property
+    def triggers(self):
+        return tuple(dict.fromkeys(transition['trigger'] for transition in self.transitions))
+
+    def bind(self, model_class):
+        """
+        Resolve the actions and conditions of a model class and add it a method per trigger.
+
+        Args:
+            model_class (type): The class of the models.
+        """
+        for transition in self.transitions:
+            for state in (transition['source'], transition['dest']):
+                if state not in self.states:
+                    raise ValueError(f"Unknown state {state} in the transition {transition['trigger']}")
+        self._actions = {
+            state: (getattr(model_class, f'on_exit_{state}', None), getattr(model_class, f'on_enter_{state}', None))
+            for state in self.states
+        }
+        if self.after_state_change is not None:
+            self._after_state_change = getattr(model_class, self.after_state_change)
+        self._table = {}
+        for transition in self.transitions:
+            conditions = tuple(
+                (_condition(model_class, name), expected)
+                for key, expected in (('conditions', True), ('unless', False))
+                for name in _names(transition.get(key))
+            )
+            by_source = self._table.setdefault(transition['trigger'], {})
+            by_source[transition['source']] = by_source.get(transition['source'], ()) + ((transition['dest'], conditions),)
+        for trigger in self.triggers:
+            setattr(model_class, trigger, self._trigger_method(trigger))
+
+    def _trigger_method(self, trigger):
+        by_source = self._table[trigger]
+        change_state = self._change_state
+
+        def method(model):
+            for dest, conditions in by_source.get(model.state, ()):
+                if not conditions or all(bool(condition(model)) is expected for condition, expected in conditions):
+                    change_state(model, dest)
+                    return True
+            return False # Invalid from the current state, or no condition met
+
+        method.__name__ = trigger
+        method.__doc__ = f"Trigger '{trigger}' of the state machine, True if a transition was taken."
+        return method
+
+    def _change_state(self, model, dest):
+        source = model.state
+        on_exit = self._actions[source][0]
+        if on_exit is not None:
+            on_exit(model)
+        model.state = dest
+        if self._after_state_change is not None:
+            self._after_state_change(model, source, dest)
+        on_enter = self._actions[dest][1]
+        if on_enter is not None:
+            on_enter(model)
+
+def _names(names):
+    if names is None:
+        return ()
+    return (names,) if isinstance(names, str) else tuple(names)
+
+def _condition(model_class, name):
+    # A property is read, a method called
+    attribute = getattr(model_class, name)
+    return attribute.fget if isinstance(attribute, property) else attribute
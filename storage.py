@@ -0,0 +1,305 @@
+import bisect
+from abc import ABC, abstractmethod
+from datetime import timezone, timedelta
+from operator import itemgetter
+from clock import get_default_clock
+import kinematics
+import database as db
+from db_writer import DatabaseWriter
+
+# Columns of a stored point, as in the database
+COLUMNS = ('datetime', 'latitude', 'longitude', 'course', 'speed', 'speed_calc', 'altitude', 'altitude_gnd_calc', 'state')
+
+class Storage(ABC):
+    """
+    Storage of the points of the paragliders.
+
+    The datetimes are naive UTC, as stored by SQLite. The writes may be asynchronous: their callbacks
+    are called once the points are durable, from any thread.
+    """
+    @abstractmethod
+    def insert_points(self, points_by_key, on_commit=None, cursors=None):
+        """
+        Insert the points of several paragliders, the points already stored are ignored.
+
+        Args:
+            points_by_key (dict): The parsed points of each paraglider ({paraglider_key: points}).
+            on_commit (callable, optional): on_commit(count), called once the points are stored.
+            cursors (dict, optional): The trail cursors advanced by the points ({paraglider_key: timestamp}),
+                stored with them, cf. get_trail_cursors.
+        """
+
+    @abstractmethod
+    def purge(self, time_threshold, chunk_size=None, on_commit=None, on_failure=None):
+        """
+        Delete the points older than a datetime.
+
+        Args:
+            time_threshold (datetime): The points before this naive UTC datetime are deleted.
+            chunk_size (int, optional): Maximum number of points deleted. Default is all of them.
+            on_commit (callable, optional): on_commit(count), called once the points are deleted.
+            on_failure (callable, optional): on_failure(error), called instead if the deletion fails.
+        """
+
+    @abstractmethod
+    def get_last_timestamps(self):
+        """
+        Get the timestamp of the last stored point of every paraglider.
+
+        Returns:
+            dict: The Unix timestamp of the last point of each paraglider ({paraglider_key: timestamp}).
+        """
+
+    @abstractmethod
+    def get_trail_cursors(self):
+        """
+        Get the trail cursor of every paraglider: the timestamp of its last trail point, the snapshot points
+        are not taken into account.
+
+        Returns:
+            dict: The Unix timestamp of the last trail point of each paraglider ({paraglider_key: timestamp}).
+        """
+
+    @abstractmethod
+    def get_fleet_state(self, keys, minutes=5):
+        """
+        Get, for every paraglider, its last known point and its time-weighted average speed over the last X minutes.
+
+        Args:
+            keys (list): The PureTrack keys of the paragliders.
+            minutes (int): The time window of the average speed in minutes.
+
+        Returns:
+            dict: The state of each paraglider with a point, as expected by Paraglider.update ({paraglider_key: state}).
+        """
+
+    @abstractmethod
+    def calculate_average_speed(self, paraglider_key, minutes=5):
+        """
+        Calculate the time-weighted average speed of a paraglider over the last X minutes.
+
+        Returns:
+            float: The average speed in m/s.
+        """
+
+    @abstractmethod
+    def get_recent_points(self, keys, since):
+        """
+        Get the recent points of several paragliders, and the last point of those without recent points.
+
+        Args:
+            keys (list): The PureTrack keys of the paragliders.
+            since (datetime): The oldest point to get, timezone aware.
+
+        Returns:
+            dict: The points of each paraglider with a point, sorted by datetime, as dicts of COLUMNS.
+        """
+
+    @abstractmethod
+    def get_history(self, paraglider_key, minutes=30):
+        """
+        Get the points of a paraglider over the last X minutes.
+
+        Returns:
+            list: The points sorted by datetime, as dicts of COLUMNS.
+        """
+
+    def flush(self):
+        """
+        Wait until the pending writes are done.
+        """
+
+    def close(self):
+        """
+        Write the pending writes and release the storage.
+        """
+
+class SqlStorage(Storage):
+    """
+    Storage in a SQL database through SQLAlchemy, cf. database.
+
+    The writes go through a DatabaseWriter, the reads use their own sessions.
+    """
+    def __init__(self, cfg):
+        db.init_db_engine(cfg)
+        self.writer = DatabaseWriter()
+
+    def insert_points(self, points_by_key, on_commit=None, cursors=None):
+        self.writer.write_points(points_by_key, on_commit, cursors)
+
+    def purge(self, time_threshold, chunk_size=None, on_commit=None, on_failure=None):
+        if chunk_size is None:
+            def purge(session):
+                return session.query(db.ParaglidersData).filter(db.ParaglidersData.datetime < time_threshold).delete()
+        else:
+            def purge(session):
+                return db.purge_old_data_chunk(session, time_threshold, chunk_size)
+        self.writer.submit(purge, on_commit, on_failure)
+
+    def get_last_timestamps(self):
+        with db.SessionLocal() as session:
+            return db.get_last_timestamps(session)
+
+    def get_trail_cursors(self):
+        with db.SessionLocal() as session:
+            return db.get_trail_cursors(session)
+
+    def get_fleet_state(self, keys, minutes=5):
+        with db.SessionLocal() as session:
+            return db.get_fleet_state(session, keys, minutes)
+
+    def calculate_average_speed(self, paraglider_key, minutes=5):
+        with db.SessionLocal() as session:
+            return db.calculate_average_speed(session, paraglider_key, minutes)
+
+    def get_recent_points(self, keys, since):
+        with db.SessionLocal() as session:
+            return {
+                paraglider_key: [{column: getattr(point, column) for column in COLUMNS} for point in points]
+                for paraglider_key, points in db.get_recent_points(session, keys, since).items()
+            }
+
+    def get_history(self, paraglider_key, minutes=30):
+        return [{column: getattr(point, column) for column in COLUMNS} for point in db.get_paraglider_history(paraglider_key, minutes)]
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+class MemoryStorage(Storage):
+    """
+    Storage in memory, without any disk I/O, e.g. for benchmarks and simulations.
+
+    The points of each paraglider are tuples of COLUMNS in a list sorted by datetime. There is no lock:
+    the writes are expected from a single thread, and each one is a single list operation or the rebinding
+    of a whole list, both atomic under the GIL, so the readers always see a consistent list.
+    The writes are synchronous, their callbacks are called at once.
+    """
+    def __init__(self, cfg=None):
+        self._points = {} # Points by PureTrack key
+        self._cursors = {} # Trail cursor by PureTrack key
+
+    def insert_points(self, points_by_key, on_commit=None, cursors=None):
+        for paraglider_key, timestamp in (cursors or {}).items():
+            self._cursors[paraglider_key] = max(self._cursors.get(paraglider_key, 0), int(timestamp))
+        count = 0
+        for paraglider_key, points in points_by_key.items():
+            rows = self._points.get(paraglider_key)
+            if rows is None:
+                rows = self._points[paraglider_key] = []
+            for point in points:
+                row = _row(point)
+                if not rows or row[0] > rows[-1][0]:
+                    rows.append(row)
+                else:
+                    index = bisect.bisect_left(rows, row[0], key=_DATETIME)
+                    if index == len(rows) or rows[index][0] != row[0]:
+                        rows.insert(index, row)
+                count += 1
+        if on_commit is not None:
+            on_commit(count)
+
+    def purge(self, time_threshold, chunk_size=None, on_commit=None, on_failure=None):
+        count = 0
+        try:
+            for paraglider_key, rows in list(self._points.items()):
+                index = bisect.bisect_left(rows, time_threshold, key=_DATETIME)
+                if chunk_size is not None:
+                    index = min(index, chunk_size - count)
+                if index > 0:
+                    self._points[paraglider_key] = rows[index:]
+                    count += index
+                if chunk_size is not None and count >= chunk_size:
+                    break
+        except Exception as e:
+            if on_failure is None:
+                raise
+            on_failure(e)
+            return
+        if on_commit is not None:
+            on_commit(count)
+
+    def get_last_timestamps(self):
+        return {
+            paraglider_key: int(rows[-1][0].replace(tzinfo=timezone.utc).timestamp())
+            for paraglider_key, rows in list(self._points.items()) if rows
+        }
+
+    def get_trail_cursors(self):
+        return dict(self._cursors)
+
+    def get_fleet_state(self, keys, minutes=5):
+        time_threshold = get_default_clock().now().replace(tzinfo=None) - timedelta(minutes=minutes)
+        fleet_state = {}
+        for paraglider_key in keys:
+            rows = self._points.get(paraglider_key)
+            if not rows:
+                continue
+            last = dict(zip(COLUMNS, rows[-1]))
+            fleet_state[paraglider_key] = {
+                'datetime': last['datetime'].replace(tzinfo=timezone.utc),
+                'coordinates': (last['latitude'], last['longitude']),
+                'course': last['course'],
+                'altitude_gnd_calc': last['altitude_gnd_calc'],
+                'speed': last['speed'],
+                'avg_speed': self._average_speed(rows, time_threshold)
+            }
+        return fleet_state
+
+    def calculate_average_speed(self, paraglider_key, minutes=5):
+        time_threshold = get_default_clock().now().replace(tzinfo=None) - timedelta(minutes=minutes)
+        return self._average_speed(self._points.get(paraglider_key, []), time_threshold)
+
+    def get_recent_points(self, keys, since):
+        time_threshold = since.astimezone(timezone.utc).replace(tzinfo=None)
+        points_by_key = {}
+        for paraglider_key in keys:
+            if rows := self._points.get(paraglider_key):
+                recent = rows[bisect.bisect_left(rows, time_threshold, key=_DATETIME):] or rows[-1:]
+                points_by_key[paraglider_key] = [dict(zip(COLUMNS, row)) for row in recent]
+        return points_by_key
+
+    def get_history(self, paraglider_key, minutes=30):
+        time_threshold = get_default_clock().now().replace(tzinfo=None) - timedelta(minutes=minutes)
+        rows = self._points.get(paraglider_key, [])
+        return [dict(zip(COLUMNS, row)) for row in rows[bisect.bisect_left(rows, time_threshold, key=_DATETIME):]]
+
+    def _average_speed(self, rows, time_threshold):
+        recent = rows[bisect.bisect_left(rows, time_threshold, key=_DATETIME):]
+        if len(recent) < 2:
+            return 0.0
+        return round(kinematics.time_weighted_average(
+            [row[0].replace(tzinfo=timezone.utc).timestamp() for row in recent],
+            [row[4] if row[4] is not None else float('nan') for row in recent]
+        ), 2)
+
+_DATETIME = itemgetter(0)
+
+def _row(point):
+    # A parsed point as a tuple of COLUMNS, with a naive UTC datetime as in the database
+    timestamp = point['datetime']
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp, point['lat'], point['lon'], point.get('course'), point.get('speed'), point.get('speed_calc'),
+            point.get('alt_gps'), point.get('alt_gnd_calc'), point.get('state'))
+
+BACKENDS = {
+    'sql': SqlStorage,
+    'memory': MemoryStorage
+}
+
+def create_storage(cfg):
+    """
+    Create the storage selected by the 'backend' of the database configuration.
+
+    Args:
+        cfg (dict): Configuration of the database, e.g. {"backend": "sql", "url": "sqlite:///data/paragliders.db"}.
+            The backend is "sql" (default) or "memory".
+
+    Returns:
+        Storage: The storage.
+    """
+    cfg = cfg or {}
+    return BACKENDS[cfg.get('backend', 'sql')](cfg)
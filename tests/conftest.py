@@ -0,0 +1,24 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+# The modules are at the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clock import VirtualClock, get_default_clock, set_default_clock # noqa: E402
+
+START = datetime(2025, 7, 1, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def clock():
+    """
+    A virtual clock at START, as the default clock of the test.
+    """
+    previous = get_default_clock()
+    clock = VirtualClock(START)
+    set_default_clock(clock)
+    yield clock
+    set_default_clock(previous)
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+import pytest
+
+from guardian_angel import GuardianAngel
+from conftest import START
+from test_hot_tier import points
+
+
+@pytest.fixture
+def guardian_angel(clock):
+    guardian_angel = GuardianAngel({
+        'paragliders': [{'name': 'Pilot', 'puretrack_key': 'X-0001'}],
+        'puretrack_site': {'group': 'test', 'mode': 'trails'},
+        'discord_bot': {},
+        'roster': {'auto_discovery': False},
+        'database': {'backend': 'memory'},
+    }, trails=lambda keys, cursors: {})
+    guardian_angel.stop_monitoring()
+    yield guardian_angel
+    guardian_angel.close()
+
+
+def test_recent_points_from_the_storage_then_the_hot_tier(guardian_angel):
+    # Stored only: read from the storage, whatever its backend
+    guardian_angel._storage.insert_points({'X-0001': points(START - timedelta(minutes=10), START + timedelta(seconds=1), 9.0)})
+    assert guardian_angel.calculate_average_speed('X-0001') == 9.0
+    assert len(guardian_angel.get_history('X-0001', minutes=5)) == 61
+
+    # Then still in the hot tier, not written to the storage
+    guardian_angel._hot_tier.load(guardian_angel._storage, ['X-0001'])
+    guardian_angel._hot_tier.add_points('X-0001', points(START + timedelta(seconds=5), START + timedelta(seconds=31), 0.0))
+    # 60 s at 9 m/s then 30 s still
+    assert guardian_angel.calculate_average_speed('X-0001', minutes=1) == 6.0
+    history = guardian_angel.get_history('X-0001', minutes=1)
+    assert history[-1]['speed'] == 0.0 and history[-1]['datetime'] == (START + timedelta(seconds=30)).replace(tzinfo=None)
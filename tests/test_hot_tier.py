@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import START
+from hot_tier import HotTier
+from storage import MemoryStorage
+
+
+def points(start, end, speed, period=5):
+    """
+    Returns:
+        list: Parsed points every `period` seconds from `start` to `end` excluded, the last first.
+    """
+    result = []
+    for timestamp in range(int(start.timestamp()), int(end.timestamp()), period):
+        result.append({
+            'timestamp': timestamp, 'datetime': datetime.fromtimestamp(timestamp, timezone.utc),
+            'lat': 45.0, 'lon': 6.0, 'course': 0.0, 'speed': speed, 'speed_calc': speed,
+            'alt_gps': 2000.0, 'alt_gnd_calc': 1100.0,
+        })
+    return result[::-1]
+
+
+def test_partial_buffer_is_left_out_until_loaded(clock):
+    # Flying at 9 m/s for 10 minutes, stored, then still for the last minute: the paraglider was evicted
+    storage = MemoryStorage()
+    storage.insert_points({'X-0001': points(START - timedelta(minutes=10), START - timedelta(minutes=1), 9.0)})
+    hot_tier = HotTier({})
+    hot_tier.add_points('X-0001', points(START - timedelta(minutes=1), START + timedelta(seconds=1), 0.0))
+
+    # An average over the last minute only would be 0 m/s, a landing
+    assert hot_tier.uncovered(['X-0001']) == ['X-0001']
+    assert hot_tier.get_fleet_state(['X-0001']) == {}
+
+    hot_tier.load(storage, ['X-0001'])
+    assert hot_tier.uncovered(['X-0001']) == []
+    state = hot_tier.get_fleet_state(['X-0001'])['X-0001']
+    assert state['avg_speed'] == pytest.approx(9.0 * 4 / 5, abs=0.3)
+    assert state['speed'] == 0.0
+
+
+def test_evicted_paraglider_is_uncovered(clock):
+    hot_tier = HotTier({'max_memory': 1})
+    hot_tier.load(MemoryStorage(), ['X-0001', 'X-0002'])
+    assert len(hot_tier.uncovered(['X-0001', 'X-0002'])) == 1
+
+
+def test_pinned_buffers_are_not_evicted(clock):
+    hot_tier = HotTier({'max_memory': 1})
+    hot_tier.pin(['X-0001', 'X-0002'])
+    for key in ('X-0001', 'X-0002'):
+        hot_tier.add_points(key, points(START - timedelta(minutes=6), START, 9.0))
+    assert 'X-0001' in hot_tier and 'X-0002' in hot_tier
+    assert hot_tier.evictions == 0
+
+    # The least recently updated is evicted once released
+    hot_tier.unpin()
+    assert 'X-0001' not in hot_tier and 'X-0002' in hot_tier
+    assert hot_tier.evictions == 1
+
+
+def test_1_hz_track_holds_the_window(clock):
+    # A tracker at 1 Hz over the whole window, stored and received
+    storage = MemoryStorage()
+    track = points(START - timedelta(seconds=1800), START + timedelta(seconds=1), 9.0, period=1)
+    storage.insert_points({'X-0001': track})
+    hot_tier = HotTier({})
+    hot_tier.load(MemoryStorage(), ['X-0001'])
+    hot_tier.add_points('X-0001', track)
+    for _ in range(2):
+        assert hot_tier.uncovered(['X-0001'], minutes=30) == []
+        assert hot_tier.get_fleet_state(['X-0001'], minutes=10)['X-0001']['avg_speed'] == 9.0
+        assert hot_tier.get_fleet_state(['X-0001'], minutes=30)['X-0001']['avg_speed'] == 9.0
+        # A reload merges the same points
+        hot_tier.load(storage, ['X-0001'])
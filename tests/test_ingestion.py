@@ -0,0 +1,23 @@
+import time
+
+import puretrack_api as ptrk
+from ingestion import AsyncIngestionEngine
+
+
+def test_parsed_tracks_are_stored_past_the_deadline(monkeypatch):
+    monkeypatch.setattr(ptrk, 'get_puretrack_tails_batch',
+                        lambda chunk, *args, **kwargs: {key: {'key': key} for key in chunk})
+    stored = []
+
+    def store(key, parsed_points):
+        time.sleep(0.15) # The storage outlasts the deadline of the cycle, and the former 1 s grace
+        stored.append(key)
+
+    engine = AsyncIngestionEngine({'chunk_size': 5, 'deadline': 0.1}, lambda track: [{'timestamp': 0}])
+    try:
+        keys = [f'X-{index:04d}' for index in range(10)]
+        report = engine.run_cycle(keys, {}, store)
+    finally:
+        engine.close()
+    assert sorted(stored) == keys
+    assert report['stored'] == 10
@@ -0,0 +1,107 @@
+import os
+import random
+import re
+from datetime import datetime, timezone
+
+import pytest
+
+from clock import VirtualClock
+from event_bus import EventBus, StateChanged
+from paraglider import Paraglider
+from scheduler import TimerWheel
+
+README = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'README.md')
+# The entry actions triggering another transition at once, cf. Paraglider.on_enter_<state>
+ENTRY_TRIGGERS = {'Unknown': 'check', 'Clearance': 'landingConfirmed'}
+
+
+def readme_transitions():
+    """
+    Returns:
+        dict: The destination of each (source, trigger) of the README diagram, the check trigger by its condition:
+            {(source, trigger): dest} and {(source, 'check', is_flying): dest}.
+    """
+    with open(README, encoding='utf-8') as file:
+        diagram = file.read().split('@startuml')[1].split('@enduml')[0]
+    table = {}
+    for source, dest, label in re.findall(r'^\s*(\w+) -+> (\w+) : (.+)$', diagram, re.MULTILINE):
+        if trigger := re.fullmatch(r'(\w+)\(\)', label):
+            table[(source, trigger.group(1))] = dest
+        else:
+            condition = re.fullmatch(r'\[(!?)isFlying\(\)\]', label)
+            table[(source, 'check', not condition.group(1))] = dest
+    return table
+
+
+TABLE = readme_transitions()
+STATES = [state for state in Paraglider.states if state != 'Initial']
+TRIGGERS = ['connected', 'timeout', 'nullSpeed', 'highSpeed', 'disconnected', 'landingConfirmed', 'flying', 'check']
+
+
+def reference(state, trigger, is_flying):
+    """
+    Returns:
+        list: The (source, dest) transitions of a trigger from a state per the README diagram, with the
+            transitions the entry actions trigger.
+    """
+    key = (state, trigger, is_flying) if trigger == 'check' else (state, trigger)
+    if key not in TABLE:
+        return []
+    dest = TABLE[key]
+    return [(state, dest)] + (reference(dest, ENTRY_TRIGGERS[dest], is_flying) if dest in ENTRY_TRIGGERS else [])
+
+
+@pytest.fixture
+def paraglider():
+    scheduler = TimerWheel(clock=VirtualClock(datetime(2025, 7, 1, tzinfo=timezone.utc)))
+    bus = EventBus()
+    paraglider = Paraglider({'name': 'test', 'puretrack_key': 'X-0001'}, scheduler=scheduler, bus=bus)
+    changes = []
+    bus.subscribe(StateChanged, lambda event: changes.append((event.source, event.dest)))
+    yield paraglider, changes
+    scheduler.stop()
+
+
+def test_machine_matches_the_readme_diagram():
+    machine = {}
+    for transition in Paraglider.machine.transitions:
+        if transition['trigger'] == 'init':
+            continue # [*] --> Unknown
+        if transition['trigger'] == 'check':
+            machine[(transition['source'], 'check', 'conditions' in transition)] = transition['dest']
+        else:
+            machine[(transition['source'], transition['trigger'])] = transition['dest']
+    assert machine == TABLE
+
+
+@pytest.mark.parametrize('is_flying', [False, True])
+@pytest.mark.parametrize('trigger', TRIGGERS)
+@pytest.mark.parametrize('state', STATES)
+def test_each_trigger_from_each_state(paraglider, state, trigger, is_flying):
+    paraglider, changes = paraglider
+    paraglider.state = state
+    paraglider._speed = 9.0 if is_flying else 0.0
+    expected = reference(state, trigger, is_flying)
+    assert getattr(paraglider, trigger)() is bool(expected)
+    assert changes == expected
+    assert paraglider.state == (expected[-1][1] if expected else state)
+
+
+def test_random_trigger_sequences(paraglider):
+    paraglider, changes = paraglider
+    rng = random.Random(20)
+    for _ in range(300):
+        paraglider.state = rng.choice(STATES)
+        state = paraglider.state
+        expected = []
+        for trigger in rng.choices(TRIGGERS, k=20):
+            is_flying = rng.random() < 0.5
+            paraglider._speed = 9.0 if is_flying else 0.0
+            transitions = reference(state, trigger, is_flying)
+            expected += transitions
+            if transitions:
+                state = transitions[-1][1]
+            getattr(paraglider, trigger)()
+        assert changes == expected
+        assert paraglider.state == state
+        changes.clear()
@@ -0,0 +1,28 @@
+import puretrack_api as ptrk
+
+
+def test_tracks_are_matched_on_their_key():
+    tracks = [{'key': 'B', 'count': 1}, {'key': 'A', 'count': 2}]
+    assert ptrk.split_tracks_by_key(['A', 'B'], tracks) == {'A': tracks[1], 'B': tracks[0]}
+
+
+def test_tracks_without_requested_key_are_dropped():
+    # Neither the position in the batch nor the 'id' attributes a track
+    tracks = [{'id': 'A', 'count': 1}, {'count': 2}, {'key': 'C', 'count': 3}, {'key': 'B', 'count': 4}]
+    assert ptrk.split_tracks_by_key(['A', 'B'], tracks) == {'B': tracks[3]}
+
+
+def test_tracks_without_key_field():
+    # As the records of /api/trails, the key in their 'K' field
+    tracks = [
+        {'count': 1, 'last': 'T1751371200,L45.00000,G6.00000,KB,U23', 'points': ['T1751371200,L45.00000,G6.00000,KB,U23']},
+        {'count': 1, 'last': None, 'points': ['T1751371200,L45.00000,G6.00000,KA,U23']},
+    ]
+    assert ptrk.split_tracks_by_key(['A', 'B'], tracks) == {'A': tracks[1], 'B': tracks[0]}
+
+
+def test_track_of_a_single_key_without_key():
+    tracks = [{'count': 1, 'last': 'T1751371200,L45.00000,G6.00000,U23', 'points': ['T1751371200,L45.00000,G6.00000,U23']}]
+    assert ptrk.split_tracks_by_key(['A'], tracks) == {'A': tracks[0]}
+    # Not with several keys requested
+    assert ptrk.split_tracks_by_key(['A', 'B'], tracks) == {}
@@ -0,0 +1,34 @@
+import pytest
+
+from clock import get_default_clock
+from guardian_angel import GuardianAngel
+from replay import RecordedTrack, Replay
+
+TRACK = RecordedTrack('X-0001', [1751371200 + 5 * i for i in range(120)], [45.0 + 1e-4 * i for i in range(120)],
+                      [6.0] * 120, [2000.0] * 120, ground_levels=[1100.0] * 120, name='Pilot')
+
+
+@pytest.fixture
+def closed(monkeypatch):
+    closed = []
+    close = GuardianAngel.close
+    monkeypatch.setattr(GuardianAngel, 'close', lambda self: (closed.append(self), close(self)))
+    return closed
+
+
+def test_replay_closes_guardian_angel(closed):
+    previous = get_default_clock()
+    report = Replay([TRACK], tail=60).run()
+    assert report['cycles'] > 0
+    assert len(closed) == 1 and closed[0]._storage is not None
+    assert get_default_clock() is previous
+
+
+def test_failed_replay_closes_guardian_angel(closed, monkeypatch):
+    def fail(*_):
+        raise RuntimeError("subscribe")
+
+    monkeypatch.setattr(GuardianAngel, 'bus', property(lambda self: type('Bus', (), {'subscribe': fail})()))
+    with pytest.raises(RuntimeError, match='subscribe'):
+        Replay([TRACK], tail=60).run()
+    assert len(closed) == 1
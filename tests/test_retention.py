@@ -0,0 +1,68 @@
+import sys
+
+import pytest
+
+import database as db
+from retention import Retention
+from storage import MemoryStorage, SqlStorage
+from test_storage import TRAIL, point
+
+
+@pytest.fixture(params=['memory', 'sql'])
+def storage(request, tmp_path):
+    if request.param == 'memory':
+        yield MemoryStorage()
+        return
+    storage = SqlStorage({'url': f'sqlite:///{tmp_path}/test.db'})
+    yield storage
+    storage.close()
+
+
+def test_purge_in_chunks(storage):
+    storage.insert_points({f'X-{index:04d}': [point(TRAIL + 5 * step) for step in range(10)] for index in range(25)})
+    retention = Retention({'chunk_size': 7}, storage)
+    retention.start()
+    storage.flush()
+    assert retention.last_report['rows'] == 250
+    assert retention.last_report['chunks'] == 36 # The last one empty
+    assert storage.get_last_timestamps() == {}
+
+
+def test_synchronous_purge_doesnt_recurse():
+    storage = MemoryStorage()
+    chunks = sys.getrecursionlimit() * 2
+    storage.insert_points({'X-0001': [point(TRAIL + step) for step in range(chunks)]})
+    retention = Retention({'chunk_size': 1}, storage)
+    retention.start()
+    assert retention.last_report['rows'] == chunks
+    assert retention.last_report['chunks'] == chunks + 1
+
+
+def test_failed_chunk_stops_the_purge(tmp_path, monkeypatch, caplog):
+    storage = SqlStorage({'url': f'sqlite:///{tmp_path}/test.db'})
+    try:
+        storage.insert_points({'X-0001': [point(TRAIL + step) for step in range(10)]})
+        retention = Retention({'chunk_size': 4}, storage)
+        purge_old_data_chunk = db.purge_old_data_chunk
+        calls = []
+
+        def fail_second_chunk(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError("disk I/O error")
+            return purge_old_data_chunk(*args)
+
+        monkeypatch.setattr(db, 'purge_old_data_chunk', fail_second_chunk)
+        retention.start()
+        storage.flush()
+        assert retention._report is None and retention.last_report is None
+        assert "Purge failed after 4 rows in 1 chunks: disk I/O error" in caplog.text
+
+        # The next purge starts afresh, without an unfinished purge warning
+        caplog.clear()
+        retention.start()
+        storage.flush()
+        assert retention.last_report['rows'] == 6
+        assert "unfinished" not in caplog.text
+    finally:
+        storage.close()
@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from clock import VirtualClock
+from scheduler import TimerWheel
+
+TIMERS = 10000
+
+
+def test_timers_fire_in_deadline_order():
+    # On a virtual clock, over several turns of the wheel (1024 slots of 0.1 s)
+    clock = VirtualClock(datetime(2025, 7, 1, tzinfo=timezone.utc))
+    wheel = TimerWheel({'resolution': 0.1, 'slots': 1024}, clock=clock)
+    rng = random.Random(1)
+    deadlines = [rng.uniform(0.0, 300.0) for _ in range(TIMERS)]
+    fired = []
+    handles = [wheel.schedule(deadline, lambda index: fired.append((index, clock.monotonic())), index)
+               for index, deadline in enumerate(deadlines)]
+
+    cancelled = set(range(0, TIMERS, 4))
+    for index in cancelled:
+        assert handles[index].cancel()
+    assert not handles[0].cancel() # Already cancelled
+    assert len(wheel) == TIMERS - len(cancelled)
+
+    wheel.advance(301.0)
+    assert len(wheel) == 0
+    indexes = [index for index, _ in fired]
+    assert sorted(indexes) == [index for index in range(TIMERS) if index not in cancelled]
+    for index, moment in fired:
+        # Never early, at most a tick late
+        assert deadlines[index] <= moment + 1e-9 < deadlines[index] + 0.1 + 1e-9
+    # In the order of their ticks
+    ticks = [round(moment / 0.1) for _, moment in fired]
+    assert ticks == sorted(ticks)
+    assert not any(handle.active for handle in handles)
+
+
+def test_timers_cancelled_from_a_callback():
+    clock = VirtualClock(datetime(2025, 7, 1, tzinfo=timezone.utc))
+    wheel = TimerWheel(clock=clock)
+    fired = []
+    handles = []
+
+    def fire(index):
+        fired.append(index)
+        # Each timer cancels the next one, due in the same tick or later
+        if index + 1 < TIMERS:
+            handles[index + 1].cancel()
+
+    for index in range(TIMERS):
+        handles.append(wheel.schedule(1.0 + index // 100, fire, index))
+    wheel.advance(TIMERS // 100 + 2)
+    # The timers of a tick fire in any order: a timer never fires after the one cancelling it
+    position = {index: order for order, index in enumerate(fired)}
+    assert all(position.get(index + 1, -1) < position[index] for index in fired)
+    assert len(fired) >= TIMERS // 2
+    assert len(wheel) == 0
+
+
+def test_timers_on_the_wheel_thread():
+    wheel = TimerWheel({'resolution': 0.01})
+    rng = random.Random(2)
+    count = TIMERS
+    done = threading.Semaphore(0)
+    fired = [None] * count
+    start = time.monotonic()
+    deadlines = [start + 0.5 + rng.random() * 0.5 for _ in range(count)]
+
+    def fire(index):
+        fired[index] = time.monotonic()
+        done.release()
+
+    try:
+        handles = [wheel.schedule(deadline - time.monotonic(), fire, index) for index, deadline in enumerate(deadlines)]
+        cancelled = set(range(0, count, 4))
+        for index in cancelled:
+            handles[index].cancel()
+        for _ in range(count - len(cancelled)):
+            assert done.acquire(timeout=10)
+        time.sleep(0.1)
+    finally:
+        wheel.stop()
+    assert all(fired[index] is None for index in cancelled)
+    assert all(fired[index] >= deadlines[index] for index in range(count) if index not in cancelled)
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from storage import MemoryStorage, SqlStorage, Storage
+
+TRAIL = 1751371200 # 2025-07-01 12:00 UTC
+
+
+def point(timestamp):
+    return {'timestamp': timestamp, 'datetime': datetime.fromtimestamp(timestamp, timezone.utc),
+            'lat': 45.0, 'lon': 6.0, 'speed': 9.0}
+
+
+@pytest.fixture(params=['memory', 'sql'])
+def storage(request, tmp_path):
+    if request.param == 'memory':
+        yield MemoryStorage()
+        return
+    storage = SqlStorage({'url': f'sqlite:///{tmp_path}/test.db'})
+    yield storage
+    storage.close()
+
+
+def test_snapshot_points_dont_advance_the_trail_cursors(storage):
+    storage.insert_points({'X-0001': [point(TRAIL), point(TRAIL - 5)]}, cursors={'X-0001': TRAIL})
+    # A snapshot point, newer than the trail
+    storage.insert_points({'X-0001': [point(TRAIL + 60)]})
+    # A late commit never moves a cursor back
+    storage.insert_points({'X-0001': [point(TRAIL - 10)]}, cursors={'X-0001': TRAIL - 10})
+    storage.flush()
+    assert storage.get_trail_cursors() == {'X-0001': TRAIL}
+    assert storage.get_last_timestamps() == {'X-0001': TRAIL + 60}
+
+
+def test_cursors_of_a_database_without_them(tmp_path):
+    storage = SqlStorage({'url': f'sqlite:///{tmp_path}/test.db'})
+    try:
+        storage.insert_points({'X-0001': [point(TRAIL)]})
+        storage.flush()
+        assert storage.get_trail_cursors() == {'X-0001': TRAIL}
+    finally:
+        storage.close()
+
+
+def test_incomplete_backend_fails_when_created():
+    class WriteOnlyStorage(Storage):
+        def insert_points(self, points_by_key, on_commit=None, cursors=None):
+            pass
+
+    with pytest.raises(TypeError, match='get_trail_cursors'):
+        WriteOnlyStorage()
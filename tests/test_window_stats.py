@@ -0,0 +1,73 @@
+import math
+import random
+
+import pytest
+
+import kinematics
+from window_stats import TrackStatistics
+
+WINDOWS = (1, 5, 10)
+
+
+def brute_force(points, now, minutes):
+    """
+    Returns:
+        dict: The statistics of the points added by `now`, within `minutes` before it, computed from scratch.
+    """
+    window = [point for point in points if now - minutes * 60 <= point[0]]
+    speeds = [speed for _, speed, _, _ in window if not math.isnan(speed)]
+    displacement = 0.0
+    if len(window) > 1:
+        displacement = float(kinematics.haversine(window[0][2], window[0][3], window[-1][2], window[-1][3]))
+    return {
+        'avg_speed': kinematics.time_weighted_average([point[0] for point in window], [point[1] for point in window]),
+        'max_speed': max(speeds, default=0.0),
+        'displacement': displacement,
+    }
+
+
+def random_track(rng, count):
+    points = []
+    timestamp, lat, lon = 1751371200.0, 45.0, 6.0
+    for _ in range(count):
+        # Irregular periods, duplicated timestamps, gaps longer than the windows and unknown speeds
+        timestamp += rng.choice([0, 1, 5, 5, 5, 10, 30, 700])
+        lat += rng.uniform(-1e-3, 1e-3)
+        lon += rng.uniform(-1e-3, 1e-3)
+        points.append((timestamp, math.nan if rng.random() < 0.05 else rng.uniform(0, 20), lat, lon))
+    return points
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_windows_match_brute_force(seed):
+    rng = random.Random(seed)
+    points = random_track(rng, 500)
+    statistics = TrackStatistics(WINDOWS)
+    now = -math.inf
+    for index, point in enumerate(points):
+        statistics.add(*point)
+        if rng.random() < 0.3:
+            # Read at the last point or later, now never decreasing
+            now = max(now, point[0] + rng.choice([0, 0, 3, 60, 400]))
+            result = statistics.statistics(now)
+            for minutes in WINDOWS:
+                expected = brute_force(points[:index + 1], now, minutes)
+                assert result[minutes]['avg_speed'] == pytest.approx(expected['avg_speed'], abs=1e-9)
+                assert result[minutes]['max_speed'] == expected['max_speed']
+                assert result[minutes]['displacement'] == pytest.approx(expected['displacement'], abs=1e-6)
+
+
+def test_now_going_back_is_the_previous_now():
+    rng = random.Random(1)
+    points = [(1751371200.0 + 5 * index, rng.uniform(0, 20), 45.0, 6.0) for index in range(200)]
+    statistics = TrackStatistics(WINDOWS)
+    for point in points:
+        statistics.add(*point)
+    last = points[-1][0]
+    later = statistics.statistics(last + 120)
+    assert statistics.statistics(last) == later
+    assert statistics.statistics(last, minutes=5) == later[5]
+    # The next points are added to the windows ending at the latest now
+    statistics.add(last + 5, 3.0, 45.0, 6.0)
+    expected = brute_force(points + [(last + 5, 3.0, 45.0, 6.0)], last + 120, 5)
+    assert statistics.statistics(last + 5, minutes=5)['avg_speed'] == pytest.approx(expected['avg_speed'], abs=1e-9)
@@ -0,0 +1,223 @@
+import math
+import sys
+from array import array
+from collections import deque
+import kinematics
+
+class SlidingWindow:
+    """
+    Statistics of the points of a TrackStatistics over a sliding time window, updated incrementally.
+
+    The time-weighted average speed is kept as two running sums: each segment adds its duration and
+    its speed weighted by its duration when its last point comes in, and subtracts them when its first
+    point falls out of the window. Each speed is weighted by the duration of the segment it ends, as in
+    kinematics.time_weighted_average. The maximum speed is kept in a monotonic queue, so every point is
+    added and removed once: the cost per point is constant, whatever the density of the track.
+
+    The points out of the window are dropped for good, so the window only moves forward: the `now` of
+    statistics must not decrease. A `now` before a previous one, e.g. a wall clock stepped back, is taken
+    as the previous one.
+    """
+    def __init__(self, track, duration):
+        """
+        Initialize an empty window.
+
+        Args:
+            track (TrackStatistics): The track whose points are read.
+            duration (float): Duration of the window in seconds.
+        """
+        self.track = track
+        self.duration = duration
+        self.head = track.end # Index of the first point of the window
+        self._max_speeds = deque() # Indexes of the points of decreasing speeds
+        self._weighted_speed = 0.0
+        self._total_time = 0.0
+        self._now = -math.inf # The latest end of the window
+
+    def __len__(self):
+        return self.track.end - self.head
+
+    def add(self, index, timestamp, speed, dt):
+        """
+        Add the last point of the track.
+
+        Args:
+            index (int): Index of the point in the track.
+            timestamp (float): Its Unix timestamp in seconds.
+            speed (float): Its speed in m/s, NaN if unknown.
+            dt (float): Duration of the segment from the previous point of the track in seconds.
+        """
+        if index > self.head and dt > 0:
+            self._weighted_speed += dt * _speed(speed)
+            self._total_time += dt
+        if not math.isnan(speed):
+            max_speeds = self._max_speeds
+            while max_speeds and self.track.speed(max_speeds[-1]) <= speed:
+                max_speeds.pop()
+            max_speeds.append(index)
+        # Older points can't be part of any later window
+        if self.track.timestamp(self.head) < timestamp - self.duration:
+            self.expire(timestamp - self.duration)
+
+    def expire(self, threshold):
+        """
+        Remove the points older than a Unix timestamp.
+
+        Args:
+            threshold (float): The oldest timestamp kept.
+        """
+        track = self.track
+        timestamps, speeds, offset = track._timestamps, track._speeds, track._offset
+        end = track.end
+        while self.head < end and timestamps[self.head - offset] < threshold:
+            if self.head + 1 < end:
+                dt = timestamps[self.head + 1 - offset] - timestamps[self.head - offset]
+                if dt > 0:
+                    self._weighted_speed -= dt * _speed(speeds[self.head + 1 - offset])
+                    self._total_time -= dt
+            self.head += 1
+        while self._max_speeds and self._max_speeds[0] < self.head:
+            self._max_speeds.popleft()
+        if end - self.head < 2:
+            # No segment left, the rounding errors of the running sums are dropped too
+            self._weighted_speed = 0.0
+            self._total_time = 0.0
+
+    def statistics(self, now):
+        """
+        Get the statistics of the window ending now.
+
+        Args:
+            now (float): Unix timestamp of the end of the window, not before the previous one.
+
+        Returns:
+            dict: 'avg_speed' the time-weighted average speed in m/s (0.0 without segment),
+                'max_speed' the maximum speed in m/s (0.0 without speed),
+                'displacement' the distance in meters between the first and the last point.
+        """
+        # The points before a previous window are already dropped
+        self._now = max(self._now, now)
+        self.expire(self._now - self.duration)
+        track = self.track
+        displacement = 0.0
+        if len(self) > 1:
+            first, last = self.head, track.end - 1
+            displacement = float(kinematics.haversine(track.lat(first), track.lon(first), track.lat(last), track.lon(last)))
+        return {
+            'avg_speed': self._weighted_speed / self._total_time if self._total_time > 0 else 0.0,
+            'max_speed': track.speed(self._max_speeds[0]) if self._max_speeds else 0.0,
+            'displacement': displacement
+        }
+
+class TrackStatistics:
+    """
+    Sliding-window statistics of a paraglider over several window durations.
+
+    The windows share the points, stored once in compact arrays and indexed from the first point added.
+    The points older than the longest window are dropped as the track goes on.
+    """
+    def __init__(self, windows=(1, 5, 10)):
+        """
+        Initialize the statistics.
+
+        Args:
+            windows (sequence, optional): The window durations in minutes. Default is 1, 5 and 10 minutes.
+        """
+        self._timestamps = array('d')
+        self._speeds = array('d')
+        self._lats = array('d')
+        self._lons = array('d')
+        self._offset = 0 # Index of the first stored point
+        self._windows = {minutes: SlidingWindow(self, minutes * 60) for minutes in windows}
+
+    def __contains__(self, minutes):
+        return minutes in self._windows
+
+    @property
+    def end(self):
+        return self._offset + len(self._timestamps)
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory used by the points and the queues, in bytes.
+        """
+        arrays = sum(sys.getsizeof(values) for values in (self._timestamps, self._speeds, self._lats, self._lons))
+        return arrays + sum(len(window._max_speeds) for window in self._windows.values()) * _INDEX_NBYTES
+
+    def timestamp(self, index):
+        return self._timestamps[index - self._offset]
+
+    def speed(self, index):
+        return self._speeds[index - self._offset]
+
+    def lat(self, index):
+        return self._lats[index - self._offset]
+
+    def lon(self, index):
+        return self._lons[index - self._offset]
+
+    def add(self, timestamp, speed, lat, lon):
+        """
+        Add a point newer than the previous ones.
+
+        Args:
+            timestamp (float): Unix timestamp in seconds.
+            speed (float): Speed in m/s, NaN if unknown.
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+        """
+        dt = timestamp - self._timestamps[-1] if self._timestamps else 0.0
+        self._timestamps.append(timestamp)
+        self._speeds.append(speed)
+        self._lats.append(lat)
+        self._lons.append(lon)
+        index = self.end - 1
+        for window in self._windows.values():
+            window.add(index, timestamp, speed, dt)
+        self._compact()
+
+    def rebuild(self, timestamps, speeds, lats, lons):
+        """
+        Replace the points, e.g. after points older than the last one were merged.
+
+        Args:
+            timestamps, speeds, lats, lons (sequence): The points in time order.
+        """
+        for values in (self._timestamps, self._speeds, self._lats, self._lons):
+            del values[:]
+        self._offset = 0
+        self._windows = {minutes: SlidingWindow(self, window.duration) for minutes, window in self._windows.items()}
+        for point in zip(timestamps, speeds, lats, lons):
+            self.add(*point)
+
+    def statistics(self, now, minutes=None):
+        """
+        Get the statistics of the windows ending now.
+
+        Args:
+            now (float): Unix timestamp of the end of the windows, not before the previous one (cf. SlidingWindow).
+            minutes (int, optional): A single window duration.
+
+        Returns:
+            dict: The statistics of the window, or of each window by duration in minutes.
+        """
+        if minutes is not None:
+            return self._windows[minutes].statistics(now)
+        return {minutes: window.statistics(now) for minutes, window in self._windows.items()}
+
+    def _compact(self):
+        # Amortized: the points out of every window are dropped once they are half of the arrays
+        first = min((window.head for window in self._windows.values()), default=self.end)
+        dropped = first - self._offset
+        if dropped > 32 and 2 * dropped > len(self._timestamps):
+            for values in (self._timestamps, self._speeds, self._lats, self._lons):
+                del values[:dropped]
+            self._offset = first
+
+# Approximate size of an index in the maximum speed queues: the int and its slot
+_INDEX_NBYTES = sys.getsizeof(2**40) + 8
+
+def _speed(speed):
+    # An unknown speed counts in the duration with a zero contribution, as in kinematics.time_weighted_average
+    return 0.0 if math.isnan(speed) else speed